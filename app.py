@@ -1,26 +1,26 @@
 # app.py
-import streamlit as st
 import os
 import sys
+import json
 from dotenv import load_dotenv
-from utils.auth import check_password
-from datetime import datetime
 
 # Load environment variables (for local development only)
 if 'WEBSITE_HOSTNAME' not in os.environ:
     load_dotenv()
 
-# Health check route (for Azure monitoring)
-if len(sys.argv) > 1 and sys.argv[1] == "health":
-    try:
-        # Basic health check
-        import anthropic  # noqa: F401
-        import supabase  # noqa: F401
-        print("OK - All dependencies available")
-        sys.exit(0)
-    except Exception as e:
-        print(f"ERROR: {e}")
-        sys.exit(1)
+# Health check routes (for Azure monitoring), answered before Streamlit loads:
+# "health" is liveness, "ready" probes Supabase, YNAB and Anthropic
+if len(sys.argv) > 1 and sys.argv[1] in ("health", "ready"):
+    from utils.health import liveness, readiness
+    result = readiness() if sys.argv[1] == "ready" else liveness()
+    print(json.dumps(result))
+    sys.exit(0 if result["status"] in ("healthy", "ready") else 1)
+
+import streamlit as st
+from utils.auth import check_password
+from utils.health import liveness
+from services.shared import get_readiness_monitor
+from datetime import datetime
 
 # Streamlit configuration
 st.set_page_config(
@@ -89,13 +89,32 @@ def main():
         else:
             st.success("✅ All environment variables configured")
         
-        # Quick dependency check
-        try:
-            import anthropic  # noqa: F401
-            import supabase  # noqa: F401
-            st.success("✅ All dependencies loaded successfully")
-        except ImportError as e:
-            st.error(f"❌ Dependency error: {e}")
+        # Quick dependency check (locates packages without importing them)
+        missing_packages = liveness().get("missing_packages")
+        if missing_packages:
+            st.error(f"❌ Dependency error: missing {', '.join(missing_packages)}")
+        else:
+            st.success("✅ All dependencies installed")
+        
+        # Upstream reachability, probed in the background so this page never waits
+        ready = get_readiness_monitor().latest()
+        if ready is None:
+            st.info("⏳ Checking Supabase, YNAB and Anthropic...")
+        for name, check in (ready or {"checks": {}})["checks"].items():
+            if "skipped" in check:
+                st.info(f"⚪ {name}: {check['skipped']}")
+            elif check["ok"]:
+                st.success(f"✅ {name}: {check['latency_ms']:.0f}ms")
+            else:
+                detail = check.get("error") or f"HTTP {check.get('status_code')}"
+                st.error(f"❌ {name}: {detail} ({check['latency_ms']:.0f}ms)")
+        
+        # Upstreams currently failing fast after repeated errors
+        from services.resilience import CIRCUITS
+        for name, circuit in CIRCUITS.items():
+            if circuit.state != "closed":
+                st.warning(f"⚡ {name}: circuit {circuit.state.replace('_', '-')}, "
+                           f"retrying in {circuit.retry_in():.0f}s")
 
         # Show Azure deployment info
         if 'WEBSITE_HOSTNAME' in os.environ:
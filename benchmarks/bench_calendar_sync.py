@@ -0,0 +1,202 @@
+# benchmarks/bench_calendar_sync.py
+"""CalendarService against a local fake of the Google Calendar events API.
+
+The fake supports paging, syncToken incremental lists, cancelled events and
+expired tokens (410 Gone). The run checks full then incremental sync, the
+410 fallback and the sync throttle by counting API calls, then compares
+index lookups with a linear scan over the same events:
+
+    python benchmarks/bench_calendar_sync.py --events 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.calendar_service import CalendarService  # noqa: E402
+from services.ynab_sync import SQLiteSyncStore  # noqa: E402
+
+
+class FakeHttpError(Exception):
+    """Shaped like googleapiclient.errors.HttpError (status on .resp)"""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+
+
+class FakeRequest:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class FakeCalendarAPI:
+    """In-memory calendar; ``service.events().list(...).execute()`` like the real client.
+
+    Every change bumps a sequence number. A sync token is the sequence it was
+    issued at, and tokens older than ``expired_before`` answer 410.
+    """
+
+    def __init__(self):
+        self.by_id = {}
+        self.sequence = 0
+        self.expired_before = 0
+        self.calls = 0
+
+    def put(self, event):
+        self.sequence += 1
+        self.by_id[event["id"]] = dict(event, status="confirmed", _seq=self.sequence)
+
+    def cancel(self, event_id):
+        self.sequence += 1
+        self.by_id[event_id] = {"id": event_id, "status": "cancelled", "_seq": self.sequence}
+
+    # Calendar resource API
+    def events(self):
+        return self
+
+    def list(self, calendarId, singleEvents=True, maxResults=250,
+             pageToken=None, syncToken=None, timeMin=None):
+        return FakeRequest(lambda: self._list(maxResults, pageToken, syncToken, timeMin))
+
+    def _list(self, max_results, page_token, sync_token, time_min):
+        self.calls += 1
+        if sync_token is not None:
+            since = int(sync_token)
+            if since < self.expired_before:
+                raise FakeHttpError(410)
+            matching = [e for e in self.by_id.values() if e["_seq"] > since]
+        else:
+            # Full list: no cancelled events, only those ending after timeMin
+            floor = datetime.fromisoformat(time_min)
+            matching = [
+                e for e in self.by_id.values()
+                if e["status"] != "cancelled" and
+                datetime.fromisoformat(e["end"]["dateTime"]) > floor
+            ]
+        matching.sort(key=lambda e: e["_seq"])
+
+        offset = int(page_token or 0)
+        page = matching[offset:offset + max_results]
+        response = {"items": [{k: v for k, v in e.items() if k != "_seq"} for e in page]}
+        if offset + max_results < len(matching):
+            response["nextPageToken"] = str(offset + max_results)
+        else:
+            response["nextSyncToken"] = str(self.sequence)
+        return response
+
+
+def make_event(event_id, start):
+    duration = timedelta(minutes=random.choice([15, 30, 60, 90]))
+    return {
+        "id": event_id,
+        "summary": f"Event {event_id}",
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + duration).isoformat()},
+    }
+
+
+def linear_next(events, now):
+    future = [e for e in events if e["start"] > now and not e["all_day"]]
+    return min(future, key=lambda e: (e["start"], e["end"], e["id"])) if future else None
+
+
+def linear_overlapping(events, start, end):
+    return sorted((e for e in events if e["start"] < end and e["end"] > start),
+                  key=lambda e: (e["start"], e["end"], e["id"]))
+
+
+def timeit(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    random.seed(0)
+
+    api = FakeCalendarAPI()
+    now = datetime.now(timezone.utc)
+    for i in range(args.events):
+        api.put(make_event(f"e{i}", now + timedelta(minutes=random.randint(-60 * 24 * 6, 60 * 24 * 365))))
+
+    calendar = CalendarService(service=api, store=SQLiteSyncStore(":memory:"))
+
+    # 1. Full sync pages through everything once
+    started = time.perf_counter()
+    result = calendar.sync(force=True)
+    full_seconds = time.perf_counter() - started
+    full_calls = api.calls
+    assert result["full"] == 1 and len(calendar._index) == args.events
+    print(f"full sync:        {result['events']:>6} events, {full_calls:>3} calls, {full_seconds * 1000:8.1f} ms")
+
+    # 2. Incremental sync only receives the changes
+    version = calendar.data_version()
+    for i in range(3):
+        api.put(make_event(f"e{i}", now + timedelta(hours=i + 1)))
+    api.cancel("e10")
+    api.cancel("e11")
+    api.put(make_event("new", now + timedelta(minutes=5)))
+    api.calls = 0
+    started = time.perf_counter()
+    result = calendar.sync(force=True)
+    incremental_seconds = time.perf_counter() - started
+    assert result == {"events": 6, "full": 0} and api.calls == 1
+    assert len(calendar._index) == args.events - 1
+    assert calendar.next_event(now.timestamp())["id"] == "new"
+    assert calendar.data_version() != version
+    print(f"incremental sync: {result['events']:>6} events, {api.calls:>3} calls, {incremental_seconds * 1000:8.1f} ms")
+
+    # 3. No changes: one call, version unchanged
+    version = calendar.data_version()
+    api.calls = 0
+    result = calendar.sync(force=True)
+    assert result == {"events": 0, "full": 0} and api.calls == 1 and calendar.data_version() == version
+    print(f"no-change sync:   {result['events']:>6} events, {api.calls:>3} calls")
+
+    # 4. Throttled: a non-forced sync right after one makes no call
+    api.calls = 0
+    assert calendar.sync() == {} and api.calls == 0
+    print(f"throttled sync:   {0:>6} events, {api.calls:>3} calls")
+
+    # 5. Expired token (410) falls back to a full sync
+    api.expired_before = api.sequence + 1
+    api.put(make_event("after-expiry", now + timedelta(days=2)))
+    api.calls = 0
+    result = calendar.sync(force=True)
+    assert result["full"] == 1 and len(calendar._index) == args.events
+    print(f"410 resync:       {result['events']:>6} events, {api.calls:>3} calls (1 rejected)")
+
+    # Lookups: index vs linear scan, same answers
+    events = calendar.store.get_records(calendar._namespace, "events")
+    probes = [now.timestamp() + random.randint(0, 86400 * 300) for _ in range(args.repeat)]
+    for moment in probes[:20]:
+        assert calendar.next_event(moment) == linear_next(events, moment)
+        assert calendar._index.overlapping(moment, moment + 86400) == \
+            linear_overlapping(events, moment, moment + 86400)
+
+    day = (now + timedelta(days=3)).date()
+    print("\nlookup (us/call)      index    linear")
+    print(f"next_event       {timeit(lambda: calendar.next_event(probes[0]), args.repeat):10.1f}"
+          f"{timeit(lambda: linear_next(events, probes[0]), 20):10.1f}")
+    day_start, day_end = calendar._day_bounds(day)
+    print(f"events_on        {timeit(lambda: calendar.events_on(day), args.repeat):10.1f}"
+          f"{timeit(lambda: linear_overlapping(events, day_start, day_end), 20):10.1f}")
+    print(f"llm context      {timeit(calendar.get_calendar_context_for_llm, args.repeat):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
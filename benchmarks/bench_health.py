@@ -0,0 +1,117 @@
+# benchmarks/bench_health.py
+"""Liveness latency and readiness probe caching against local upstream stubs.
+
+One stub server stands in for Supabase, YNAB and Anthropic. It fails or
+delays on request so both healthy and degraded readiness can be checked
+offline. It also runs the ``ready`` CLI twice to check that one-shot
+processes share the probe cache file:
+
+    python benchmarks/bench_health.py --delay-ms 40
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUESTS = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    failing = set()  # upstream names answering 503
+
+    def do_GET(self):
+        upstream = self.path.split("/")[1]
+        REQUESTS.append(upstream)
+        time.sleep(self.delay)
+        status = 503 if upstream in self.failing else 200
+        body = json.dumps({"data": []}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay_ms / 1000
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({
+        "APP_PASSWORD": "stub",
+        "SUPABASE_URL": f"{base}/supabase",
+        "SUPABASE_ANON_KEY": "stub-key",
+        "YNAB_ACCESS_TOKEN": "stub-token",
+        "YNAB_BASE_URL": f"{base}/ynab",
+        "ANTHROPIC_API_KEY": "stub-key",
+        "ANTHROPIC_BASE_URL": f"{base}/anthropic",
+        "HEALTH_PROBE_CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="bench_health_"), "probes.json"),
+    })
+
+    from utils import health
+
+    sdk_loaded = [name for name in ("anthropic", "supabase") if name in sys.modules]
+    samples = []
+    for _ in range(200):
+        started = time.perf_counter()
+        health.liveness()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(f"liveness: p50 {samples[100]:.2f}ms, max {samples[-1]:.2f}ms, "
+          f"SDKs imported: {sdk_loaded or 'none'}")
+
+    started = time.perf_counter()
+    ready = health.readiness()
+    cold_ms = (time.perf_counter() - started) * 1000
+    latencies = ", ".join(f"{name} {check['latency_ms']:.0f}ms" for name, check in ready["checks"].items())
+    print(f"readiness cold: {ready['status']} in {cold_ms:.0f}ms ({latencies}), {len(REQUESTS)} upstream requests")
+
+    REQUESTS.clear()
+    started = time.perf_counter()
+    for _ in range(100):
+        ready = health.readiness()
+    warm_ms = (time.perf_counter() - started) * 1000 / 100
+    print(f"readiness cached: {ready['status']} in {warm_ms:.3f}ms/call, {len(REQUESTS)} upstream requests")
+
+    # Each CLI check is a new process; the second reads the first one's results
+    health.reset_probe_cache()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for run in ("first", "second"):
+        REQUESTS.clear()
+        completed = subprocess.run([sys.executable, "-m", "utils.health", "ready"], cwd=root,
+                                   capture_output=True, text=True)
+        print(f"ready CLI {run} run: {json.loads(completed.stdout)['status']}, "
+              f"{len(REQUESTS)} upstream requests")
+
+    StubHandler.failing = {"anthropic"}
+    health.reset_probe_cache()
+    ready = health.readiness()
+    print(f"readiness with anthropic down: {ready['status']}, "
+          f"anthropic={ready['checks']['anthropic'].get('status_code')}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_intent_router.py
+"""Accuracy and latency of IntentRouter vs. the old keyword check.
+
+Uses k-fold cross-validation over data/intent_prompts.jsonl:
+
+    python benchmarks/bench_intent_router.py --folds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.intent_router import IntentRouter, load_examples  # noqa: E402
+
+# The Chat page's previous substring routing
+BUDGET_KEYWORDS = ["budget", "money", "spend", "spending", "expense", "cost", "afford", "save", "saving"]
+
+
+def keyword_fetches_budget(prompt):
+    return any(keyword in prompt.lower() for keyword in BUDGET_KEYWORDS)
+
+
+def budget_scores(predicted, actual):
+    """Precision/recall of the "fetch YNAB context" decision"""
+    tp = sum(p and a for p, a in zip(predicted, actual))
+    precision = tp / max(1, sum(predicted))
+    recall = tp / max(1, sum(actual))
+    return precision, recall, sum(predicted) / len(predicted)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    examples = load_examples()
+    correct = 0
+    unsure = 0
+    router_budget, keyword_budget, actual_budget, samples = [], [], [], []
+
+    for fold in range(args.folds):
+        train = [ex for i, ex in enumerate(examples) if i % args.folds != fold]
+        test = [ex for i, ex in enumerate(examples) if i % args.folds == fold]
+        router = IntentRouter(train)
+        for prompt, intent in test:
+            started = time.perf_counter()
+            predicted, _ = router.classify(prompt)
+            samples.append(time.perf_counter() - started)
+            unsure += max(router.probabilities(prompt).values()) < router.min_confidence
+            correct += predicted == intent
+            router_budget.append(predicted == "budget")
+            keyword_budget.append(keyword_fetches_budget(prompt))
+            actual_budget.append(intent == "budget")
+
+    print(f"{len(examples)} labeled prompts, {args.folds}-fold cross-validation")
+    print(f"router intent accuracy: {correct / len(examples):.1%}")
+    for name, predicted in (("router", router_budget), ("keywords", keyword_budget)):
+        precision, recall, rate = budget_scores(predicted, actual_budget)
+        print(f"{name:9s} budget fetch: precision={precision:.1%} recall={recall:.1%} "
+              f"YNAB fetches/turn={rate:.2f}")
+
+    print(f"router low-confidence rate (Claude fallback calls/turn): {unsure / len(examples):.2f}")
+
+    samples.sort()
+    print(f"classify latency p50={statistics.median(samples) * 1000:.3f}ms "
+          f"p95={samples[int(len(samples) * 0.95) - 1] * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
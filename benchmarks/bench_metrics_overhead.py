@@ -0,0 +1,71 @@
+# benchmarks/bench_metrics_overhead.py
+"""Per-call cost of the instrumentation in utils/metrics.py.
+
+Times an empty function bare and wrapped with each recorder; the difference
+is the overhead added to every upstream call (budget: 50µs):
+
+    python benchmarks/bench_metrics_overhead.py --calls 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import MetricsRegistry, record_cache, record_claude_usage, timed, track  # noqa: E402
+
+BUDGET_US = 50.0
+USAGE = {"input_tokens": 1200, "output_tokens": 150,
+         "cache_creation_input_tokens": 0, "cache_read_input_tokens": 900}
+
+
+def per_call_us(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+
+    def noop():
+        return None
+
+    decorated = timed("bench", "noop", registry)(noop)
+
+    def with_track():
+        with track("bench", "noop", registry):
+            return None
+
+    cases = {
+        "timed decorator": decorated,
+        "track context manager": with_track,
+        "record_claude_usage": lambda: record_claude_usage("claude-3-haiku-20240307", USAGE, registry),
+        "record_cache": lambda: record_cache("bench", "hit", registry),
+    }
+
+    baseline = per_call_us(noop, args.calls)
+    worst = 0.0
+    for name, fn in cases.items():
+        overhead = per_call_us(fn, args.calls) - baseline
+        worst = max(worst, overhead)
+        print(f"{name:<24} {overhead:6.2f}µs/call")
+
+    started = time.perf_counter()
+    text = registry.to_prometheus()
+    export_ms = (time.perf_counter() - started) * 1000
+    print(f"prometheus export: {len(text.splitlines())} lines in {export_ms:.2f}ms")
+
+    status = "OK" if worst < BUDGET_US else "OVER BUDGET"
+    print(f"worst overhead {worst:.2f}µs vs {BUDGET_US:.0f}µs budget: {status}")
+    sys.exit(0 if worst < BUDGET_US else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_month_range.py
+"""Cold vs. warm YNABService.get_month_range against a local YNAB stub.
+
+The stub adds a fixed delay per request to mimic API latency:
+
+    python benchmarks/bench_month_range.py --months 12 --delay-ms 80
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUESTS = []
+
+
+def month_payload(month):
+    return {"month": {
+        "month": month, "budgeted": 500000, "activity": -320000, "age_of_money": 30,
+        "categories": [{"name": "Groceries", "hidden": False, "budgeted": 60000,
+                        "activity": -45000, "balance": 15000}]
+    }}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        REQUESTS.append(self.path)
+        time.sleep(self.delay)
+        if self.path == "/v1/budgets":
+            data = {"budgets": [{"id": "b1", "name": "Home"}]}
+        else:
+            month = self.path.rsplit("/", 1)[-1]
+            data = month_payload(date.today().replace(day=1).isoformat() if month == "current" else month)
+        body = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--delay-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    StubHandler.delay = args.delay_ms / 1000
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["YNAB_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("YNAB_ACCESS_TOKEN", "stub-token")
+
+    from services.cache import TwoTierCache
+    from services.ynab_service import YNABService, month_starts
+
+    today = date.today()
+    total = today.year * 12 + today.month - 1 - (args.months - 1)
+    start = f"{total // 12:04d}-{total % 12 + 1:02d}-01"
+    assert len(month_starts(start, today.isoformat())) == args.months
+
+    ynab = YNABService(default_budget_name="Home", cache=TwoTierCache())
+    for label in ("cold", "warm"):
+        REQUESTS.clear()
+        started = time.perf_counter()
+        snapshots = ynab.get_month_range(start)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{label}: {len(snapshots)} months in {elapsed:.0f}ms, {len(REQUESTS)} upstream requests")
+
+    serial = args.months * args.delay_ms + args.delay_ms
+    print(f"(serial fetch of every month would take ~{serial:.0f}ms)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+# benchmarks/bench_page_reruns.py
+"""Rerun cost of each Dashboard and Chat interaction, measured with AppTest.
+
+Every page runs in a fresh interpreter against one local stub server standing
+in for YNAB, Supabase and Anthropic (streamed answers included), and every
+request it receives is counted. Each interaction is repeated --repeat times
+and reported as median rerun time, upstream requests and deltas sent to the
+browser per rerun.
+
+AppTest itself always reruns the whole script, so interactions that happen
+inside an ``st.fragment`` (a widget in it, or its ``run_every`` timer) are
+replayed the way the browser triggers them: the harness keeps the fragment
+storage between runs and requests a fragment-scoped rerun. With
+--baseline-rev the pages from that commit are measured as well, e.g. the
+commit before the pages were split into fragments:
+
+    python benchmarks/bench_page_reruns.py --baseline-rev HEAD~1
+"""
+import argparse
+import inspect
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = "pages/1_📊_Dashboard.py"
+CHAT = "pages/2_💬_Chat.py"
+TODAY = date.today()
+
+# (label, widget to interact with, fragment the interaction reruns)
+INTERACTIONS = {
+    os.path.basename(DASHBOARD): [
+        ("click Today's Events", ("button", "📅 Today's Events"), "quick_actions"),
+        ("metrics timer tick", None, "top_metrics"),
+        ("charts timer tick", None, "budget_details"),
+        ("click Refresh Data", ("button", "🔄 Refresh Data"), "quick_actions"),
+    ],
+    os.path.basename(CHAT): [
+        ("toggle Show Usage Stats", ("checkbox", "Show Usage Stats"), "assistant_details"),
+        ("send a prompt", ("chat_input", None), "conversation"),
+        ("status timer tick", None, "connection_status"),
+        ("details timer tick", None, "assistant_details"),
+    ],
+}
+
+REQUESTS = []  # (upstream, method, path)
+
+
+class Upstreams:
+    """YNAB, Supabase and Anthropic payloads for the stub server"""
+
+    def __init__(self, seed=7):
+        rng = random.Random(seed)
+        names = ["Groceries", "Dining Out", "Rent", "Transport", "Utilities", "Fun"]
+        self.categories = [
+            {"id": f"c{i}", "name": name, "hidden": False, "deleted": False,
+             "budgeted": rng.randrange(100, 900) * 1000, "activity": -rng.randrange(0, 600) * 1000,
+             "balance": rng.randrange(-50, 300) * 1000}
+            for i, name in enumerate(names)
+        ]
+        self.transactions = [
+            {"id": f"t{i}", "date": (TODAY - timedelta(days=rng.randrange(0, 200))).isoformat(),
+             "amount": -rng.randrange(3, 250) * 1000, "payee_name": rng.choice(["Costco", "Shell", "Netflix"]),
+             "category_name": rng.choice(names), "deleted": False}
+            for i in range(400)
+        ]
+        started = datetime.now(timezone.utc) - timedelta(days=3)
+        self.chats = [
+            {"id": i, "user_message": f"Question {i} about my budget",
+             "assistant_response": f"Answer {i}: " + "You are on track this month. " * 8,
+             "created_at": (started + timedelta(minutes=i)).isoformat()}
+            for i in range(30)
+        ][::-1]
+
+    def ynab(self, path):
+        if path == "/v1/budgets":
+            return {"budgets": [{"id": "b1", "name": "Home"}]}
+        if path.endswith("/categories"):
+            return {"server_knowledge": 1,
+                    "category_groups": [{"name": "Everyday", "categories": self.categories}]}
+        if path.endswith("/transactions"):
+            return {"server_knowledge": 1, "transactions": self.transactions}
+        month = path.rsplit("/", 1)[-1]
+        return {"month": {
+            "month": TODAY.replace(day=1).isoformat() if month in ("current", "user") else month,
+            "budgeted": sum(c["budgeted"] for c in self.categories),
+            "activity": sum(c["activity"] for c in self.categories),
+            "age_of_money": 30, "categories": self.categories
+        }}
+
+    def supabase(self, method, path, query, body):
+        if method != "GET":
+            return json.loads(body or b"[]")
+        if path.endswith("/chat_history") and "or" not in query:
+            return self.chats[:int(query.get("limit", ["20"])[0])]
+        return []
+
+
+def sse(events):
+    return "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+def claude_stream(text, model):
+    usage = {"input_tokens": 900, "output_tokens": 1}
+    events = [
+        {"type": "message_start", "message": {
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": model,
+            "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+    ]
+    events += [{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word + " "}}
+               for word in text.split()]
+    events += [
+        {"type": "content_block_stop", "index": 0},
+        {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+         "usage": {"output_tokens": len(text.split())}},
+        {"type": "message_stop"},
+    ]
+    return sse(events)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    upstreams: Upstreams = None
+
+    def _reply(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        content_type = "application/json"
+        if url.path.startswith("/ynab"):
+            upstream = "ynab"
+            payload = json.dumps({"data": self.upstreams.ynab(url.path[len("/ynab"):])}).encode()
+        elif url.path.startswith("/anthropic"):
+            upstream = "anthropic"
+            request = json.loads(body or b"{}")
+            text = "Groceries are at 72% of budget with a week left, so you are on track."
+            if request.get("stream"):
+                content_type = "text/event-stream"
+                payload = claude_stream(text, request.get("model", "stub"))
+            elif url.path.endswith("/messages"):
+                payload = json.dumps({
+                    "id": "msg_stub", "type": "message", "role": "assistant",
+                    "model": request.get("model", "stub"), "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn", "stop_sequence": None,
+                    "usage": {"input_tokens": 900, "output_tokens": 20}}).encode()
+            else:
+                payload = b'{"data": []}'
+        else:
+            upstream = "supabase"
+            payload = json.dumps(self.upstreams.supabase(
+                self.command, url.path, parse_qs(url.query), body)).encode()
+        REQUESTS.append((upstream, self.command, url.path))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_HEAD = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def install_fragment_runner():
+    """Patch AppTest's script runner so it keeps fragments and can rerun one"""
+    from streamlit.runtime.fragment import MemoryFragmentStorage
+    from streamlit.runtime.scriptrunner import RerunData
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.element_tree import parse_tree_from_messages
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+
+    state = {"storage": MemoryFragmentStorage(), "fragment_id": None, "deltas": 0}
+
+    class FragmentScriptRunner(LocalScriptRunner):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # One storage for every run, as a browser session has
+            self._fragment_storage = state["storage"]
+
+        def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+            if state["fragment_id"] is None:
+                tree = super().run(widget_state, query_params, timeout, page_hash)
+            else:
+                self.request_rerun(RerunData(
+                    widget_states=widget_state, page_script_hash=page_hash,
+                    fragment_id_queue=[state["fragment_id"]], is_fragment_scoped_rerun=True
+                ))
+                self.start()
+                require_widgets_deltas(self, timeout)
+                tree = parse_tree_from_messages(self.forward_msgs())
+            state["deltas"] = sum(msg.HasField("delta") for msg in self.forward_msgs())
+            return tree
+
+    app_test.LocalScriptRunner = FragmentScriptRunner
+    return state
+
+
+def fragment_ids(storage):
+    """{function name: fragment id} for the fragments of the last full run"""
+    ids = {}
+    for fragment_id, wrapped in storage._fragments.items():
+        for cell in wrapped.__closure__ or ():
+            if inspect.isfunction(cell.cell_contents):
+                ids[cell.cell_contents.__name__] = fragment_id
+    return ids
+
+
+def interact(app, widget, step):
+    if widget is None:
+        return app.run()
+    kind, label = widget
+    if kind == "chat_input":
+        return app.chat_input[0].set_value(f"How much is left in groceries after trip {step}?").run()
+    element = next(e for e in getattr(app, kind) if e.label == label)
+    return (element.check() if kind == "checkbox" and not element.value else
+            element.uncheck() if kind == "checkbox" else element.click()).run()
+
+
+def run_child(script, repeat):
+    """Measure one page and print its rows as JSON (runs in the subprocess)"""
+    sys.path.insert(0, ROOT)
+    workdir = tempfile.mkdtemp(prefix="bench_page_reruns_")
+    StubHandler.upstreams = Upstreams()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({
+        "APP_PASSWORD": "stub",
+        "WEBSITE_HOSTNAME": "bench",  # skip .env loading
+        "SUPABASE_URL": base,
+        "SUPABASE_ANON_KEY": "stub-key",
+        "ANTHROPIC_API_KEY": "stub-key",
+        "ANTHROPIC_BASE_URL": f"{base}/anthropic",
+        "YNAB_ACCESS_TOKEN": "stub-token",
+        "YNAB_BASE_URL": f"{base}/ynab/v1",
+        "DASHBOARD_SNAPSHOT_PATH": os.path.join(workdir, "snapshot.json"),
+        "YNAB_SYNC_DB": os.path.join(workdir, "sync.sqlite"),
+        "YNAB_LEDGER_DIR": os.path.join(workdir, "ledger"),
+        "RECALL_INDEX_DIR": os.path.join(workdir, "recall"),
+    })
+    os.environ.pop("GOOGLE_CALENDAR_CREDENTIALS", None)
+
+    from streamlit.testing.v1 import AppTest
+
+    runner = install_fragment_runner()
+    page = os.path.join(ROOT, script) if not os.path.isabs(script) else script
+    app = AppTest.from_file(page, default_timeout=60)
+    app.session_state["authenticated"] = True
+
+    def measure(action):
+        seen = len(REQUESTS)
+        started = time.perf_counter()
+        action()
+        elapsed = (time.perf_counter() - started) * 1000
+        time.sleep(0.05)  # let in-flight requests land
+        calls = {}
+        for upstream, _, _ in REQUESTS[seen:]:
+            calls[upstream] = calls.get(upstream, 0) + 1
+        return {"ms": elapsed, "calls": calls, "deltas": runner["deltas"],
+                "exceptions": [str(e.value) for e in app.exception]}
+
+    rows = [dict(measure(app.run), label="first load", fragment=None)]
+    time.sleep(1.0)  # background warm-up (recall sync, readiness probes)
+    rows.append(dict(measure(app.run), label="full rerun", fragment=None))
+    for label, widget, name in INTERACTIONS[os.path.basename(script)]:
+        if widget is None and name not in fragment_ids(runner["storage"]):
+            continue  # no timer on this version of the page
+        samples = []
+        for step in range(repeat):
+            # Ids include the fragment's position, which moves as chat messages are added
+            fragment_id = fragment_ids(runner["storage"]).get(name)
+            runner["fragment_id"] = fragment_id
+            samples.append(measure(lambda: interact(app, widget, step)))
+            runner["fragment_id"] = None
+            if fragment_id is not None:
+                app.run()  # back to a whole-page tree for the next interaction
+        rows.append({
+            "label": label, "fragment": name if fragment_id else None,
+            "ms": statistics.median(s["ms"] for s in samples),
+            "calls": {k: sum(s["calls"].get(k, 0) for s in samples) / repeat
+                      for k in {k for s in samples for k in s["calls"]}},
+            "deltas": statistics.median(s["deltas"] for s in samples),
+            "exceptions": sorted({e for s in samples for e in s["exceptions"]}),
+        })
+    print(json.dumps(rows))
+    server.shutdown()
+
+
+def measure_in_child(script, repeat):
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", script, "--repeat", str(repeat)],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def baseline_copy(rev, script, workdir):
+    """The page as of ``rev``, copied out under its own file name"""
+    source = subprocess.run(["git", "show", f"{rev}:{script}"], capture_output=True,
+                            text=True, cwd=ROOT, check=True).stdout
+    path = os.path.join(workdir, os.path.basename(script))
+    with open(path, "w") as f:
+        f.write(source)
+    return path
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    print(f"  {'interaction':<26}{'reruns':<19}{'ms':>7}{'deltas':>8}  upstream requests")
+    for row in rows:
+        calls = ", ".join(f"{k} {v:.2g}" for k, v in sorted(row["calls"].items())) or "none"
+        scope = row["fragment"] or "whole page"
+        print(f"  {row['label']:<26}{scope:<19}{row['ms']:>7.1f}{row['deltas']:>8.0f}  {calls}")
+        for error in row["exceptions"]:
+            print(f"    ! {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline-rev", help="also measure the pages as of this commit")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.repeat)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_page_reruns_pages_")
+    for script in (DASHBOARD, CHAT):
+        if args.baseline_rev:
+            path = baseline_copy(args.baseline_rev, script, workdir)
+            report(f"{script} @ {args.baseline_rev}", measure_in_child(path, args.repeat))
+        report(f"{script} (working tree)", measure_in_child(script, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
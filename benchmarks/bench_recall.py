@@ -0,0 +1,59 @@
+# benchmarks/bench_recall.py
+"""Query latency of RecallIndex with a large synthetic chat history.
+
+    python benchmarks/bench_recall.py --turns 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.recall import RecallIndex  # noqa: E402
+
+WORDS = (
+    "budget groceries rent dinner flight hotel gym coffee savings laptop car insurance "
+    "meeting dentist birthday gift vacation paycheck subscription electricity phone "
+    "spent afford remaining category month week plan schedule reminder restaurant"
+).split()
+
+
+def sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as path:
+        index = RecallIndex(path=path)
+        started = time.perf_counter()
+        for i in range(args.turns):
+            index.add(sentence(rng), sentence(rng), f"2025-01-01T00:00:{i:06d}")
+        print(f"indexed {len(index)} turns in {time.perf_counter() - started:.1f}s")
+
+        index.save()
+        started = time.perf_counter()
+        index = RecallIndex(path=path)
+        print(f"cold load (memory-mapped) in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        samples = []
+        for _ in range(args.queries):
+            query = sentence(rng, 8)
+            started = time.perf_counter()
+            index.search(query, k=3)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        print(f"search p50={statistics.median(samples) * 1000:.2f}ms "
+              f"p95={samples[int(len(samples) * 0.95) - 1] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
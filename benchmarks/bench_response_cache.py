@@ -0,0 +1,152 @@
+# benchmarks/bench_response_cache.py
+"""ClaudeService with and without the response cache on a repetitive chat log.
+
+A fake Claude client sleeps --claude-ms per answer and counts calls; a dict
+stands in for the Supabase api_cache table. The log repeats questions with
+different casing and punctuation, rephrases a few, asks number-sensitive
+questions, and changes the YNAB data version part-way through. Each setup
+reports Claude calls, hits and latency, then the near-duplicate matches are
+listed so false positives are easy to spot. Finally a fresh process-level
+cache over the same table shows answers surviving a restart:
+
+    python benchmarks/bench_response_cache.py --similarity 0.8
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache import TwoTierCache  # noqa: E402
+from services.claude_service import ClaudeService  # noqa: E402
+from services.response_cache import ResponseCache  # noqa: E402
+
+# (prompt, YNAB data version at the time)
+CHAT_LOG = [
+    ("How much have I spent?", "v1"),
+    ("how much have I spent", "v1"),
+    ("How much have I spent??", "v1"),
+    ("How much have I spent so far", "v1"),
+    ("What's left in groceries?", "v1"),
+    ("whats left in groceries", "v1"),
+    ("What's left in dining out?", "v1"),
+    ("How much did I spend at Costco?", "v1"),
+    ("How much did I spend at Target?", "v1"),
+    ("What did I spend in 2024?", "v1"),
+    ("What did I spend in 2025?", "v1"),
+    ("am I over budget?", "v1"),
+    ("Am I over budget on anything", "v1"),
+    ("How much have I spent?", "v1"),
+    # A new transaction syncs: every earlier answer is out of date
+    ("How much have I spent?", "v2"),
+    ("how much have i spent?", "v2"),
+    ("What's left in groceries?", "v2"),
+]
+
+
+class FakeBackend:
+    """The SupabaseService cache methods over a dict"""
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = self.writes = 0
+
+    def get_cached_entry(self, key):
+        self.reads += 1
+        return self.rows.get(key)
+
+    def set_cached_data(self, key, data, ttl_minutes=60):
+        self.writes += 1
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)
+        self.rows[key] = {"data": data, "expires_at": expires_at.isoformat()}
+
+    def delete_cached_data(self, key):
+        self.rows.pop(key, None)
+
+
+class FakeClient:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+        self.messages = self
+
+    def create(self, **request):
+        self.calls += 1
+        time.sleep(self.seconds)
+        prompt = request["messages"][-1]["content"]
+        data = "v2" if "budget v2" in str(request["messages"]) else "v1"
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=f"Answer #{self.calls} ({data}) to: {prompt}")],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=900, output_tokens=120)
+        )
+
+
+def replay(claude, version):
+    rows = []
+    for prompt, data_version in CHAT_LOG:
+        version["current"] = data_version
+        started = time.perf_counter()
+        answer = claude.get_response(prompt, context={"budget": f"budget {data_version}"},
+                                     intent="budget")
+        rows.append({"prompt": prompt, "version": data_version, "answer": answer,
+                     "cached": claude.last_route.get("cached"),
+                     "ms": (time.perf_counter() - started) * 1000})
+    return rows
+
+
+def report(label, client, rows):
+    hits = [r for r in rows if r["cached"]]
+    misses = [r for r in rows if not r["cached"]]
+    print(f"{label:<24}{client.calls:>7} calls  {len(hits):>3} hits "
+          f"({sum(r['cached'] == 'near' for r in hits)} near)  "
+          f"miss p50 {statistics.median(r['ms'] for r in misses):6.1f}ms  "
+          f"hit p50 {statistics.median(r['ms'] for r in hits) if hits else 0:5.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--claude-ms", type=float, default=300)
+    parser.add_argument("--similarity", type=float, default=0.8)
+    args = parser.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    version = {"current": "v1"}
+    backend = FakeBackend()
+    setups = [
+        ("no cache", None),
+        ("exact", ResponseCache(TwoTierCache(), data_version=lambda: version["current"])),
+        (f"exact + near >= {args.similarity}",
+         ResponseCache(TwoTierCache(backend=backend), data_version=lambda: version["current"],
+                       similarity_threshold=args.similarity)),
+    ]
+    print(f"{len(CHAT_LOG)} prompts, Claude answers in {args.claude_ms:.0f}ms\n")
+    for label, cache in setups:
+        client = FakeClient(args.claude_ms / 1000)
+        rows = replay(ClaudeService(client=client, response_cache=cache), version)
+        report(label, client, rows)
+        last = rows
+    print("\nnear-duplicate matches (prompt -> answer served):")
+    for row in last:
+        if row["cached"] == "near":
+            print(f"  {row['prompt']!r:<36} -> {row['answer']!r}")
+    # Answers given before the data changed must not be served after it
+    assert all(f"({row['version']})" in row["answer"] for row in last), "served an answer for old data"
+
+    # A restarted process reads the same answers from the api_cache table
+    client = FakeClient(args.claude_ms / 1000)
+    restarted = ResponseCache(TwoTierCache(backend=backend), data_version=lambda: version["current"])
+    reads = backend.reads
+    ClaudeService(client=client, response_cache=restarted).get_response(
+        "How much have I spent?", context={"budget": "budget v2"}, intent="budget")
+    print(f"\nafter restart: {client.calls} Claude calls, {backend.reads - reads} api_cache read, "
+          f"{backend.writes} rows written in total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_spending_analytics.py
+"""Time spending_insights on synthetic transaction history.
+
+    python benchmarks/bench_spending_analytics.py --years 5 --per-day 30
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.transactions import spending_insights  # noqa: E402
+
+CATEGORIES = ["Groceries", "Dining Out", "Rent", "Transport", "Utilities", "Fun", "Gifts",
+              "Health", "Subscriptions", "Inflow: Ready to Assign"]
+
+
+def synthetic_frame(years, per_day, seed=7):
+    rng = np.random.default_rng(seed)
+    n = years * 365 * per_day
+    end = pd.Timestamp(date.today())
+    return pd.DataFrame({
+        "id": np.arange(n).astype(str),
+        "date": end - pd.to_timedelta(rng.integers(0, years * 365, n), unit="D"),
+        "amount": -rng.gamma(2.0, 25.0, n).round(2),
+        "payee_name": pd.Series(rng.integers(0, 400, n)).map("Payee {}".format).astype("string"),
+        "category_name": pd.Series(rng.choice(CATEGORIES, n)).astype("string"),
+        "is_transfer": rng.random(n) < 0.03,
+        "parent_id": np.arange(n).astype(str),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    frame = synthetic_frame(args.years, args.per_day)
+    spending_insights(frame)  # warm up
+
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        spending_insights(frame)
+        timings.append(time.perf_counter() - started)
+    print(f"{len(frame):,} transactions over {args.years} years: "
+          f"best={min(timings) * 1000:.1f}ms median={sorted(timings)[len(timings) // 2] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_startup.py
+"""Cold-start cost of app.py and each page, measured with ``python -X importtime``.
+
+Every script runs in a fresh interpreter under Streamlit's AppTest with local
+stubs standing in for Supabase and Anthropic. Only imports triggered by the
+script itself are counted (Streamlit and the test harness are loaded first):
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --top 8 pages/2_💬_Chat.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ["app.py", "pages/1_📊_Dashboard.py", "pages/2_💬_Chat.py"]
+MARKER = "--- script run starts ---"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every Supabase/Anthropic request with an empty JSON list"""
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self):
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_HEAD = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def run_child(script):
+    """Render one script and print its timings as JSON (runs in the subprocess)"""
+    sys.path.insert(0, ROOT)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({
+        "APP_PASSWORD": "stub",
+        "SUPABASE_URL": base,
+        "SUPABASE_ANON_KEY": "stub-key",
+        "ANTHROPIC_API_KEY": "stub-key",
+        "ANTHROPIC_BASE_URL": base,
+        "WEBSITE_HOSTNAME": "bench",  # skip .env loading
+    })
+    os.environ.pop("YNAB_ACCESS_TOKEN", None)
+
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=60)
+    app.session_state["authenticated"] = True
+    sys.stderr.write(MARKER + "\n")
+    sys.stderr.flush()
+    started = time.perf_counter()
+    app.run()
+    render_ms = (time.perf_counter() - started) * 1000
+    print(json.dumps({
+        "render_ms": render_ms,
+        "exceptions": [str(e.value) for e in app.exception],
+    }))
+    server.shutdown()
+
+
+def parse_importtime(stderr):
+    """Top-level modules imported after the marker: {module: cumulative µs}"""
+    after_marker = stderr.split(MARKER, 1)[-1]
+    modules = {}
+    for line in after_marker.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented; top-level ones include their children
+        if name.startswith(" ") and not name.startswith("  "):
+            try:
+                modules[name.strip()] = int(cumulative)
+            except ValueError:
+                pass
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    for script in args.scripts:
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", script],
+            capture_output=True, text=True, cwd=ROOT
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if proc.returncode != 0 or not proc.stdout.strip():
+            print(f"{script}: failed\n{proc.stderr[-2000:]}")
+            continue
+
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(proc.stderr)
+        import_ms = sum(modules.values()) / 1000
+        print(f"{script}: first render {result['render_ms']:.0f}ms "
+              f"({import_ms:.0f}ms of it imports), process total {wall_ms:.0f}ms")
+        for name, micros in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {micros / 1000:7.1f}ms  {name}")
+        for error in result["exceptions"]:
+            print(f"    exception: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_ynab_transport.py
+"""Compare per-call requests.get against a pooled keep-alive session.
+
+Runs a local YNAB stub server and reports p50/p95 latency for each mode:
+
+    python benchmarks/bench_ynab_transport.py --calls 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.http_client import AsyncJSONClient, build_session  # noqa: E402
+
+PAYLOAD = json.dumps({"data": {"budgets": [{"id": "b1", "name": "Home"}]}}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64  # concurrent async connects overflow the default backlog of 5
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return statistics.median(ordered) * 1000, p95 * 1000
+
+
+def time_calls(fetch, url, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fetch(url).raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    url = f"{base}/budgets"
+
+    session = build_session()
+    modes = {
+        "requests.get (new connection)": lambda u: requests.get(u, timeout=5),
+        "pooled session (keep-alive)": lambda u: session.get(u, timeout=5),
+    }
+    for name, fetch in modes.items():
+        p50, p95 = percentiles(time_calls(fetch, url, args.calls))
+        print(f"{name:32s} p50={p50:.3f}ms p95={p95:.3f}ms")
+
+    client = AsyncJSONClient(base)
+    client.get_many_sync(["/budgets"])  # warm up imports and SSL context
+    started = time.perf_counter()
+    client.get_many_sync(["/budgets"] * 12)
+    print(f"{'async get_many (12 concurrent)':32s} total={(time.perf_counter() - started) * 1000:.3f}ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/check_recall_backfill.py
+"""RecallIndex's Supabase backfill while the chat page keeps adding turns.
+
+A fake Supabase serves chat_history pages newest first with some latency.
+While the backfill pages through it, new turns are added the way the chat
+page does (saved to Supabase, then ``add`` with the saved created_at). The
+script checks every row is indexed exactly once, and that an index saved
+mid-backfill (as the atexit hook would) still backfills the older rows on
+the next start:
+
+    python benchmarks/check_recall_backfill.py --rows 20 --latency-ms 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.recall import RecallIndex  # noqa: E402
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeSupabase:
+    """chat_history with keyset pages, newest first, ``latency`` per page"""
+
+    def __init__(self, rows, latency):
+        self.rows = [
+            {"id": i, "user_message": f"question {i}", "assistant_response": f"answer {i}",
+             "created_at": (START + timedelta(minutes=i)).isoformat()}
+            for i in range(rows)
+        ]
+        self.latency = latency
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def save_chat(self, user_message, assistant_response):
+        with self._lock:
+            row = {"id": len(self.rows), "user_message": user_message,
+                   "assistant_response": assistant_response,
+                   "created_at": datetime.now(timezone.utc).isoformat()}
+            self.rows.append(row)
+            return row
+
+    def get_chat_history_page(self, before=None, limit=20):
+        time.sleep(self.latency)
+        with self._lock:
+            self.pages += 1
+            rows = sorted(self.rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        if before:
+            rows = [r for r in rows if (r["created_at"], r["id"]) < before]
+        page = rows[:limit]
+        cursor = (page[-1]["created_at"], page[-1]["id"]) if len(page) == limit else None
+        return page, cursor
+
+
+def check(label, condition, detail=""):
+    print(f"{'ok' if condition else 'FAIL':<5}{label}{'' if condition else f'  ({detail})'}")
+    return bool(condition)
+
+
+def chat_turn(index, supabase, i):
+    """What the chat page does after a response"""
+    saved = supabase.save_chat(f"live question {i}", f"live answer {i}")
+    index.add(saved["user_message"], saved["assistant_response"], saved["created_at"])
+
+
+def indexed(index):
+    return sorted(e["user_message"] for e in index.entries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--page-size", type=int, default=5)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+    ok = True
+
+    # 1. Turns added while the backfill is paging
+    with tempfile.TemporaryDirectory() as path:
+        supabase = FakeSupabase(args.rows, latency)
+        index = RecallIndex(path=path)
+        backfill = threading.Thread(target=index.sync_from_supabase, args=(supabase, args.page_size))
+        backfill.start()
+        time.sleep(latency * 1.5)  # first page fetched, more to come
+        for i in range(2):
+            chat_turn(index, supabase, i)
+        backfill.join()
+
+        expected = sorted(r["user_message"] for r in supabase.rows)
+        ok &= check("every row indexed exactly once", indexed(index) == expected,
+                    f"{len(index)} entries for {len(expected)} rows")
+        ok &= check("live turns don't move the backfill watermark",
+                    index.synced_created_at == supabase.rows[args.rows - 1]["created_at"],
+                    index.synced_created_at)
+
+        # The next start only pages through what the backfill hasn't seen
+        index.save()
+        chat_turn(index, supabase, 2)
+        index.save()
+        supabase.pages = 0
+        reopened = RecallIndex(path=path)
+        reopened.sync_from_supabase(supabase, page_size=args.page_size)
+        ok &= check("restart resumes from the backfill watermark",
+                    indexed(reopened) == sorted(r["user_message"] for r in supabase.rows)
+                    and supabase.pages == 1, f"{len(reopened)} entries, {supabase.pages} pages")
+
+    # 2. Saved mid-backfill (the atexit hook), then restarted
+    with tempfile.TemporaryDirectory() as path:
+        supabase = FakeSupabase(args.rows, latency)
+        index = RecallIndex(path=path)
+        backfill = threading.Thread(target=index.sync_from_supabase, args=(supabase, args.page_size),
+                                    daemon=True)
+        backfill.start()
+        time.sleep(latency * 1.5)
+        chat_turn(index, supabase, 0)
+        index.save()  # process exits before the backfill finishes
+
+        reopened = RecallIndex(path=path)
+        reopened.sync_from_supabase(supabase, page_size=args.page_size)
+        ok &= check("exit mid-backfill loses no older rows",
+                    indexed(reopened) == sorted(r["user_message"] for r in supabase.rows),
+                    f"{len(reopened)} entries for {len(supabase.rows)} rows")
+        backfill.join()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
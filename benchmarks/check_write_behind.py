@@ -0,0 +1,122 @@
+# benchmarks/check_write_behind.py
+"""Durability and ordering of WriteBehindQueue through a simulated outage.
+
+An in-memory writer stands in for Supabase. It accepts batches, then fails
+for --outage-seconds: first with errors, then with CircuitOpenError as the
+real circuit breaker does. Meanwhile several producers keep queueing rows.
+The script checks that every row is written exactly once, in enqueue order
+per producer, that flush() reports the outage instead of claiming success,
+and that a full queue or an exit mid-outage drops rows visibly:
+
+    python benchmarks/check_write_behind.py --outage-seconds 20
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.resilience import CircuitOpenError  # noqa: E402
+from services.write_behind import WriteBehindQueue  # noqa: E402
+
+
+class FlakyTable:
+    """Appends batches to ``rows``; fails while an outage is in progress"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.outage_until = 0.0
+        self.errors_until = 0.0
+        self._lock = threading.Lock()
+
+    def outage(self, seconds, errors_for):
+        now = time.monotonic()
+        self.outage_until = now + seconds
+        self.errors_until = now + errors_for
+
+    def insert(self, batch):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            if now < self.errors_until:
+                raise ConnectionError("supabase unreachable")
+            if now < self.outage_until:
+                raise CircuitOpenError("supabase circuit open")
+            self.rows.extend(batch)
+
+
+def check(label, condition, detail=""):
+    print(f"{'ok' if condition else 'FAIL':<5}{label}{'' if condition else f'  ({detail})'}")
+    return bool(condition)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outage-seconds", type=float, default=20)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=100, help="rows per producer")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="  log: %(message)s")
+    ok = True
+
+    # An outage longer than the old retry budget (~15s of backoff)
+    table = FlakyTable()
+    writer = WriteBehindQueue(table.insert, max_batch_size=20, flush_interval_seconds=0.05,
+                              retry_backoff_seconds=0.1, name="chat-history-writer")
+    table.outage(args.outage_seconds, errors_for=min(3.0, args.outage_seconds / 2))
+
+    def produce(producer):
+        for i in range(args.rows):
+            writer.put({"producer": producer, "seq": i})
+            time.sleep(args.outage_seconds / args.rows / 2)
+
+    started = time.monotonic()
+    producers = [threading.Thread(target=produce, args=(p,)) for p in range(args.producers)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    during = writer.flush(timeout=0.2)
+    ok &= check("flush reports rows still unwritten during the outage",
+                during is False or time.monotonic() - started > args.outage_seconds)
+    written = writer.flush(timeout=args.outage_seconds + 60)
+    stats = writer.stats()
+    print(f"     outage {args.outage_seconds:.0f}s: {table.calls} insert calls, "
+          f"{stats['failures']} failures, {stats['circuit_waits']} circuit waits")
+
+    total = args.producers * args.rows
+    ok &= check("flush succeeds once Supabase is back", written)
+    ok &= check("every row written exactly once", len(table.rows) == total
+                and len({(r["producer"], r["seq"]) for r in table.rows}) == total,
+                f"{len(table.rows)} of {total}")
+    in_order = all(
+        [r["seq"] for r in table.rows if r["producer"] == p] == list(range(args.rows))
+        for p in range(args.producers)
+    )
+    ok &= check("rows kept in enqueue order", in_order)
+    ok &= check("nothing dropped", stats["rows_dropped"] == 0, stats)
+    writer.close()
+
+    # A bounded queue refuses rows instead of growing without limit
+    table = FlakyTable()
+    table.outage(3600, errors_for=3600)
+    writer = WriteBehindQueue(table.insert, flush_interval_seconds=0.01, retry_backoff_seconds=0.05,
+                              max_pending_rows=50, name="bounded-writer")
+    accepted = sum(writer.put({"seq": i}) for i in range(80))
+    ok &= check("full queue refuses and counts rows", accepted == 50 and writer.stats()["rows_dropped"] == 30,
+                (accepted, writer.stats()["rows_dropped"]))
+
+    # Exiting mid-outage reports what is lost
+    writer.close(timeout=1.0)
+    ok &= check("exit mid-outage counts unwritten rows as dropped", writer.stats()["rows_dropped"] == 80,
+                writer.stats()["rows_dropped"])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# benchmarks/eval_model_routing.py
+"""Offline evaluation of ClaudeService model routing against a fake client.
+
+The fake client streams with per-model speeds from services/model_routing.py
+(scaled down by --time-scale) and can answer with "overloaded" (529) errors.
+Each prompt class is run under the routing policy and under the previous
+fixed Haiku/500-token setup. The table shows the model chosen, the model
+that served the request, the measured latency and the estimated cost:
+
+    python benchmarks/eval_model_routing.py --overload-rate 0.2
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.claude_service import ClaudeService  # noqa: E402
+from services.intent_router import IntentRouter  # noqa: E402
+from services.model_routing import DEFAULT_SPEED, MODEL_SPEED, ModelRoutingPolicy  # noqa: E402
+from utils.metrics import estimate_cost  # noqa: E402
+
+PROMPTS = {
+    "trivial": ["hi", "thanks!", "ok cool", "good morning", "thank you so much", "bye"],
+    "lookup": [
+        "How much is left in my grocery budget?",
+        "What did I spend on restaurants this month?",
+        "Am I over budget on anything?",
+        "What's on my calendar tomorrow?",
+        "When is my next meeting?",
+        "Why is my grocery budget so low?",
+        "plan lunch",  # calendar intent; not complex just for "plan"
+    ],
+    "general": [
+        "What's a good substitute for buttermilk?",
+        "How long should I boil an egg?",
+        "Recommend a podcast about history",
+        "What's the capital of Australia?",
+        # Complex keywords alone don't make a complex request
+        "why?",
+        "write a haiku about rain",
+    ],
+    "complex": [
+        "Plan a week of healthy dinners for two on a tight budget",
+        "Compare paying off my car loan early versus investing the money",
+        "Explain how compound interest works with a worked example",
+        "Draft a polite email asking my landlord to fix the heating",
+        "Why did dining go over? What should I cut?",
+        "Plan my Saturday:\n1. gym\n2. groceries\n3. dinner out",
+    ],
+}
+
+# Tokens a real answer of each class tends to need
+TYPICAL_OUTPUT_TOKENS = {"trivial": 25, "lookup": 180, "general": 260, "complex": 850}
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+class FakeStream:
+    def __init__(self, client, request):
+        self.client = client
+        self.request = request
+        self.output_tokens = min(request["max_tokens"], client.expected_tokens)
+
+    def __enter__(self):
+        first_token, _ = MODEL_SPEED.get(self.request["model"], DEFAULT_SPEED)
+        time.sleep(first_token * self.client.time_scale)
+        if self.client.rng.random() < self.client.overload_rates.get(self.request["model"], 0.0):
+            raise Overloaded("overloaded_error")
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        _, tokens_per_second = MODEL_SPEED.get(self.request["model"], DEFAULT_SPEED)
+        for _ in range(0, self.output_tokens, 25):
+            time.sleep(25 / tokens_per_second * self.client.time_scale)
+            yield "word " * 19
+
+    def get_final_message(self):
+        input_tokens = sum(len(str(m["content"])) for m in self.request["messages"]) // 4 + 40
+        return SimpleNamespace(usage=SimpleNamespace(
+            input_tokens=input_tokens, output_tokens=self.output_tokens
+        ))
+
+
+class FakeClient:
+    """Just enough of anthropic.Anthropic for ClaudeService.stream_response"""
+
+    def __init__(self, time_scale, overload_rates, seed=0):
+        self.time_scale = time_scale
+        self.overload_rates = overload_rates
+        self.rng = random.Random(seed)
+        self.expected_tokens = 0
+        self.messages = self
+
+    def stream(self, **request):
+        return FakeStream(self, request)
+
+
+class FixedPolicy(ModelRoutingPolicy):
+    """The previous behaviour: one model and 500 tokens for everything"""
+
+    def choose(self, user_message, intent=None, input_tokens=None):
+        return {"request_class": self.classify(user_message, intent),
+                "model": "claude-3-haiku-20240307", "max_tokens": 500,
+                "timeout": 60.0, "fallback_model": None}
+
+
+def evaluate(policy, router, args):
+    client = FakeClient(args.time_scale, {policy.models["general"]: args.overload_rate,
+                                          policy.models["complex"]: args.overload_rate})
+    claude = ClaudeService(client=client, policy=policy)
+    rows = defaultdict(list)
+    for expected_class, prompts in PROMPTS.items():
+        for prompt in prompts * args.repeat:
+            intent, _ = router.classify(prompt)
+            client.expected_tokens = TYPICAL_OUTPUT_TOKENS[expected_class]
+            started = time.perf_counter()
+            text = "".join(_drain(claude.stream_response(prompt, intent=intent)))
+            latency = (time.perf_counter() - started) / args.time_scale
+            stats = claude.last_stream_stats
+            rows[expected_class].append({
+                "routed_class": stats["request_class"],
+                "model": claude.last_route["model"],
+                "served_by": stats["model"],
+                "fell_back": stats["fell_back"],
+                "failed": text.startswith("Error"),
+                "truncated": stats["max_tokens"] < TYPICAL_OUTPUT_TOKENS[expected_class],
+                "latency": latency,
+                "cost": estimate_cost(stats["model"] or "", claude.last_usage),
+            })
+    return rows
+
+
+def _drain(generator):
+    while True:
+        try:
+            yield next(generator)
+        except StopIteration:
+            return
+
+
+def report(label, rows):
+    print(f"\n{label}")
+    print(f"{'class':<9}{'n':>4}  {'models (served)':<46}{'p50 s':>7}{'fallbacks':>10}"
+          f"{'errors':>8}{'truncated':>10}{'$/1k req':>10}")
+    for request_class, results in rows.items():
+        served = defaultdict(int)
+        for r in results:
+            served[(r["served_by"] or r["model"]).replace("claude-", "")] += 1
+        models = ", ".join(f"{m} x{n}" for m, n in served.items())
+        print(f"{request_class:<9}{len(results):>4}  {models:<46}"
+              f"{statistics.median(r['latency'] for r in results):>7.2f}"
+              f"{sum(r['fell_back'] for r in results):>10}"
+              f"{sum(r['failed'] for r in results):>8}"
+              f"{sum(r['truncated'] for r in results):>10}"
+              f"{statistics.mean(r['cost'] for r in results) * 1000:>10.3f}")
+    misrouted = sum(r["routed_class"] != c for c, rs in rows.items() for r in rs)
+    print(f"routed to a different class than labeled: {misrouted}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--time-scale", type=float, default=0.02,
+                        help="fraction of modeled latency actually slept")
+    parser.add_argument("--overload-rate", type=float, default=0.2,
+                        help="chance the primary model answers 529 overloaded")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    router = IntentRouter.from_file()
+    report("fixed haiku / 500 tokens", evaluate(FixedPolicy(), router, args))
+    report("routing policy", evaluate(ModelRoutingPolicy(), router, args))
+    report("routing policy, 3s latency target",
+           evaluate(ModelRoutingPolicy(latency_target_seconds=3.0), router, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# benchmarks/eval_stream_response.py
+"""ClaudeService.stream_response against a scripted fake Anthropic client.
+
+Each case scripts what the fake client's ``messages.stream`` does per call:
+stream text chunks, raise before any text (overloaded, connection lost, bad
+request) or raise after some text. The script checks the chunks the page
+would show, their order, the generator's return value (what gets saved),
+which model answered, and the timing stats:
+
+    python benchmarks/eval_stream_response.py --chunk-ms 20
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import anthropic  # noqa: E402
+
+from services.claude_service import ClaudeService  # noqa: E402
+from services.resilience import CLAUDE_CIRCUIT  # noqa: E402
+
+ROUTE_MODEL = "routed-model"
+FALLBACK_MODEL = "fallback-model"
+
+
+class StatusError(Exception):
+    """Stands in for anthropic.APIStatusError (only status_code is read)"""
+
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def connection_error():
+    return anthropic.APIConnectionError(request=httpx.Request("POST", "http://fake/v1/messages"))
+
+
+class FakeStream:
+    def __init__(self, script, delay):
+        self.script = script
+        self.delay = delay
+
+    def __enter__(self):
+        if isinstance(self.script, Exception):
+            raise self.script
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for item in self.script:
+            time.sleep(self.delay)
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text="".join(self.script))],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=400, output_tokens=len(self.script))
+        )
+
+
+class FakeClient:
+    """messages.stream plays one scripted call per request; records the models asked"""
+
+    def __init__(self, scripts, delay):
+        self.scripts = list(scripts)
+        self.delay = delay
+        self.models = []
+        self.messages = self
+
+    def stream(self, **request):
+        self.models.append(request["model"])
+        return FakeStream(self.scripts.pop(0), self.delay)
+
+
+class FixedPolicy:
+    """Always routes to ROUTE_MODEL with FALLBACK_MODEL as the fallback"""
+    models = {"general": ROUTE_MODEL}
+
+    def choose(self, user_message, intent, input_tokens):
+        return {"model": ROUTE_MODEL, "fallback_model": FALLBACK_MODEL, "max_tokens": 300,
+                "timeout": 10.0, "request_class": "general"}
+
+
+CHUNKS = ["Groceries ", "are at ", "72% ", "of budget."]
+
+# (name, scripted calls, expected shown chunks, expected models asked, error expected)
+CASES = [
+    ("streams in order", [CHUNKS], CHUNKS, [ROUTE_MODEL], False),
+    ("overloaded, falls back", [StatusError(529), CHUNKS], CHUNKS, [ROUTE_MODEL, FALLBACK_MODEL], False),
+    ("connection lost, falls back", [connection_error(), CHUNKS], CHUNKS,
+     [ROUTE_MODEL, FALLBACK_MODEL], False),
+    ("bad request, no fallback", [StatusError(400)], [], [ROUTE_MODEL], True),
+    ("fails mid-stream, keeps text", [CHUNKS[:2] + [StatusError(529)]], CHUNKS[:2], [ROUTE_MODEL], True),
+    ("fallback fails too", [StatusError(529), StatusError(503)], [], [ROUTE_MODEL, FALLBACK_MODEL], True),
+]
+
+
+def consume(generator):
+    """Chunks yielded and the generator's return value, as st.write_stream sees them"""
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(generator))
+        except StopIteration as stop:
+            return chunks, stop.value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # st.* calls outside a Streamlit run
+    failures = 0
+    for name, scripts, expected, models, errors in CASES:
+        CLAUDE_CIRCUIT.reset()
+        client = FakeClient(scripts, args.chunk_ms / 1000)
+        claude = ClaudeService(client=client, policy=FixedPolicy())
+        chunks, final = consume(claude.stream_response("How are groceries?", context={"budget": "b"}))
+        stats = claude.last_stream_stats
+
+        shown = [chunk for chunk in chunks if not chunk.startswith("Error getting response")]
+        problems = []
+        if shown != expected:
+            problems.append(f"chunks {shown!r}")
+        if final != "".join(chunks):
+            problems.append(f"returned {final!r}")
+        if client.models != models:
+            problems.append(f"models {client.models}")
+        if (len(shown) != len(chunks)) != errors:
+            problems.append("error message " + ("missing" if errors else "unexpected"))
+        if stats["fell_back"] != (FALLBACK_MODEL in models):
+            problems.append(f"fell_back {stats['fell_back']}")
+        if expected and not (0 < stats["time_to_first_token"] <= stats["total_time"]):
+            problems.append(f"timings {stats['time_to_first_token']}, {stats['total_time']}")
+        if expected and not errors and stats["model"] != models[-1]:
+            problems.append(f"served_by {stats['model']}")
+
+        failures += bool(problems)
+        ttft = stats["time_to_first_token"]
+        print(f"{'FAIL' if problems else 'ok':<5}{name:<32}"
+              f"ttft {ttft * 1000 if ttft else 0:6.1f}ms  total {stats['total_time'] * 1000:6.1f}ms  "
+              f"{'; '.join(problems)}")
+    CLAUDE_CIRCUIT.reset()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
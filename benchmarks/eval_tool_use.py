@@ -0,0 +1,361 @@
+# benchmarks/eval_tool_use.py
+"""Pre-stuffed budget context vs. tool use, against a scripted fake model.
+
+A local stub serves the YNAB endpoints the sync engine and tools use; a fake
+Anthropic client answers every turn from a script. In tool mode the script
+calls the tools a real model would for that prompt, so the run measures
+what this repo controls: input tokens per turn (with prompt-cache reads and
+writes simulated at each cache breakpoint), tool rounds, memo hits, YNAB
+requests and whether the facts the answer needs reached the model at all.
+The same conversation runs once per mode through
+ClaudeService.stream_response, the way the Chat page calls it:
+
+    python benchmarks/eval_tool_use.py --categories 60 --transactions 3000
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUESTS = []
+TODAY = date.today()
+LAST_MONTH = (TODAY.replace(day=1) - timedelta(days=1)).replace(day=1).isoformat()
+# Blocks before a breakpoint that Anthropic checks for an earlier cache entry
+LOOKBACK_BLOCKS = 20
+
+# (prompt, tool calls per round in tool mode, text the answer needs to see)
+CONVERSATION = [
+    ("hi", [], None),
+    ("How much is left in my grocery budget?",
+     [[("get_category", {"name": "grocer"})]], "Groceries"),
+    ("What did I spend at Costco since the start of last month?",
+     [[("search_transactions", {"payee": "costco", "since": LAST_MONTH})]], "Costco"),
+    ("What's a good substitute for buttermilk?", [], None),
+    ("How am I doing with the budget overall this month?",
+     [[("get_month_summary", {})], [("get_category", {"name": "dining"})]], "Dining Out"),
+    ("Remind me how much grocery budget is left?",
+     [[("get_category", {"name": "grocer"})]], "Groceries"),
+    ("What did we decide about the car loan last time?",
+     [[("search_history", {"query": "car loan payoff"})]], "3.9%"),
+    ("thanks!", [], None),
+]
+
+PAST_EXCHANGES = [
+    ("Should I pay off my car loan early?",
+     "With a 3.9% rate, investing the extra $200/month likely comes out ahead; keep the loan."),
+    ("How do I budget for Christmas gifts?", "Set aside $50 a month in a Gifts category."),
+    ("What's a cheap weeknight dinner?", "Bean chili: about $8 for four servings."),
+]
+
+
+class YNABStub:
+    """Budget data for the stub server: categories, transactions, server_knowledge"""
+
+    def __init__(self, categories, transactions, seed=3):
+        rng = random.Random(seed)
+        names = ["Groceries", "Dining Out", "Rent", "Transport", "Utilities"] + \
+            [f"Category {i}" for i in range(max(0, categories - 5))]
+        self.knowledge = 100
+        self.categories = [
+            {"id": f"c{i}", "name": name, "hidden": False, "deleted": False,
+             "budgeted": rng.randrange(50, 800) * 1000, "activity": -rng.randrange(0, 500) * 1000,
+             "balance": rng.randrange(-50, 300) * 1000, "_knowledge": self.knowledge}
+            for i, name in enumerate(names)
+        ]
+        payees = ["Costco", "Trader Joe's", "Shell", "Netflix", "Chipotle", "PG&E"] + \
+            [f"Payee {i}" for i in range(40)]
+        self.transactions = [
+            {"id": f"t{i}", "date": (TODAY - timedelta(days=rng.randrange(0, 400))).isoformat(),
+             "amount": -rng.randrange(3, 250) * 1000, "payee_name": rng.choice(payees),
+             "category_name": rng.choice(names), "deleted": False, "_knowledge": self.knowledge}
+            for i in range(transactions)
+        ]
+
+    def spend(self, payee, category_index, dollars):
+        """A new transaction, as YNAB would report it in the next delta"""
+        self.knowledge += 1
+        category = self.categories[category_index]
+        category.update(activity=category["activity"] - dollars * 1000,
+                        balance=category["balance"] - dollars * 1000, _knowledge=self.knowledge)
+        self.transactions.append({
+            "id": f"t{len(self.transactions)}", "date": TODAY.isoformat(),
+            "amount": -dollars * 1000, "payee_name": payee, "category_name": category["name"],
+            "deleted": False, "_knowledge": self.knowledge
+        })
+
+    def payload(self, path):
+        path, _, query = path.partition("?")
+        since = int(query.rpartition("=")[2]) if "last_knowledge_of_server" in query else 0
+        if path == "/v1/budgets":
+            return {"budgets": [{"id": "b1", "name": "Home"}]}
+        if path.endswith("/categories"):
+            return {"server_knowledge": self.knowledge, "category_groups": [{
+                "name": "Everyday",
+                "categories": [c for c in self.categories if c["_knowledge"] > since]
+            }]}
+        if path.endswith("/transactions"):
+            return {"server_knowledge": self.knowledge,
+                    "transactions": [t for t in self.transactions if t["_knowledge"] > since]}
+        month = path.rsplit("/", 1)[-1]
+        return {"month": {
+            "month": TODAY.replace(day=1).isoformat() if month == "current" else month,
+            "budgeted": sum(c["budgeted"] for c in self.categories),
+            "activity": sum(c["activity"] for c in self.categories),
+            "age_of_money": 30, "categories": self.categories
+        }}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    data: YNABStub = None
+
+    def do_GET(self):
+        REQUESTS.append(self.path)
+        body = json.dumps({"data": self.data.payload(self.path)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def tokens(value):
+    return len(json.dumps(value, default=str)) // 4
+
+
+def prefix_blocks(request):
+    """Request parts in cache order (tools, system, messages), with breakpoints marked.
+    
+    Parts leave cache_control out: moving a breakpoint doesn't change the prefix.
+    """
+    def part(block, **extra):
+        return {**{k: v for k, v in block.items() if k != "cache_control"}, **extra}
+
+    parts = [(tool, False) for tool in request.get("tools", [])]
+    parts += [(part(block), "cache_control" in block) for block in request["system"]]
+    for message in request["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            parts.append((message, False))
+        else:
+            parts += [(part(block, role=message["role"]), "cache_control" in block)
+                      for block in content]
+    return parts
+
+
+class FakeClient:
+    """Scripted stand-in for anthropic.Anthropic (messages.create and messages.stream)"""
+
+    def __init__(self, min_cacheable_tokens):
+        self.messages = self
+        self.script = []
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self.cached_prefixes = set()
+        self.calls = 0
+        self.seen = ""  # everything sent to the model this turn
+
+    def _usage(self, request):
+        # At each breakpoint Anthropic reads the longest cached prefix ending
+        # there or up to LOOKBACK_BLOCKS blocks before it, and writes the
+        # prefix if it was not cached. Prefixes shorter than the model's
+        # minimum are not cached at all.
+        parts = prefix_blocks(request)
+        keys, sizes = [], []
+        digest = hashlib.sha1()
+        running = 0
+        for part, _ in parts:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+            keys.append(digest.hexdigest())
+            running += tokens(part)
+            sizes.append(running)
+        read = written = 0
+        for i, (_, breakpoint) in enumerate(parts):
+            if not breakpoint or sizes[i] < self.min_cacheable_tokens:
+                continue
+            for j in range(i, max(-1, i - LOOKBACK_BLOCKS - 1), -1):
+                if keys[j] in self.cached_prefixes:
+                    read = max(read, sizes[j])
+                    break
+            if keys[i] not in self.cached_prefixes:
+                self.cached_prefixes.add(keys[i])
+                written = sizes[i] - read
+        return SimpleNamespace(input_tokens=running - read - written, output_tokens=60,
+                               cache_read_input_tokens=read, cache_creation_input_tokens=written)
+
+    def _reply(self, request):
+        self.calls += 1
+        self.seen += json.dumps(request, default=str)
+        last = request["messages"][-1]["content"]
+        rounds_done = sum(1 for m in request["messages"]
+                          if m["role"] == "assistant" and isinstance(m["content"], list) and
+                          any(block.get("type") == "tool_use" for block in m["content"]))
+        can_call = request.get("tools") and request.get("tool_choice", {}).get("type") != "none"
+        if can_call and rounds_done < len(self.script) and \
+                (isinstance(last, str) or rounds_done > 0):
+            content = [SimpleNamespace(type="tool_use", id=f"toolu_{self.calls}_{i}",
+                                       name=name, input=args)
+                       for i, (name, args) in enumerate(self.script[rounds_done])]
+            return SimpleNamespace(content=content, stop_reason="tool_use",
+                                   usage=self._usage(request))
+        text = "Here's what I found. " * 12
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)],
+                               stop_reason="end_turn", usage=self._usage(request))
+
+    def create(self, **request):
+        return self._reply(request)
+
+    def stream(self, **request):
+        return FakeStream(self._reply(request))
+
+
+class FakeStream:
+    def __init__(self, message):
+        self.message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for block in self.message.content:
+            if block.type == "text":
+                yield block.text
+
+    def get_final_message(self):
+        return self.message
+
+
+def run_conversation(mode, claude, client, ynab, tools, recall, router):
+    rows = []
+    history = []
+    for prompt, script, needs in CONVERSATION:
+        client.script = script
+        client.seen = ""
+        REQUESTS.clear()
+        intent, _ = router.classify(prompt)
+        route = claude.route(prompt, intent)
+        providers = claude.policy.providers_needed(
+            route, ["recall"] + (["budget"] if intent == "budget" else [])
+        )
+        use_tools = mode == "tools" and route["request_class"] != "trivial"
+        context = {}
+        if not use_tools:
+            # The Chat page's pre-stuffed path
+            if "budget" in providers:
+                context["budget"] = ynab.get_budget_context_for_llm()
+            if "recall" in providers:
+                context["recall"] = recall.search(prompt, k=3)
+        response = "".join(claude.stream_response(
+            prompt, context=context or None, chat_history=history[-6:], intent=intent,
+            tools=tools if use_tools else None
+        ))
+        assert not response.startswith("Error"), response
+        stats = claude.last_stream_stats
+        rows.append({
+            "prompt": prompt,
+            "input": stats["turn_input_tokens"],
+            "cache_read": stats["cache_read_input_tokens"],
+            "cache_write": stats["cache_creation_input_tokens"],
+            "rounds": stats["tool_rounds"],
+            "tools": ",".join(
+                call["name"] + ("*" if call["source"] != "executed" else "")
+                for call in claude.last_tool_calls
+            ),
+            "ynab": len(REQUESTS),
+            "had_data": "-" if needs is None else ("yes" if needs in client.seen else "NO"),
+        })
+        history += [{"role": "user", "content": prompt}, {"role": "assistant", "content": response}]
+    return rows
+
+
+def report(label, rows):
+    print(f"\n{label}")
+    print(f"{'prompt':<58}{'input':>7}{'cache r':>9}{'cache w':>9}{'rounds':>8}{'ynab':>6}"
+          f"{'had data':>10}  tools")
+    for r in rows:
+        print(f"{r['prompt'][:56]:<58}{r['input']:>7}{r['cache_read']:>9}{r['cache_write']:>9}"
+              f"{r['rounds']:>8}{r['ynab']:>6}{r['had_data']:>10}  {r['tools']}")
+    # Cache reads bill at 10% and writes at 125% of the input price
+    billed = sum(r["input"] + 0.1 * r["cache_read"] + 1.25 * r["cache_write"] for r in rows)
+    print(f"{'total':<58}{sum(r['input'] for r in rows):>7}{sum(r['cache_read'] for r in rows):>9}"
+          f"{sum(r['cache_write'] for r in rows):>9}{sum(r['rounds'] for r in rows):>8}"
+          f"{sum(r['ynab'] for r in rows):>6}")
+    print(f"input billed as ~{billed:,.0f} uncached tokens")
+    return billed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=60)
+    parser.add_argument("--transactions", type=int, default=3000)
+    parser.add_argument("--min-cacheable-tokens", type=int, default=1024,
+                        help="shortest prefix the model caches (1024 Sonnet, 2048 Haiku)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # st.* calls outside a Streamlit run
+    workdir = tempfile.mkdtemp(prefix="eval_tool_use_")
+    StubHandler.data = YNABStub(args.categories, args.transactions)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({
+        "YNAB_ACCESS_TOKEN": "stub-token",
+        "YNAB_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "YNAB_LEDGER_DIR": os.path.join(workdir, "ledger"),
+        "ANTHROPIC_API_KEY": "stub-key",
+    })
+
+    from services.assistant_tools import AssistantTools
+    from services.claude_service import ClaudeService
+    from services.intent_router import IntentRouter
+    from services.recall import RecallIndex
+    from services.ynab_service import YNABService
+    from services.ynab_sync import SQLiteSyncStore
+
+    router = IntentRouter.from_file()
+    recall = RecallIndex(path=os.path.join(workdir, "recall"))
+    for question, answer in PAST_EXCHANGES:
+        recall.add(question, answer, "2026-01-01T00:00:00+00:00")
+
+    billed = {}
+    for mode in ("pre-stuffed", "tools"):
+        ynab = YNABService(default_budget_name="Home",
+                           sync_store=SQLiteSyncStore(os.path.join(workdir, f"{mode}.db")))
+        client = FakeClient(args.min_cacheable_tokens)
+        claude = ClaudeService(client=client)
+        tools = AssistantTools(ynab=ynab, recall=recall)
+        rows = run_conversation(mode, claude, client, ynab, tools, recall, router)
+        billed[mode] = report(mode, rows)
+        if mode == "tools":
+            print(f"tool stats: {tools.stats}  (* = served from memo)")
+
+            # New YNAB data changes the version, so the memo must not answer
+            StubHandler.data.spend("Costco", 0, 42)
+            ynab.sync_engine.sync("b1", force=True)
+            turn = {}
+            _, _, source = tools.run("get_category", {"name": "grocer"}, turn)
+            assert source == "executed", "memo served a result from older YNAB data"
+            print("after a YNAB change the same lookup runs again: ok")
+
+    print(f"\ntool mode bills {billed['tools'] / billed['pre-stuffed']:.0%} of the pre-stuffed input")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# benchmarks/fault_injection.py
+"""Fault injection for the YNAB, Supabase and Anthropic clients.
+
+A local stub server stands in for all three upstreams. Each upstream can be
+switched to answer normally, hang, return 500s or drop the connection. For
+every fault the script calls the real service classes several times in a row
+and prints how long each call took, what it returned (fresh data, the
+last-known-good fallback, an empty result or an error) and the circuit state.
+Finally it checks that a recovered upstream closes its circuit again:
+
+    python benchmarks/fault_injection.py --calls 6
+
+Deadlines are shortened with <UPSTREAM>_TIMEOUT_SECONDS so the run is quick.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HANG_SECONDS = 30
+MODES = {"ynab": "ok", "supabase": "ok", "anthropic": "ok"}
+HITS = {"ynab": 0, "supabase": 0, "anthropic": 0}
+
+
+def upstream_for(path):
+    if path.startswith("/v1/messages"):
+        return "anthropic"
+    if path.startswith("/rest/"):
+        return "supabase"
+    return "ynab"
+
+
+class FaultyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        upstream = upstream_for(self.path)
+        HITS[upstream] += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        mode = MODES[upstream]
+        if mode == "hang":
+            time.sleep(HANG_SECONDS)
+            self.close_connection = True
+            return
+        if mode == "drop":
+            # Close the socket without sending a response
+            self.close_connection = True
+            return
+        if mode == "500":
+            self._send(500, {"error": "internal"})
+            return
+        self._send(200, self._payload(upstream))
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def _payload(self, upstream):
+        if upstream == "anthropic":
+            return {
+                "id": "msg_stub", "type": "message", "role": "assistant",
+                "model": "claude-3-haiku-20240307",
+                "content": [{"type": "text", "text": "budget"}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 12, "output_tokens": 1},
+            }
+        if upstream == "supabase":
+            return [{"data": {"cached": True}, "expires_at": "2999-01-01T00:00:00+00:00"}]
+        if self.path == "/v1/budgets":
+            return {"data": {"budgets": [{"id": "b1", "name": "Home"}]}}
+        return {"data": {"month": {
+            "month": date.today().replace(day=1).isoformat(), "budgeted": 500000,
+            "activity": -320000, "age_of_money": 30,
+            "categories": [{"name": "Groceries", "hidden": False, "budgeted": 60000,
+                            "activity": -45000, "balance": 15000}]
+        }}}
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_calls(label, fn, circuit, calls, classify):
+    rows = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        try:
+            outcome = classify(fn())
+        except Exception as e:
+            outcome = f"raised {type(e).__name__}"
+        rows.append(((time.perf_counter() - started) * 1000, outcome, circuit.state))
+    cells = "  ".join(f"{ms:6.0f}ms {outcome:<9} {state:<9}" for ms, outcome, state in rows[:3])
+    tail = rows[-1]
+    print(f"{label:<22}{cells}  ...  {tail[0]:6.1f}ms {tail[1]:<9} {tail[2]}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=6)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FaultyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({
+        "YNAB_ACCESS_TOKEN": "stub", "YNAB_BASE_URL": f"{base}/v1",
+        "SUPABASE_URL": base, "SUPABASE_ANON_KEY": "stub-key",
+        "ANTHROPIC_API_KEY": "stub-key", "ANTHROPIC_BASE_URL": base,
+        "YNAB_TIMEOUT_SECONDS": "0.3,0.5",
+        "SUPABASE_TIMEOUT_SECONDS": "0.3,0.5",
+        "ANTHROPIC_TIMEOUT_SECONDS": "0.3,0.5",
+    })
+    logging.disable(logging.WARNING)  # st.* calls outside a Streamlit run
+
+    from services.claude_service import ClaudeService
+    from services.resilience import CLAUDE_CIRCUIT, SUPABASE_CIRCUIT, YNAB_CIRCUIT
+    from services.supabase_client import SupabaseService
+    from services.ynab_service import YNABService
+
+    ynab = YNABService()
+    supabase = SupabaseService()
+    claude = ClaudeService()
+
+    # Warm up: one good call each, so YNAB has a last-known-good summary
+    fresh = ynab.get_current_month_budget()
+    assert fresh and supabase.get_cached_entry("k") and claude.classify_intent("hi", ["budget"])
+
+    targets = {
+        "ynab": (lambda: ynab.get_current_month_budget(), YNAB_CIRCUIT,
+                 lambda r: "none" if r is None else
+                 ("stale" if ynab.fallback.stale_since("current_month:b1") else "fresh")),
+        "supabase": (lambda: supabase.get_cached_entry("k"), SUPABASE_CIRCUIT,
+                     lambda r: "fresh" if r else "none"),
+        "anthropic": (lambda: claude.classify_intent("hi", ["budget"]), CLAUDE_CIRCUIT,
+                      lambda r: "fresh" if r else "none"),
+    }
+
+    print(f"{'upstream / fault':<22}{'call 1':<28}{'call 2':<28}{'call 3':<28}     last call")
+    for upstream, (fn, circuit, classify) in targets.items():
+        for mode in ("hang", "500", "drop"):
+            circuit.reset()
+            MODES[upstream] = mode
+            HITS[upstream] = 0
+            rows = run_calls(f"{upstream} / {mode}", fn, circuit, args.calls, classify)
+            assert circuit.state == "open", f"{upstream} {mode}: circuit did not open"
+            assert rows[-1][0] < 50, f"{upstream} {mode}: open circuit still waited"
+            if upstream == "ynab":
+                assert rows[-1][1] == "stale", "YNAB did not fall back to last-known-good"
+            print(f"{'':<22}upstream requests: {HITS[upstream]}")
+        MODES[upstream] = "ok"
+
+        # Recovery: after the reset timeout one trial call closes the circuit
+        circuit.reset_timeout_seconds = 0.2
+        time.sleep(0.25)
+        result = fn()
+        assert circuit.state == "closed" and classify(result) == "fresh", f"{upstream} did not recover"
+        print(f"{upstream + ' / recovered':<22}circuit {circuit.state}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/load_test_sessions.py
+"""Simulate N Streamlit sessions hitting the shared services at once.
+
+Each session opens the Dashboard (current-month YNAB summary) and sends one
+chat message. YNAB is a local stub with a fixed per-request delay and Claude
+is a fake client with a fixed response time, so the run is offline:
+
+    python benchmarks/load_test_sessions.py --sessions 20 --delay-ms 80
+
+"uncoordinated" gives every session its own YNABService (the behaviour before
+services were shared); "shared" uses one instance with request coalescing and
+the YNAB hourly token bucket.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUESTS = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        REQUESTS.append(self.path)
+        time.sleep(self.delay)
+        if self.path == "/v1/budgets":
+            data = {"budgets": [{"id": "b1", "name": "Home"}]}
+        else:
+            data = {"month": {
+                "month": date.today().replace(day=1).isoformat(), "budgeted": 500000,
+                "activity": -320000, "age_of_money": 30,
+                "categories": [{"name": "Groceries", "hidden": False, "budgeted": 60000,
+                                "activity": -45000, "balance": 15000}]
+            }}
+        body = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+
+class FakeClaudeClient:
+    """messages.create that sleeps and tracks how many calls overlap"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self.messages = self
+
+    def create(self, **request):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        usage = SimpleNamespace(input_tokens=100, output_tokens=20)
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50 {statistics.median(samples) * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms"
+
+
+def run_sessions(count, session):
+    barrier = threading.Barrier(count)
+
+    def timed(i):
+        barrier.wait()
+        started = time.perf_counter()
+        session(i)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(timed, range(count)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--delay-ms", type=float, default=80)
+    parser.add_argument("--claude-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay_ms / 1000
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["YNAB_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("YNAB_ACCESS_TOKEN", "stub-token")
+
+    from services.claude_service import ClaudeService
+    from services.concurrency import TokenBucket
+    from services.ynab_service import YNABService
+
+    # Session threads have no ScriptRunContext; silence Streamlit's per-call warning
+    logging.disable(logging.WARNING)
+
+    print(f"{args.sessions} concurrent sessions, YNAB stub {args.delay_ms:.0f}ms/request")
+
+    # Unlimited bucket so the baseline shows raw demand
+    unlimited = TokenBucket(capacity=10 ** 6, rate_per_second=10 ** 6)
+    instances = [YNABService(default_budget_name="Home") for _ in range(args.sessions)]
+    for ynab in instances:
+        ynab.rate_limit = unlimited
+    REQUESTS.clear()
+    latencies = run_sessions(args.sessions, lambda i: instances[i].get_current_month_budget())
+    print(f"uncoordinated: {len(REQUESTS)} YNAB requests, {percentiles(latencies)}")
+
+    shared = YNABService(default_budget_name="Home")
+    shared.rate_limit = TokenBucket(capacity=20, rate_per_second=180 / 3600, name="YNAB")
+    REQUESTS.clear()
+    latencies = run_sessions(args.sessions, lambda i: shared.get_current_month_budget())
+    print(f"shared:        {len(REQUESTS)} YNAB requests, {percentiles(latencies)}, "
+          f"{shared._flights.stats['coalesced']} coalesced, "
+          f"{shared.rate_limit.available():.1f} of 20 burst tokens left")
+
+    client = FakeClaudeClient(args.claude_ms / 1000)
+    claude = ClaudeService(client=client)
+    latencies = run_sessions(args.sessions, lambda i: claude.get_response(f"hello {i}"))
+    print(f"claude:        {client.calls} calls, peak {client.peak} concurrent "
+          f"(limit {claude.concurrency.max_concurrent}), {percentiles(latencies)}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# benchmarks/replay_ynab_sync.py
+"""Replay YNAB delta payloads through YNABSyncEngine against a local fake server.
+
+The fake server keeps categories and transactions with the server_knowledge
+at which each last changed, and answers ``last_knowledge_of_server`` requests
+with just the records changed since, deleted ones included, as YNAB does. A
+scripted series of changes is replayed through the real YNABService fetch
+path into a SQLite store, checking after each step what was requested and
+what the store holds:
+
+    python benchmarks/replay_ynab_sync.py
+
+It also checks that concurrent syncs of one budget fetch once, and that a
+SupabaseSyncStore read failure is retried rather than taken for an empty store.
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUESTS = []
+TODAY = date.today()
+
+
+class FakeYNAB:
+    """Budget b1 as YNAB's delta endpoints report it"""
+
+    def __init__(self):
+        self.knowledge = 10
+        self.delay = 0.0
+        self.categories = {
+            f"c{i}": {"id": f"c{i}", "name": name, "hidden": False, "deleted": False,
+                      "budgeted": 300000, "activity": -100000, "balance": 200000, "_knowledge": 10}
+            for i, name in enumerate(["Groceries", "Dining Out", "Rent", "Fun"])
+        }
+        self.transactions = {
+            f"t{i}": {"id": f"t{i}", "date": TODAY.isoformat(), "amount": -20000 - i * 1000,
+                      "payee_name": "Costco", "category_name": "Groceries", "deleted": False,
+                      "_knowledge": 10}
+            for i in range(6)
+        }
+
+    def change(self, records, record_id, **fields):
+        self.knowledge += 1
+        record = records.setdefault(record_id, {"id": record_id, "deleted": False})
+        record.update(fields, _knowledge=self.knowledge)
+
+    def payload(self, path, since):
+        if path.endswith("/categories"):
+            return {"server_knowledge": self.knowledge, "category_groups": [{
+                "name": "Everyday",
+                # A full pull (no knowledge) leaves deleted records out, as YNAB does
+                "categories": [c for c in self.categories.values()
+                               if c["_knowledge"] > since and (since or not c["deleted"])]
+            }]}
+        if path.endswith("/transactions"):
+            return {"server_knowledge": self.knowledge, "transactions": [
+                t for t in self.transactions.values()
+                if t["_knowledge"] > since and (since or not t["deleted"])
+            ]}
+        return {"month": {"month": TODAY.replace(day=1).isoformat(), "age_of_money": 30 + self.knowledge,
+                          "budgeted": 0, "activity": 0, "categories": []}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ynab: FakeYNAB = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        since = int(parse_qs(url.query).get("last_knowledge_of_server", ["0"])[0])
+        REQUESTS.append((url.path.rsplit("/", 1)[-1], "last_knowledge_of_server" in url.query))
+        time.sleep(self.ynab.delay)
+        body = json.dumps({"data": self.ynab.payload(url.path, since)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class NextMonth(date):
+    """date.today() a month ahead, to replay a month rollover"""
+
+    @classmethod
+    def today(cls):
+        return (TODAY.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class FlakySupabase:
+    """get_cached_data fails once, then returns the stored document"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.reads = 0
+
+    def get_cached_data(self, key, raise_errors=False):
+        self.reads += 1
+        if self.reads == 1:
+            if raise_errors:
+                raise ConnectionError("supabase unreachable")
+            return None
+        return self.doc
+
+    def set_cached_data(self, key, data, ttl_minutes=60):
+        self.doc = data
+
+
+def check(label, condition, detail=""):
+    print(f"{'ok' if condition else 'FAIL':<5}{label}{'' if condition else f'  ({detail})'}")
+    return bool(condition)
+
+
+def main():
+    logging.disable(logging.WARNING)  # st.* calls outside a Streamlit run
+    workdir = tempfile.mkdtemp(prefix="replay_ynab_sync_")
+    Handler.ynab = ynab_state = FakeYNAB()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({
+        "YNAB_ACCESS_TOKEN": "stub-token",
+        "YNAB_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "YNAB_LEDGER_DIR": os.path.join(workdir, "ledger"),
+    })
+
+    import services.ynab_sync as ynab_sync
+    from services.concurrency import TokenBucket
+    from services.ynab_service import YNABService
+    from services.ynab_sync import SQLiteSyncStore, SupabaseSyncStore
+
+    store = SQLiteSyncStore(os.path.join(workdir, "sync.sqlite"))
+    ynab = YNABService(default_budget_name="Home", sync_store=store)
+    ynab.rate_limit = TokenBucket(capacity=10 ** 6, rate_per_second=10 ** 6)
+    engine = ynab.sync_engine
+    ids = lambda kind: sorted(r["id"] for r in store.get_records("b1", kind))  # noqa: E731
+    ok = True
+
+    # 1. First sync replaces whatever the store held
+    store.apply("b1", "transactions", [{"id": "stale", "deleted": False}], 3)
+    store.set_meta("b1", "synced_month", TODAY.replace(day=1).isoformat())
+    store.apply("b1", "categories", [{"id": "stale", "name": "Old", "deleted": False}], 3)
+    with store._lock, store._conn:
+        store._conn.execute("UPDATE sync_state SET server_knowledge = NULL WHERE kind = 'transactions'")
+    REQUESTS.clear()
+    engine.sync("b1", force=True)
+    ok &= check("first sync replaces stale transactions", ids("transactions") == [f"t{i}" for i in range(6)],
+                ids("transactions"))
+    ok &= check("first transaction pull has no knowledge", ("transactions", False) in REQUESTS, REQUESTS)
+
+    # 2. Deltas: a deletion, an addition and a changed category
+    ynab_state.change(ynab_state.transactions, "t2", deleted=True)
+    ynab_state.change(ynab_state.transactions, "t9", date=TODAY.isoformat(), amount=-5000,
+                      payee_name="Shell", category_name="Fun")
+    ynab_state.change(ynab_state.categories, "c0", name="Groceries", hidden=False, budgeted=400000,
+                      activity=-150000, balance=250000)
+    REQUESTS.clear()
+    changed = engine.sync("b1", force=True)
+    ok &= check("delta requests carry knowledge", all(with_knowledge for _, with_knowledge in REQUESTS[:2]),
+                REQUESTS)
+    ok &= check("deleted transaction removed", "t2" not in ids("transactions") and "t9" in ids("transactions"),
+                ids("transactions"))
+    ok &= check("only changed records sent", changed == {"categories": 1, "transactions": 2}, changed)
+    groceries = next(c for c in store.get_records("b1", "categories") if c["id"] == "c0")
+    ok &= check("changed category merged, others kept",
+                groceries["budgeted"] == 400000 and "c3" in ids("categories"), ids("categories"))
+    ok &= check("age of money refreshed with transactions",
+                store.get_meta("b1", "age_of_money") == 30 + ynab_state.knowledge)
+
+    # 3. Nothing changed: no records rewritten, no month fetch
+    REQUESTS.clear()
+    changed = engine.sync("b1", force=True)
+    ok &= check("empty delta touches only", changed == {"categories": 0, "transactions": 0}
+                and "current" not in [path for path, _ in REQUESTS], (changed, REQUESTS))
+
+    # 4. Month rollover: categories are pulled in full and replaced
+    ynab_state.change(ynab_state.categories, "c1", deleted=True)
+    ynab_sync.date = NextMonth
+    try:
+        REQUESTS.clear()
+        engine.sync("b1")  # within the interval, but a new month forces it
+        ok &= check("rollover pulls categories in full", ("categories", False) in REQUESTS, REQUESTS)
+        ok &= check("rollover drops categories gone from the full list", "c1" not in ids("categories"),
+                    ids("categories"))
+        ok &= check("rollover records the new month",
+                    store.get_meta("b1", "synced_month") == NextMonth.today().replace(day=1).isoformat())
+    finally:
+        ynab_sync.date = date
+    store.set_meta("b1", "synced_month", TODAY.replace(day=1).isoformat())
+
+    # 5. Concurrent callers once the interval has passed: one fetch
+    engine.min_sync_interval_seconds = 0.3
+    time.sleep(0.4)
+    ynab_state.delay = 0.2
+    REQUESTS.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engine.sync("b1"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    category_pulls = sum(path == "categories" for path, _ in REQUESTS)
+    syncs = sum(bool(result) for result in results)
+    ok &= check("concurrent syncs fetch once", category_pulls == 1 and syncs == 1,
+                f"{category_pulls} category pulls, {syncs} syncs")
+
+    # 6. A failed Supabase read is not remembered as an empty store
+    supabase = FlakySupabase({"server_knowledge": 42, "synced_at": 1.0, "records": {}})
+    supabase_store = SupabaseSyncStore(supabase)
+    first = supabase_store.get_knowledge("b1", "categories")
+    second = supabase_store.get_knowledge("b1", "categories")
+    ok &= check("failed Supabase read retried", first is None and second == 42, (first, second))
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+-- migrations/001_chat_history_keyset_index.sql
+-- Composite index backing keyset pagination in SupabaseService.get_chat_history_page:
+--   ORDER BY created_at DESC, id DESC
+--   WHERE created_at < :ts OR (created_at = :ts AND id < :id)
+-- Run in the Supabase SQL editor. CONCURRENTLY avoids locking writes to chat_history
+-- (it cannot run inside a transaction block).
+
+create index concurrently if not exists chat_history_created_at_id_idx
+    on public.chat_history (created_at desc, id desc);
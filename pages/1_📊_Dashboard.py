@@ -1,11 +1,13 @@
 # pages/1_📊_Dashboard.py
-import os
 import streamlit as st
-import plotly.graph_objects as go
 from datetime import datetime
 from utils.auth import check_password
-from services.ynab_service import YNABService
-from services.supabase_client import SupabaseService
+from services.shared import (
+    LazyServices, get_calendar, get_metrics_server,
+    get_readiness_monitor, get_supabase, get_ynab
+)
+from services.dashboard_snapshot import DashboardSnapshotRefresher, snapshot_age_seconds
+from services.resilience import CLAUDE_CIRCUIT
 
 st.set_page_config(
     page_title="Dashboard",
@@ -16,74 +18,51 @@ st.set_page_config(
 if not check_password():
     st.stop()
 
-# Initialize services
-@st.cache_resource
-def init_services():
-    return {
-        "ynab": YNABService(default_budget_name=os.getenv("YNAB_DEFAULT_BUDGET_NAME")),
-        "supabase": SupabaseService()
-    }
-
-services = init_services()
-
 st.title("📊 Dashboard")
-st.caption(f"Updated: {datetime.now().strftime('%I:%M %p')}")
-
-# Top metrics
-col1, col2, col3 = st.columns(3)
-
-# Get budget data (with caching)
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_budget_summary():
-    # Try cache first
-    cached = services["supabase"].get_cached_data("budget_summary", max_age_minutes=5)
-    if cached:
-        return cached
-    
-    # Get fresh data
-    summary = services["ynab"].get_current_month_budget()
-    if summary:
-        # Cache it
-        services["supabase"].set_cached_data("budget_summary", summary, ttl_minutes=5)
-    return summary
-
-budget_data = get_budget_summary()
-
-with col1:
-    if budget_data:
-        st.metric(
-            "Budget Remaining",
-            f"${budget_data['remaining']:,.0f}",
-            f"-${budget_data['spent']:,.0f} spent"
-        )
-    else:
-        st.metric("Budget", "Not connected", "Connect YNAB →")
-
-with col2:
-    st.metric("Next Event", "Coming soon", "Calendar integration pending")
-
-with col3:
-    recent_chats = services["supabase"].get_chat_history(1)
-    if recent_chats:
-        st.metric("Last Chat", "Active", "✅ Claude connected")
-    else:
-        st.metric("Chat Status", "Ready", "Start chatting →")
 
-st.divider()
-
-# Budget Details
-if budget_data:
-    st.subheader("💰 Budget Overview")
+# Initialize services: each is built the first time this page needs it
+@st.cache_resource
+def get_snapshot_refresher():
+    # Keeps a materialized dashboard snapshot fresh in the background
+    return DashboardSnapshotRefresher(get_ynab()).start()
+
+services = LazyServices({
+    "ynab": get_ynab,
+    "supabase": get_supabase,
+    "calendar": get_calendar,
+    "snapshot": get_snapshot_refresher
+})
+get_metrics_server()
+
+# Parts of the page rerun on their own: a button press or refresh tick only
+# re-executes its fragment, not the whole dashboard
+STATUS_REFRESH_SECONDS = 30  # metrics row: next event, Claude status
+BUDGET_REFRESH_SECONDS = 120  # charts: picks up snapshots built in the background
+FIRST_BUILD_WAIT_SECONDS = 30  # then the page renders without budget data
+
+# Page loads read the latest materialized snapshot; only the very first
+# load (no snapshot yet) waits for the refresher's first build
+if services["snapshot"].latest() is None and services["ynab"].is_connected:
+    services["snapshot"].wait(timeout=FIRST_BUILD_WAIT_SECONDS)
+
+
+@st.cache_resource(max_entries=4)
+def budget_figures(snapshot_key, _snapshot):
+    """Plotly figures for one snapshot, built once and shared by every session"""
+    # Plotly is only loaded when there are charts to draw
+    import plotly.graph_objects as go
     
-    # Create gauge chart
-    fig = go.Figure(go.Indicator(
+    budget_data = _snapshot["budget"]
+    gauge = _snapshot["gauge"]
+    figures = {}
+    figures["gauge"] = go.Figure(go.Indicator(
         mode = "gauge+number+delta",
-        value = budget_data['remaining'],
+        value = gauge['value'],
         title = {'text': "Budget Remaining"},
-        delta = {'reference': budget_data['budgeted']},
+        delta = {'reference': gauge['reference']},
         gauge = {
-            'axis': {'range': [None, budget_data['budgeted']]},
-            'bar': {'color': "green" if budget_data['remaining'] > 0 else "red"},
+            'axis': {'range': [None, gauge['reference']]},
+            'bar': {'color': "red" if gauge['over_budget'] else "green"},
             'steps': [
                 {'range': [0, budget_data['budgeted']*0.5], 'color': "lightgray"},
                 {'range': [budget_data['budgeted']*0.5, budget_data['budgeted']*0.8], 'color': "gray"}
@@ -95,8 +74,90 @@ if budget_data:
             }
         }
     ))
-    fig.update_layout(height=250)
-    st.plotly_chart(fig, use_container_width=True)
+    figures["gauge"].update_layout(height=250)
+    
+    insights = _snapshot["insights"]
+    if insights:
+        figures["trend"] = go.Figure(go.Bar(
+            x=[m["month"] for m in insights["monthly"]],
+            y=[m["spent"] for m in insights["monthly"]]
+        ))
+        figures["trend"].update_layout(height=250, margin=dict(t=20, b=20))
+    
+    # Budgeted vs. spent over the last 6 months (closed months come from cache)
+    history = _snapshot["history"]
+    if len(history) > 1:
+        figures["history"] = go.Figure([
+            go.Bar(name="Budgeted", x=[m["month"] for m in history], y=[m["budgeted"] for m in history]),
+            go.Bar(name="Spent", x=[m["month"] for m in history], y=[m["spent"] for m in history])
+        ])
+        figures["history"].update_layout(barmode="group", height=250, margin=dict(t=20, b=20))
+    return figures
+
+
+@st.fragment(run_every=STATUS_REFRESH_SECONDS)
+def top_metrics():
+    snapshot = services["snapshot"].latest()
+    if snapshot:
+        age_minutes = snapshot_age_seconds(snapshot) / 60
+        generated = datetime.fromisoformat(snapshot["generated_at"]).astimezone()
+        st.caption(
+            f"Updated: {generated.strftime('%I:%M %p')} "
+            f"({age_minutes:.0f} min ago · snapshot v{snapshot['version']})"
+        )
+    else:
+        st.caption(f"Updated: {datetime.now().strftime('%I:%M %p')}")
+    
+    budget_data = snapshot["budget"] if snapshot else None
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if budget_data:
+            st.metric(
+                "Budget Remaining",
+                f"${budget_data['remaining']:,.0f}",
+                f"-${budget_data['spent']:,.0f} spent"
+            )
+        else:
+            st.metric("Budget", "Not connected", "Connect YNAB →")
+    
+    with col2:
+        # Read from the locally synced event index; no Calendar API call
+        calendar = services["calendar"]
+        next_event = calendar.next_event() if calendar.is_connected else None
+        if next_event:
+            st.metric("Next Event", next_event["summary"],
+                      calendar.describe(next_event, with_day=True), delta_color="off")
+        elif calendar.is_connected:
+            st.metric("Next Event", "Nothing scheduled", "Calendar connected", delta_color="off")
+        else:
+            st.metric("Next Event", "Not connected", "Connect Google Calendar →")
+    
+    with col3:
+        # Probed in the background so the page never waits on Anthropic
+        claude_status = get_readiness_monitor().check("anthropic")
+        if CLAUDE_CIRCUIT.is_open():
+            st.metric("Chat Status", "Unavailable", "Claude failing, retrying shortly", delta_color="off")
+        elif claude_status is None:
+            st.metric("Chat Status", "Checking...", "Start chatting →")
+        elif claude_status["ok"]:
+            st.metric("Chat Status", "Ready", "✅ Claude connected")
+        else:
+            st.metric("Chat Status", "Unavailable", "Claude not reachable", delta_color="off")
+
+
+@st.fragment(run_every=BUDGET_REFRESH_SECONDS)
+def budget_details():
+    snapshot = services["snapshot"].latest()
+    if not snapshot:
+        st.info("👉 Add your YNAB access token to see budget data")
+        return
+    
+    budget_data = snapshot["budget"]
+    figures = budget_figures((snapshot["version"], snapshot["generated_at"]), snapshot)
+    
+    st.subheader("💰 Budget Overview")
+    st.plotly_chart(figures["gauge"], use_container_width=True)
     
     # Top categories
     st.subheader("Top Spending Categories")
@@ -106,31 +167,73 @@ if budget_data:
             min(progress, 1.0),  # Cap at 100%
             text=f"{cat['name']}: ${cat['spent']:,.0f} / ${cat['budgeted']:,.0f}"
         )
-else:
-    st.info("👉 Add your YNAB access token to see budget data")
-
-# Add this to pages/1_📊_Dashboard.py after the metrics section:
-
-# Quick Actions Section
-st.subheader("⚡ Quick Actions")
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    if st.button("💬 Ask about budget", use_container_width=True):
-        st.switch_page("pages/2_💬_Chat.py")
-
-with col2:
-    if st.button("🔄 Refresh Data", use_container_width=True):
-        st.cache_data.clear()
-        st.rerun()
-
-with col3:
-    if st.button("📊 View Full Budget", use_container_width=True):
-        st.info("This will open YNAB web app")
-        st.markdown("[Open YNAB →](https://app.youneedabudget.com)")
+    
+    # Spending trends from the synced transaction history
+    insights = snapshot["insights"]
+    if insights:
+        st.subheader("📈 Spending Trends")
+        
+        trend_col1, trend_col2, trend_col3 = st.columns(3)
+        with trend_col1:
+            st.metric("Burn Rate", f"${insights['burn_rate_per_day']:,.0f}/day")
+        with trend_col2:
+            st.metric("Projected This Month", f"${insights['projected_month_spend']:,.0f}")
+        with trend_col3:
+            if insights["month_over_month"] is not None:
+                st.metric(
+                    "Last Month",
+                    f"${insights['monthly'][-2]['spent']:,.0f}",
+                    f"{insights['month_over_month']:+.0%} vs month before",
+                    delta_color="inverse"
+                )
+        
+        st.plotly_chart(figures["trend"], use_container_width=True)
+        
+        if insights["top_payees"]:
+            st.caption("Top payees this month: " + ", ".join(
+                f"{p['payee']} (${p['spent']:,.0f})" for p in insights["top_payees"]
+            ))
+    
+    if "history" in figures:
+        st.subheader("📆 Monthly History")
+        st.plotly_chart(figures["history"], use_container_width=True)
 
-with col4:
-    if st.button("📅 Today's Events", use_container_width=True):
-        st.info("Calendar integration coming soon")
 
+@st.fragment
+def quick_actions():
+    st.subheader("⚡ Quick Actions")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        if st.button("💬 Ask about budget", use_container_width=True):
+            st.switch_page("pages/2_💬_Chat.py")
+    
+    with col2:
+        if st.button("🔄 Refresh Data", use_container_width=True):
+            services["snapshot"].refresh_now(force=True)
+            # New data for every section, so rerun the whole page
+            st.rerun(scope="app")
+    
+    with col3:
+        if st.button("📊 View Full Budget", use_container_width=True):
+            st.info("This will open YNAB web app")
+            st.markdown("[Open YNAB →](https://app.youneedabudget.com)")
+    
+    with col4:
+        if st.button("📅 Today's Events", use_container_width=True):
+            calendar = services["calendar"]
+            if not calendar.is_connected:
+                st.info("👉 Add GOOGLE_CALENDAR_CREDENTIALS to see your events")
+            else:
+                events = calendar.todays_events()
+                if not events:
+                    st.info("No events today")
+                for event in events:
+                    st.write(f"**{event['summary']}** · {calendar.describe(event)}")
+
+
+top_metrics()
+st.divider()
+budget_details()
+quick_actions()
 st.divider()
@@ -1,10 +1,15 @@
 # pages/2_💬_Chat.py
 import os
+import threading
 import streamlit as st
 from utils.auth import check_password
-from services.claude_service import ClaudeService
-from services.supabase_client import SupabaseService
-from services.ynab_service import YNABService
+from services.context import ContextAssembler
+from services.conversation_memory import ConversationMemory
+from services.shared import (
+    LazyServices, get_calendar, get_claude, get_metrics_server,
+    get_readiness_monitor, get_supabase, get_ynab
+)
+from utils.metrics import METRICS
 
 st.set_page_config(
     page_title="Chat",
@@ -14,90 +19,302 @@ st.set_page_config(
 if not check_password():
     st.stop()
 
-# Initialize services
+st.title("💬 Chat Assistant")
+
+# Initialize services: each is built the first time this page needs it
 @st.cache_resource
-def init_services():
-    return {
-        "claude": ClaudeService(),
-        "supabase": SupabaseService(),
-        "ynab": YNABService(default_budget_name=os.getenv("YNAB_DEFAULT_BUDGET_NAME"))
-    }
+def get_recall():
+    from services.recall import RecallIndex
+    recall = RecallIndex()
+    # Backfill from Supabase in the background; searches see what's loaded so far
+    threading.Thread(
+        target=recall.sync_from_supabase, args=(get_supabase(),),
+        name="recall-sync", daemon=True
+    ).start()
+    return recall
 
-services = init_services()
+@st.cache_resource
+def get_router():
+    from services.intent_router import IntentRouter
+    # Decides which context to fetch; Claude only breaks low-confidence ties
+    return IntentRouter.from_file(
+        fallback=lambda message, intents: get_claude().classify_intent(message, intents)
+    )
 
-st.title("💬 Chat Assistant")
+@st.cache_resource
+def get_tools():
+    from services.assistant_tools import AssistantTools
+    # Budget and history lookups Claude calls on demand instead of pre-stuffed context
+    return AssistantTools(ynab=get_ynab(), recall=get_recall())
 
-# Sidebar info
-with st.sidebar:
+services = LazyServices({
+    "claude": get_claude,
+    "router": get_router,
+    "supabase": get_supabase,
+    "recall": get_recall,
+    "ynab": get_ynab,
+    "calendar": get_calendar,
+    "tools": get_tools
+})
+get_metrics_server()
+
+HISTORY_PAGE_SIZE = 5  # chat turns per "load older" page
+RENDER_WINDOW = 40  # messages rendered by default
+# Let Claude fetch budget data and past exchanges through tools (CHAT_TOOL_MODE=1).
+# Off by default: tool rounds read earlier rounds from the prompt cache, but the
+# tools+system prefix (~540 tokens) is under the 1024-token cache minimum, and
+# eval_tool_use still measures ~3.5x the billed input of pre-stuffed context.
+TOOL_MODE = os.getenv("CHAT_TOOL_MODE", "0") == "1"
+
+# Sidebar sections and the conversation rerun as separate fragments, so a
+# chat turn doesn't re-execute the sidebar or re-render stored messages
+STATUS_REFRESH_SECONDS = 30
+DETAILS_REFRESH_SECONDS = 15
+
+
+def new_assembler():
+    """Context providers for one chat turn: fetched concurrently, at most once each"""
+    assembler = ContextAssembler(deadlines={"budget": 5.0, "history": 8.0, "recall": 0.5, "calendar": 0.5})
+    assembler.add_provider("budget", services["ynab"].get_budget_context_for_llm)
+    # Served from the local event index, so it never waits on Google
+    assembler.add_provider("calendar", services["calendar"].get_calendar_context_for_llm)
+    return assembler
+
+
+@st.fragment(run_every=STATUS_REFRESH_SECONDS)
+def connection_status():
     st.subheader("Connected Services")
     
-    # Check YNAB connection
-    if services["ynab"].is_connected:
-        budget_context = services["ynab"].get_budget_context_for_llm()
-        if "Budget information not available" not in budget_context:
-            st.success("✅ YNAB Connected")
-        else:
-            st.warning("⚠️ YNAB Token Invalid")
-    else:
+    # Check YNAB connection (probed in the background, never blocks the page)
+    ynab_status = get_readiness_monitor().check("ynab")
+    if not services["ynab"].is_connected:
         st.info("➕ Add YNAB token in .env")
+    elif ynab_status is None:
+        st.info("⏳ Checking YNAB connection...")
+    elif ynab_status["ok"]:
+        st.success("✅ YNAB Connected")
+    elif ynab_status.get("status_code") == 401:
+        st.warning("⚠️ YNAB Token Invalid")
+    else:
+        st.warning("⏳ YNAB is not responding")
+    
+    calendar = services["calendar"]
+    if not calendar.is_connected:
+        st.info("➕ Add Google Calendar credentials in .env")
+    elif calendar.last_error:
+        st.warning("⏳ Calendar sync failing; showing last synced events")
+    else:
+        st.success("✅ Calendar Connected")
+
+
+@st.fragment(run_every=DETAILS_REFRESH_SECONDS)
+def assistant_details():
+    # Show the context Claude was given for the last message
+    if st.checkbox("Show Assistant Context"):
+        last_context = st.session_state.get("last_context") or {}
+        st.text_area("Budget Context", last_context.get("budget") or "", height=200)
+        st.text_area("Calendar Context", last_context.get("calendar") or "", height=200)
+    
+    # Token usage (including prompt-cache reads/writes) and persistence queue
+    if st.checkbox("Show Usage Stats"):
+        st.json({
+            "last_response": services["claude"].last_stream_stats,
+            "session_totals": services["claude"].usage_totals,
+            "context_timings": st.session_state.get("context_timings", {}),
+            "tools": services["tools"].stats if TOOL_MODE else None,
+            "response_cache": getattr(services["claude"].response_cache, "stats", None),
+            "chat_persistence": services["supabase"].chat_writer.stats(),
+            "upstream_metrics": METRICS.snapshot()
+        })
+
+
+# Sidebar info
+with st.sidebar:
+    connection_status()
     
     st.divider()
     
     if st.button("Clear Chat History"):
         st.session_state.messages = []
+        st.session_state.history_cursor = None
+        st.session_state.render_limit = RENDER_WINDOW
+        st.session_state.older_loaded = 0
+        if "memory" in st.session_state:
+            st.session_state.memory.reset()
         st.rerun()
     
-    # Show context that Claude has
-    if st.checkbox("Show Assistant Context"):
-        st.text_area("Budget Context", services["ynab"].get_budget_context_for_llm(), height=200)
+    assistant_details()
 
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-    # Load recent history from Supabase
-    recent_chats = services["supabase"].get_chat_history(5)
-    for chat in reversed(recent_chats):  # Reverse to get chronological order
-        st.session_state.messages.append({
+def chats_to_messages(chats):
+    """Convert chat_history rows (newest first) into chronological messages"""
+    messages = []
+    for chat in reversed(chats):  # Reverse to get chronological order
+        messages.append({
             "role": "user", 
             "content": chat["user_message"]
         })
-        st.session_state.messages.append({
+        messages.append({
             "role": "assistant", 
             "content": chat["assistant_response"]
         })
+    return messages
+
+
+def load_older_messages():
+    """Reveal already-loaded messages first, then fetch the next page from Supabase"""
+    hidden = len(st.session_state.messages) - st.session_state.render_limit
+    if hidden > 0:
+        st.session_state.render_limit += min(hidden, HISTORY_PAGE_SIZE * 2)
+        return
+    
+    chats, cursor = services["supabase"].get_chat_history_page(
+        before=st.session_state.history_cursor,
+        limit=HISTORY_PAGE_SIZE
+    )
+    older = chats_to_messages(chats)
+    st.session_state.messages = older + st.session_state.messages
+    st.session_state.history_cursor = cursor
+    st.session_state.render_limit += len(older)
+    # Older pages are for reading only; the model's history window stays put
+    st.session_state.older_loaded += len(older)
+
+
+# Initialize chat history
+if "messages" not in st.session_state:
+    # Load recent history from Supabase
+    recent_chats, cursor = services["supabase"].get_chat_history_page(limit=HISTORY_PAGE_SIZE)
+    st.session_state.messages = chats_to_messages(recent_chats)
+    st.session_state.history_cursor = cursor
+    st.session_state.render_limit = RENDER_WINDOW
+    st.session_state.older_loaded = 0
 
-# Display messages
-for message in st.session_state.messages:
+# Per-session conversation memory (token-budgeted history + rolling summary)
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory(
+        summarize=lambda text: services["claude"].summarize_text(text, max_length=200),
+        token_budget=int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+    )
+
+# Display only the most recent messages; older ones load on request
+if len(st.session_state.messages) > st.session_state.render_limit or st.session_state.history_cursor:
+    st.button("⬆️ Load older messages", on_click=load_older_messages)
+
+for message in st.session_state.messages[-st.session_state.render_limit:]:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
+# Everything up to here stays on screen while the conversation fragment reruns
+st.session_state.rendered_upto = len(st.session_state.messages)
 
-# Chat input
-if prompt := st.chat_input("Ask about your budget, schedule, or anything else..."):
-    # Add user message to UI
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.chat_message("user"):
-        st.markdown(prompt)
-    
-    # Get context for Claude
-    context = {}
-    
-    # Add budget context if asking about money/budget
-    budget_keywords = ["budget", "money", "spend", "spending", "expense", "cost", "afford", "save", "saving"]
-    if any(keyword in prompt.lower() for keyword in budget_keywords):
-        context["budget"] = services["ynab"].get_budget_context_for_llm()
+
+@st.fragment
+def conversation():
+    # Turns added since the last full run; older messages were rendered above
+    for message in st.session_state.messages[st.session_state.rendered_upto:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
     
-    # Get Claude's response
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response = services["claude"].get_response(
-                user_message=prompt,
-                context=context if context else None,
-                chat_history=st.session_state.messages[-10:]  # Send last 5 exchanges
+    # Chat input
+    if prompt := st.chat_input("Ask about your budget, schedule, or anything else..."):
+        assembler = new_assembler()
+        
+        # Add user message to UI
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+        
+        # Get context for Claude
+        context = {}
+        
+        # The intent router decides which external context is worth fetching,
+        # and trivial prompts (greetings, thanks) skip it entirely
+        from services.intent_router import INTENT_PROVIDERS
+        intent, _ = services["router"].classify(prompt)
+        route = services["claude"].route(prompt, intent)
+        providers = services["claude"].policy.providers_needed(
+            route, ["history", "recall"] + INTENT_PROVIDERS.get(intent, [])
+        )
+        # With tools, Claude looks up budget figures and older exchanges itself when needed
+        tools = services["tools"] if TOOL_MODE and route["request_class"] != "trivial" else None
+        if tools:
+            providers = [name for name in providers if name not in ("budget", "recall")]
+        
+        # The budget read is the slowest provider; start it while the others are set up
+        if "budget" in providers:
+            assembler.prefetch("budget")
+        
+        # Earlier turns (not the prompt itself) are fitted to the history token budget.
+        # Worker threads can't touch session state, so capture what they need here.
+        memory = st.session_state.memory
+        earlier = st.session_state.messages[st.session_state.older_loaded:-1]
+        assembler.add_provider("history", lambda: memory.pack(earlier))
+        assembler.add_provider("recall", lambda: services["recall"].search(prompt, k=3))
+        
+        defaults = {
+            # If summarizing is slow, fall back to the last summary and recent turns
+            "history": (memory.summary, earlier[-10:]),
+            "recall": []
+        }
+        # Providers the route skipped (e.g. recall for trivial prompts) keep their defaults
+        results = {**defaults, **assembler.gather(providers, defaults=defaults)}
+        st.session_state.context_timings = assembler.timings
+        
+        if results.get("budget"):
+            context["budget"] = results["budget"]
+        if results.get("calendar"):
+            context["calendar"] = results["calendar"]
+        from services.ynab_service import BUDGET_UNAVAILABLE
+        data_version = services["ynab"].get_data_version() if "budget" in context else None
+        if data_version and context["budget"] != BUDGET_UNAVAILABLE:
+            # Lets Claude reuse its cached context block until the budget data changes.
+            # The calendar text is built locally and shifts as events pass, so it is
+            # part of the version as is.
+            context["version"] = (data_version, context.get("calendar"))
+        
+        history_summary, history = results["history"]
+        if history_summary:
+            context["history_summary"] = history_summary
+        
+        # Recall relevant older exchanges that are not already in the history window
+        in_window = {message["content"] for message in history}
+        recalled = [
+            item for item in results["recall"]
+            if item["user_message"] not in in_window
+        ]
+        if recalled:
+            context["recall"] = recalled
+        st.session_state.last_context = context
+        
+        # Cached answers are keyed on the YNAB data version, so turns that read
+        # budget data pull pending changes first (a no-op once the budget
+        # context has synced within the interval)
+        if tools or intent == "budget":
+            services["ynab"].get_data_version(refresh=True)
+        
+        # Stream Claude's response token by token
+        with st.chat_message("assistant"):
+            response = st.write_stream(
+                services["claude"].stream_response(
+                    user_message=prompt,
+                    context=context if context else None,
+                    chat_history=history,
+                    intent=intent,
+                    tools=tools
+                )
             )
-            st.markdown(response)
-    
-    # Add assistant response to session
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    
-    # Save to Supabase
-    services["supabase"].save_chat(prompt, response)
\ No newline at end of file
+            if services["claude"].last_stream_stats.get("cached"):
+                st.caption("⚡ Answered from cache; your budget data hasn't changed since")
+            if services["claude"].last_tool_calls:
+                with st.expander("🔧 Looked up"):
+                    for call in services["claude"].last_tool_calls:
+                        source = "" if call["source"] == "executed" else f" ({call['source']})"
+                        st.caption(f"{call['name']} {call['input']}{source}")
+        
+        # Add assistant response to session
+        st.session_state.messages.append({"role": "assistant", "content": response})
+        
+        # Save to Supabase and make the exchange recallable
+        saved = services["supabase"].save_chat(prompt, response)
+        services["recall"].add(prompt, response, saved["created_at"])
+
+
+conversation()
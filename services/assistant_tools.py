@@ -0,0 +1,220 @@
+# services/assistant_tools.py
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Anthropic tool definitions. Descriptions tell the model when to call each tool.
+BUDGET_TOOLS = [
+    {
+        "name": "get_month_summary",
+        "description": (
+            "Budget totals for a month from YNAB: budgeted, spent, remaining, age of money "
+            "and the top spending categories. For the current month it also returns the "
+            "daily burn rate and projected spend. Use for overall 'how am I doing' questions."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "month": {
+                    "type": "string",
+                    "description": "Month as YYYY-MM; omit for the current month"
+                }
+            }
+        }
+    },
+    {
+        "name": "get_category",
+        "description": (
+            "Current-month budgeted, spent and remaining amounts for budget categories whose "
+            "name contains the given text (case-insensitive), e.g. 'grocer' or 'dining'."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "description": "Category name or part of it"}
+            },
+            "required": ["name"]
+        }
+    },
+    {
+        "name": "search_transactions",
+        "description": (
+            "Search synced YNAB transactions by payee and/or category text and a date "
+            "range. Returns the match count, total spent across all matches and the newest "
+            "matching transactions (negative amounts are spending)."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "payee": {"type": "string", "description": "Payee name or part of it"},
+                "category": {"type": "string", "description": "Category name or part of it"},
+                "since": {"type": "string", "description": "Earliest date, YYYY-MM-DD"},
+                "until": {"type": "string", "description": "Latest date, YYYY-MM-DD"},
+                "limit": {"type": "integer", "description": "Transactions to list (max 25)"}
+            }
+        }
+    },
+]
+
+HISTORY_TOOLS = [
+    {
+        "name": "search_history",
+        "description": (
+            "Search earlier conversations with the user for exchanges related to a topic. "
+            "Use when the user refers to something discussed before."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "What to look for"}
+            },
+            "required": ["query"]
+        }
+    },
+]
+
+TOOL_PROMPT = (
+    "Use the tools to look up budget figures, categories, transactions or earlier "
+    "conversations whenever an answer depends on them; never guess amounts. "
+    "Today is {today}."
+)
+
+
+class AssistantTools:
+    """YNAB and conversation-history lookups exposed to Claude as tools.
+    
+    Results are memoized per turn (repeat calls in one tool loop are free) and,
+    for budget tools, across turns until the YNAB data version changes.
+    """
+    
+    def __init__(self, ynab=None, recall=None, max_memo_entries: int = 256):
+        self.ynab = ynab
+        self.recall = recall
+        self.max_memo_entries = max_memo_entries
+        self._memo: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "turn_hits": 0, "memo_hits": 0, "errors": 0}
+        
+        self._handlers: Dict[str, Callable[[Dict], Any]] = {}
+        if ynab is not None and ynab.is_connected:
+            self._handlers.update({
+                "get_month_summary": self._month_summary,
+                "get_category": self._category,
+                "search_transactions": self._search_transactions,
+            })
+        if recall is not None:
+            self._handlers["search_history"] = self._search_history
+    
+    def definitions(self) -> List[Dict]:
+        """Tool definitions for the messages API (only tools that can run here)"""
+        return [tool for tool in BUDGET_TOOLS + HISTORY_TOOLS if tool["name"] in self._handlers]
+    
+    def __bool__(self):
+        return bool(self._handlers)
+    
+    def _version(self, name: str) -> Optional[str]:
+        """Data version a tool's result is valid for; None means this turn only"""
+        if name == "search_history":
+            return None  # every turn adds history
+        return self.ynab.get_data_version()
+    
+    def run(self, name: str, args: Dict, turn: Dict) -> Tuple[str, bool, str]:
+        """Run a tool call; returns (JSON result, is_error, source).
+        
+        ``turn`` is the caller's per-turn memo. source is "turn", "memo" or "executed".
+        """
+        key = (name, json.dumps(args, sort_keys=True))
+        with self._lock:
+            self.stats["calls"] += 1
+        if key in turn:
+            with self._lock:
+                self.stats["turn_hits"] += 1
+            return turn[key], False, "turn"
+        
+        version = self._version(name) if name in self._handlers else None
+        if version is not None:
+            with self._lock:
+                cached = self._memo.get((version,) + key)
+                if cached is not None:
+                    self._memo.move_to_end((version,) + key)
+                    self.stats["memo_hits"] += 1
+            if cached is not None:
+                turn[key] = cached
+                return cached, False, "memo"
+        
+        handler = self._handlers.get(name)
+        if handler is None:
+            return json.dumps({"error": f"Unknown tool: {name}"}), True, "executed"
+        try:
+            with self._lock:
+                self.stats["executions"] += 1
+            result = handler(args)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            return json.dumps({"error": str(e)}), True, "executed"
+        if result is None:
+            return json.dumps({"error": "Data not available right now"}), True, "executed"
+        
+        text = json.dumps(result, separators=(",", ":"), default=str)
+        turn[key] = text
+        # Read the version again: the lookup itself may have synced newer data
+        version = self._version(name)
+        if version is not None:
+            with self._lock:
+                self._memo[(version,) + key] = text
+                while len(self._memo) > self.max_memo_entries:
+                    self._memo.popitem(last=False)
+        return text, False, "executed"
+    
+    def _month_summary(self, args: Dict) -> Optional[Dict]:
+        month = args.get("month")
+        current = date.today().strftime("%Y-%m")
+        if not month or month == current:
+            summary = self.ynab.get_current_month_budget()
+            if summary is None:
+                return None
+            insights = self.ynab.get_spending_insights()
+            if insights:
+                summary = dict(
+                    summary,
+                    burn_rate_per_day=round(insights["burn_rate_per_day"], 2),
+                    projected_month_spend=round(insights["projected_month_spend"], 2),
+                    last_month_vs_month_before=insights["month_over_month"]
+                )
+            return summary
+        summaries = self.ynab.get_month_range(start=f"{month}-01", end=f"{month}-01")
+        return summaries[0] if summaries else {"error": f"No budget data for {month}"}
+    
+    def _category(self, args: Dict) -> Optional[Dict]:
+        categories = self.ynab.get_categories()
+        if categories is None:
+            return None
+        needle = args["name"].lower()
+        matches = [cat for cat in categories if needle in cat["name"].lower()]
+        if not matches:
+            return {"matches": [], "available": [cat["name"] for cat in categories]}
+        return {"matches": matches[:10]}
+    
+    def _search_transactions(self, args: Dict) -> Optional[Dict]:
+        return self.ynab.search_transactions(
+            payee=args.get("payee"),
+            category=args.get("category"),
+            since=args.get("since"),
+            until=args.get("until"),
+            limit=min(int(args.get("limit") or 10), 25)
+        )
+    
+    def _search_history(self, args: Dict) -> Dict:
+        return {
+            "results": [
+                {
+                    "user": item["user_message"],
+                    "assistant": item["assistant_response"],
+                    "when": item.get("created_at")
+                }
+                for item in self.recall.search(args["query"], k=3)
+            ]
+        }
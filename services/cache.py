@@ -0,0 +1,192 @@
+# services/cache.py
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+from utils.metrics import record_cache
+
+
+def _to_epoch(expires_at: str) -> float:
+    """Parse a stored expires_at timestamp; naive values are treated as UTC"""
+    parsed = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class TwoTierCache:
+    """Bounded in-process LRU in front of the Supabase api_cache table.
+    
+    Entries carry their own TTL. Within ``stale_ttl_seconds`` after expiry a
+    value is still served while a background refresh runs, and concurrent
+    misses for the same key share a single fetch.
+    """
+    
+    def __init__(self,
+                 backend=None,
+                 max_entries: int = 256,
+                 default_ttl_seconds: int = 300,
+                 stale_ttl_seconds: int = 0,
+                 name: str = "two_tier"):
+        # backend is a SupabaseService (or anything with the same cache methods)
+        self.backend = backend
+        self.max_entries = max_entries
+        self.default_ttl_seconds = default_ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.name = name  # label for exported cache metrics
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "backend_hits": 0,
+            "misses": 0,
+            "fetches": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "fetch_seconds": 0.0
+        }
+    
+    def _remember(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+    
+    def _lookup(self, key: str) -> Optional[tuple]:
+        """Return (value, expires_at) from memory, falling back to the backend"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        
+        if self.backend is None:
+            return None
+        
+        row = self.backend.get_cached_entry(key)
+        if not row or row.get("data") is None:
+            return None
+        
+        entry = (row["data"], _to_epoch(row["expires_at"]))
+        self._remember(key, *entry)
+        with self._lock:
+            self._stats["backend_hits"] += 1
+        return entry
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get a fresh value, or None when missing or expired"""
+        entry = self._lookup(key)
+        with self._lock:
+            hit = entry is not None and entry[1] > time.time()
+            self._stats["hits" if hit else "misses"] += 1
+        record_cache(self.name, "hit" if hit else "miss")
+        return entry[0] if hit else None
+    
+    def contains(self, key: str) -> bool:
+        """Whether a fresh value is cached, without counting a lookup"""
+        entry = self._lookup(key)
+        return entry is not None and entry[1] > time.time()
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        """Store a value in memory and write it through to the backend"""
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._remember(key, value, time.time() + ttl)
+        if self.backend is not None:
+            self.backend.set_cached_data(key, value, ttl_minutes=ttl / 60)
+    
+    def invalidate(self, key: str):
+        """Drop a key from both tiers"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete_cached_data(key)
+    
+    def _fetch(self, key: str, fetch: Callable[[], Any], ttl_seconds: Optional[int]) -> Any:
+        """Run fetch once per key, letting concurrent callers wait on the same result"""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self._stats["coalesced"] += 1
+        
+        if not owner:
+            return future.result()
+        
+        started = time.perf_counter()
+        try:
+            value = fetch()
+            # Failed fetches (None) are not cached so the next call retries
+            if value is not None:
+                self.set(key, value, ttl_seconds)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._stats["fetches"] += 1
+                self._stats["fetch_seconds"] += time.perf_counter() - started
+    
+    def get_or_fetch(self,
+                     key: str,
+                     fetch: Callable[[], Any],
+                     ttl_seconds: Optional[int] = None,
+                     stale_ttl_seconds: Optional[int] = None) -> Any:
+        """Get a cached value or compute it with fetch(), serving stale data while revalidating"""
+        stale_ttl = self.stale_ttl_seconds if stale_ttl_seconds is None else stale_ttl_seconds
+        entry = self._lookup(key)
+        now = time.time()
+        
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > now:
+                with self._lock:
+                    self._stats["hits"] += 1
+                record_cache(self.name, "hit")
+                return value
+            if expires_at + stale_ttl > now:
+                with self._lock:
+                    self._stats["stale_hits"] += 1
+                    refreshing = key in self._inflight
+                record_cache(self.name, "stale_hit")
+                if not refreshing:
+                    threading.Thread(
+                        target=self._revalidate,
+                        args=(key, fetch, ttl_seconds),
+                        daemon=True
+                    ).start()
+                return value
+        
+        with self._lock:
+            self._stats["misses"] += 1
+        record_cache(self.name, "miss")
+        return self._fetch(key, fetch, ttl_seconds)
+    
+    def _revalidate(self, key: str, fetch: Callable[[], Any], ttl_seconds: Optional[int]):
+        try:
+            self._fetch(key, fetch, ttl_seconds)
+        except Exception:
+            # Keep serving the stale value; the next caller will retry
+            pass
+    
+    def stats(self) -> Dict:
+        """Snapshot of hit/miss counters and average fetch latency"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        stats["avg_fetch_ms"] = stats["fetch_seconds"] / stats["fetches"] * 1000 if stats["fetches"] else 0.0
+        return stats
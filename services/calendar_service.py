@@ -0,0 +1,267 @@
+# services/calendar_service.py
+import os
+import json
+import time
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from services.resilience import CALENDAR_CIRCUIT, upstream_timeout
+from utils.metrics import track
+
+SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
+
+# Timed events up to this long live in the sorted index; longer ones
+# (multi-day trips, conferences) are few and kept in a separate list
+LONG_EVENT_SECONDS = 24 * 3600
+
+
+def _to_epoch(value: Dict, tz) -> Tuple[float, bool]:
+    """Google start/end ({"dateTime"} or all-day {"date"}) -> (epoch seconds, all_day)"""
+    if "dateTime" in value:
+        return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00")).timestamp(), False
+    day = date.fromisoformat(value["date"])
+    return datetime.combine(day, dt_time.min, tz).timestamp(), True
+
+
+def normalize_event(event: Dict, tz) -> Dict:
+    """Keep the fields lookups need; cancelled events become deletions"""
+    if event.get("status") == "cancelled" or "start" not in event:
+        return {"id": event["id"], "deleted": True}
+    start, all_day = _to_epoch(event["start"], tz)
+    end, _ = _to_epoch(event.get("end", event["start"]), tz)
+    return {
+        "id": event["id"],
+        "summary": event.get("summary") or "(no title)",
+        "start": start,
+        "end": max(end, start),
+        "all_day": all_day,
+        "location": event.get("location"),
+    }
+
+
+class EventIndex:
+    """Events sorted by start time for O(log n) time-window lookups.
+    
+    Windows are found by binary search over start times. Because no indexed
+    event is longer than LONG_EVENT_SECONDS, an event overlapping a window
+    must start at most that long before it, which bounds the scan.
+    """
+    
+    def __init__(self, events: List[Dict]):
+        ordered = sorted(events, key=lambda e: (e["start"], e["end"], e["id"]))
+        self.events = [e for e in ordered if e["end"] - e["start"] <= LONG_EVENT_SECONDS]
+        self.long_events = [e for e in ordered if e["end"] - e["start"] > LONG_EVENT_SECONDS]
+        self.starts = [e["start"] for e in self.events]
+    
+    def __len__(self):
+        return len(self.events) + len(self.long_events)
+    
+    def overlapping(self, start: float, end: float) -> List[Dict]:
+        """Events overlapping [start, end), ordered by start"""
+        lo = bisect_left(self.starts, start - LONG_EVENT_SECONDS)
+        hi = bisect_left(self.starts, end)
+        found = [e for e in self.events[lo:hi] if e["end"] > start or e["start"] >= start]
+        found += [e for e in self.long_events if e["start"] < end and e["end"] > start]
+        return sorted(found, key=lambda e: (e["start"], e["end"], e["id"]))
+    
+    def next_after(self, moment: float, include_all_day: bool = False) -> Optional[Dict]:
+        """First event starting after moment"""
+        for event in self.events[bisect_right(self.starts, moment):]:
+            if include_all_day or not event["all_day"]:
+                return event
+        return None
+
+
+class CalendarService:
+    """Google Calendar events kept in a local index by incremental sync.
+    
+    The first sync lists events from ``window_days_back`` days ago onwards;
+    later syncs send the stored ``syncToken`` and only receive changes. Events
+    and the token live in a sync store (see services/ynab_sync.py), so a
+    restart resumes incrementally. Lookups only read the in-memory index.
+    """
+    
+    def __init__(self,
+                 calendar_id: Optional[str] = None,
+                 service=None,
+                 store=None,
+                 min_sync_interval_seconds: int = 60,
+                 window_days_back: int = 7):
+        self.calendar_id = calendar_id or os.getenv("GOOGLE_CALENDAR_ID", "primary")
+        tz_name = os.getenv("CALENDAR_TIMEZONE")
+        self.tz = ZoneInfo(tz_name) if tz_name else datetime.now().astimezone().tzinfo
+        self.min_sync_interval_seconds = min_sync_interval_seconds
+        self.window_days_back = window_days_back
+        
+        # service is a googleapiclient Calendar resource (or a local fake)
+        self.service = service if service is not None else self._build_service()
+        self.is_connected = self.service is not None
+        self.circuit = CALENDAR_CIRCUIT
+        
+        if store is None:
+            from services.ynab_sync import SQLiteSyncStore
+            store = SQLiteSyncStore()
+        self.store = store
+        self._namespace = f"calendar:{self.calendar_id}"
+        self._sync_lock = threading.Lock()
+        self._started = False
+        self.last_error: Optional[str] = None
+        self._events = {e["id"]: e for e in self.store.get_records(self._namespace, "events")}
+        self._index = EventIndex(list(self._events.values()))
+    
+    def _build_service(self):
+        """Calendar client from GOOGLE_CALENDAR_CREDENTIALS (JSON or a path to it)"""
+        raw = os.getenv("GOOGLE_CALENDAR_CREDENTIALS")
+        if not raw:
+            return None
+        
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build
+        
+        info = json.loads(open(raw).read() if os.path.exists(raw) else raw)
+        if info.get("type") == "service_account":
+            from google.oauth2 import service_account
+            credentials = service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
+        else:
+            # Authorized-user token (refresh_token, client_id, client_secret)
+            from google.oauth2.credentials import Credentials
+            credentials = Credentials.from_authorized_user_info(info, scopes=SCOPES)
+        # httplib2 has a single socket timeout, so it gets the read deadline
+        http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=upstream_timeout("google_calendar")[1]))
+        return build("calendar", "v3", http=http, cache_discovery=False)
+    
+    def _list_events(self, sync_token: Optional[str]) -> Tuple[List[Dict], str]:
+        """All pages of events.list; returns (events, nextSyncToken)"""
+        params = {"calendarId": self.calendar_id, "singleEvents": True, "maxResults": 250}
+        if sync_token:
+            params["syncToken"] = sync_token
+        else:
+            window_start = datetime.now(self.tz) - timedelta(days=self.window_days_back)
+            params["timeMin"] = window_start.isoformat()
+        
+        events = []
+        page_token = None
+        while True:
+            with self.circuit.protect(), track("google_calendar", "events.list"):
+                response = self.service.events().list(pageToken=page_token, **params).execute()
+            events.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return events, response.get("nextSyncToken")
+    
+    def sync(self, force: bool = False) -> Dict[str, int]:
+        """Pull changes since the last sync into the store and rebuild the index.
+        
+        Returns {"events": changed count, "full": 1 if this was a full sync}.
+        """
+        if not self.is_connected:
+            return {}
+        
+        with self._sync_lock:
+            last_synced = self.store.get_synced_at(self._namespace, "events")
+            if not force and time.time() - last_synced < self.min_sync_interval_seconds:
+                return {}
+            
+            sync_token = self.store.get_knowledge(self._namespace, "events")
+            try:
+                events, next_token = self._list_events(sync_token)
+            except Exception as e:
+                # 410 Gone: the token expired, so start over with a full sync
+                if sync_token and getattr(getattr(e, "resp", None), "status", None) == 410:
+                    sync_token = None
+                    events, next_token = self._list_events(None)
+                else:
+                    raise
+            
+            records = [normalize_event(event, self.tz) for event in events]
+            self.store.apply(self._namespace, "events", records, next_token,
+                             replace=sync_token is None)
+            if records or sync_token is None:
+                self.store.set_meta(self._namespace, "version", next_token)
+            
+            # Apply the same changes in memory instead of re-reading the store
+            if sync_token is None:
+                self._events = {}
+            for record in records:
+                if record.get("deleted"):
+                    self._events.pop(record["id"], None)
+                else:
+                    self._events[record["id"]] = record
+            if records or sync_token is None:
+                self._index = EventIndex(list(self._events.values()))
+            return {"events": len(records), "full": int(sync_token is None)}
+    
+    def start(self, interval_seconds: int = 300) -> "CalendarService":
+        """Keep the index fresh from a daemon thread"""
+        if self.is_connected and not self._started:
+            self._started = True
+            threading.Thread(
+                target=self._run, args=(interval_seconds,),
+                name="calendar-sync", daemon=True
+            ).start()
+        return self
+    
+    def _run(self, interval_seconds: int):
+        while True:
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the last synced events
+                self.last_error = str(e)
+            time.sleep(interval_seconds)
+    
+    def data_version(self) -> Optional[str]:
+        """Changes whenever synced events change (hash of the token that changed them)"""
+        token = self.store.get_meta(self._namespace, "version")
+        return hashlib.sha1(str(token).encode()).hexdigest()[:12] if token else None
+    
+    def _day_bounds(self, day: date) -> Tuple[float, float]:
+        start = datetime.combine(day, dt_time.min, self.tz)
+        return start.timestamp(), (start + timedelta(days=1)).timestamp()
+    
+    def next_event(self, now: Optional[float] = None) -> Optional[Dict]:
+        """Next timed (not all-day) event starting after now"""
+        return self._index.next_after(time.time() if now is None else now)
+    
+    def events_on(self, day: date) -> List[Dict]:
+        """Events on a calendar day (in CALENDAR_TIMEZONE), including all-day ones"""
+        return self._index.overlapping(*self._day_bounds(day))
+    
+    def todays_events(self) -> List[Dict]:
+        return self.events_on(datetime.now(self.tz).date())
+    
+    def upcoming(self, days: int = 7, now: Optional[float] = None) -> List[Dict]:
+        now = time.time() if now is None else now
+        return [e for e in self._index.overlapping(now, now + days * 86400) if e["start"] >= now]
+    
+    def describe(self, event: Dict, with_day: bool = False) -> str:
+        """Human-readable time span, e.g. "Tue 02:00 PM–03:00 PM" or "all day\""""
+        if event["all_day"]:
+            day = datetime.fromtimestamp(event["start"], self.tz)
+            return f"{day.strftime('%a')} all day" if with_day else "all day"
+        start = datetime.fromtimestamp(event["start"], self.tz)
+        end = datetime.fromtimestamp(event["end"], self.tz)
+        span = f"{start.strftime('%I:%M %p')}–{end.strftime('%I:%M %p')}"
+        return f"{start.strftime('%a %b %d')} {span}" if with_day else span
+    
+    def get_calendar_context_for_llm(self) -> str:
+        """Today's and the coming week's events as plain text for Claude"""
+        if not self.is_connected:
+            return "Calendar information not available"
+        
+        today = self.todays_events()
+        lines = [f"Today ({datetime.now(self.tz).strftime('%A %B %d')}):"]
+        lines += [f"- {e['summary']} ({self.describe(e)})" for e in today] or ["- No events"]
+        
+        today_ids = {e["id"] for e in today}
+        upcoming = [e for e in self.upcoming(days=7) if e["id"] not in today_ids][:15]
+        if upcoming:
+            lines.append("\nComing up:")
+            lines += [f"- {e['summary']} ({self.describe(e, with_day=True)})" for e in upcoming]
+        return "\n".join(lines)
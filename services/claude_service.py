@@ -1,85 +1,517 @@
 # services/claude_service.py
 import os
+import time
+import threading
 import anthropic
+from collections import OrderedDict
+from datetime import date
 import streamlit as st
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
+from services.assistant_tools import TOOL_PROMPT
+from services.concurrency import CLAUDE_CONCURRENCY
+from services.conversation_memory import estimate_tokens
+from services.model_routing import ModelRoutingPolicy
+from services.resilience import CLAUDE_CIRCUIT, upstream_timeout
+from utils.metrics import record_claude_usage, track
+
+SYSTEM_PROMPT = """You are a helpful personal assistant that helps manage daily life. 
+            You have access to the user's calendar and budget information when provided.
+            Be concise, friendly, and practical in your responses."""
+
+# Marks the end of a prompt prefix Anthropic should cache server-side
+CACHE_BREAKPOINT = {"type": "ephemeral"}
+
+USAGE_FIELDS = [
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens"
+]
+
+# Errors worth retrying once on the fallback model (overloaded / server errors)
+FALLBACK_STATUS_CODES = {500, 502, 503, 529}
+
+# Tool-use rounds per turn before the model must answer with what it has
+MAX_TOOL_ROUNDS = 4
 
 class ClaudeService:
-    def __init__(self):
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        
-        if not api_key:
-            st.error("Claude API key not found. Please check your .env file.")
-            st.stop()
+    def __init__(self,
+                 client=None,
+                 policy: Optional[ModelRoutingPolicy] = None,
+                 response_cache=None):
+        if client is not None:
+            # Injected client (e.g. a local fake for offline testing)
+            self.client = client
+        else:
+            api_key = os.getenv("ANTHROPIC_API_KEY")
             
-        self.client = anthropic.Anthropic(api_key=api_key)
+            if not api_key:
+                st.error("Claude API key not found. Please check your .env file.")
+                st.stop()
+            
+            # Without these the SDK waits up to 10 minutes and retries twice
+            import httpx
+            connect, read = upstream_timeout("anthropic")
+            self.client = anthropic.Anthropic(
+                api_key=api_key,
+                timeout=httpx.Timeout(read, connect=connect),
+                max_retries=1
+            )
+        
+        # Picks model and output budget per request; Haiku by default for cost
+        self.policy = policy or ModelRoutingPolicy()
+        self.model = self.policy.models["general"]
+        self.max_tokens = 500
+        
+        # Routing decision and timings of the most recent response (seconds)
+        self.last_route: Dict = {}
+        self.last_stream_stats: Dict = {}
+        # Tool calls made while answering the most recent message
+        self.last_tool_calls: List[Dict] = []
+        
+        # Token usage of the most recent request and running totals
+        self.last_usage: Dict = {}
+        self.usage_totals: Dict = {field: 0 for field in USAGE_FIELDS}
+        self._usage_lock = threading.Lock()
+        
+        # One instance serves every session; cap simultaneous API calls
+        self.concurrency = CLAUDE_CONCURRENCY
+        # After repeated failures, calls fail at once instead of waiting on timeouts
+        self.circuit = CLAUDE_CIRCUIT
+        
+        # Optional ResponseCache: repeat questions are answered without calling Claude
+        self.response_cache = response_cache
+        
+        # Context blocks keyed by data version, reused across messages
+        self._context_blocks: "OrderedDict[object, List[Dict]]" = OrderedDict()
+        self._context_lock = threading.Lock()
+    
+    def _get_context_messages(self, context: Dict) -> List[Dict]:
+        """Build the synthetic context exchange once per context data version.
+        
+        Callers set ``context["version"]`` only for context read from live
+        data; without it the block is built from the text every time.
+        """
+        version = None
+        if context.get("version") is not None:
+            # The budget text includes day-based projections, so pin it per day only
+            version = (context["version"], context.get("history_summary"), date.today())
+            with self._context_lock:
+                if version in self._context_blocks:
+                    return self._context_blocks[version]
+        
+        context_message = "Current context:\n"
+        if "calendar" in context:
+            context_message += f"\nCalendar: {context['calendar']}"
+        if "budget" in context:
+            context_message += f"\nBudget: {context['budget']}"
+        if context.get("history_summary"):
+            context_message += f"\nEarlier conversation: {context['history_summary']}"
+        
+        context_messages = [
+            {
+                "role": "user",
+                "content": [{
+                    "type": "text",
+                    "text": context_message,
+                    "cache_control": CACHE_BREAKPOINT
+                }]
+            },
+            {
+                "role": "assistant",
+                "content": "I understand the context. How can I help you?"
+            }
+        ]
+        if version is not None:
+            with self._context_lock:
+                self._context_blocks[version] = context_messages
+                while len(self._context_blocks) > 8:
+                    self._context_blocks.popitem(last=False)
+        return context_messages
+    
+    @staticmethod
+    def _with_breakpoint(message: Dict) -> Dict:
+        """Copy of a message whose last content block carries a cache breakpoint"""
+        content = message["content"]
+        if isinstance(content, str):
+            blocks = [{"type": "text", "text": content}]
+        else:
+            blocks = [dict(block) for block in content]
+        blocks[-1]["cache_control"] = CACHE_BREAKPOINT
+        return {**message, "content": blocks}
+    
+    @staticmethod
+    def _without_breakpoint(message: Dict) -> Dict:
+        """Copy of a message (with block content) without cache breakpoints"""
+        blocks = [{k: v for k, v in block.items() if k != "cache_control"}
+                  for block in message["content"]]
+        return {**message, "content": blocks}
+    
+    def route(self,
+              user_message: str,
+              intent: Optional[str] = None,
+              context: Optional[Dict] = None,
+              chat_history: Optional[List] = None) -> Dict:
+        """Choose model, max_tokens and timeout for a request (see ModelRoutingPolicy)"""
+        input_tokens = estimate_tokens(user_message) + estimate_tokens(SYSTEM_PROMPT)
+        for message in chat_history or []:
+            input_tokens += estimate_tokens(str(message.get("content", "")))
+        for key in ("calendar", "budget", "history_summary"):
+            if context and context.get(key):
+                input_tokens += estimate_tokens(str(context[key]))
+        return self.policy.choose(user_message, intent, input_tokens)
+    
+    def _build_request(self,
+                       user_message: str,
+                       context: Optional[Dict] = None,
+                       chat_history: Optional[List] = None,
+                       route: Optional[Dict] = None,
+                       tools=None) -> Dict:
+        """Assemble the system prompt and messages shared by all request modes.
+        
+        The system prompt and context block are stable prefixes, so both carry
+        cache breakpoints and are read from Anthropic's prompt cache on repeats.
+        On their own they are usually shorter than the smallest cacheable prefix
+        (2048 tokens on Haiku), so the last history message carries one too:
+        the next turn reads the whole conversation so far from the cache once
+        it is long enough. With ``tools`` (AssistantTools) the tool definitions
+        are sent too; they sit in front of the system prompt, so its breakpoint
+        caches them as well.
+        """
+        # Build messages
+        messages = []
+        
+        # Add context if provided
+        if context and any(context.get(key) for key in ("calendar", "budget", "history_summary")):
+            messages.extend(self._get_context_messages(context))
+        
+        # Add chat history (already packed to a token budget by the caller)
+        if chat_history:
+            messages.extend(chat_history[:-1])
+            messages.append(self._with_breakpoint(chat_history[-1]))
+        
+        # Add current message, with any recalled past exchanges in front of it.
+        # They change per prompt, so they stay out of the cached context block.
+        if context and context.get("recall"):
+            recalled = "\n\n".join(
+                f"User: {item['user_message']}\nAssistant: {item['assistant_response']}"
+                for item in context["recall"]
+            )
+            user_message = (
+                f"Relevant past conversations:\n{recalled}\n\n"
+                f"Current message: {user_message}"
+            )
+        
+        messages.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        system_prompt = SYSTEM_PROMPT
+        if tools:
+            system_prompt += "\n" + TOOL_PROMPT.format(today=date.today().isoformat())
+        
+        request = {
+            "model": route["model"] if route else self.model,
+            "max_tokens": route["max_tokens"] if route else self.max_tokens,
+            "system": [{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": CACHE_BREAKPOINT
+            }],
+            "messages": messages
+        }
+        if tools:
+            request["tools"] = tools.definitions()
+        if route:
+            request["timeout"] = route["timeout"]
+        return request
+    
+    @staticmethod
+    def _content_params(content) -> List[Dict]:
+        """Response content blocks as request params (to send back in the next round)"""
+        blocks = []
+        for block in content:
+            if block.type == "text":
+                blocks.append({"type": "text", "text": block.text})
+            elif block.type == "tool_use":
+                blocks.append({"type": "tool_use", "id": block.id,
+                               "name": block.name, "input": block.input})
+        return blocks
+    
+    def _run_tools(self, content, tools, turn: Dict) -> List[Dict]:
+        """Execute a response's tool calls; returns the assistant + tool_result messages"""
+        results = []
+        for block in content:
+            if block.type != "tool_use":
+                continue
+            started = time.perf_counter()
+            with track("tools", block.name):
+                output, is_error, source = tools.run(block.name, block.input, turn)
+            self.last_tool_calls.append({
+                "name": block.name,
+                "input": block.input,
+                "source": source,
+                "error": is_error,
+                "seconds": time.perf_counter() - started
+            })
+            results.append({
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": output,
+                "is_error": is_error
+            })
+        return [
+            {"role": "assistant", "content": self._content_params(content)},
+            {"role": "user", "content": results}
+        ]
+    
+    def _next_tool_round(self, request: Dict, message, tools, turn: Dict, rounds: int) -> bool:
+        """Append a tool round to request if the model asked for tools; False when done"""
+        if not tools or message.stop_reason != "tool_use":
+            return False
+        # Each round re-sends everything so far, so the newest tool results carry
+        # a breakpoint and the next round reads the rest from the prompt cache.
+        # The previous round's is dropped to stay within four breakpoints.
+        messages = request["messages"]
+        if rounds:
+            messages = messages[:-1] + [self._without_breakpoint(messages[-1])]
+        assistant, results = self._run_tools(message.content, tools, turn)
+        request["messages"] = messages + [assistant, self._with_breakpoint(results)]
+        if rounds + 1 >= MAX_TOOL_ROUNDS:
+            # Last round: answer from the results gathered so far
+            request["tool_choice"] = {"type": "none"}
+        return True
+    
+    def _cached_response(self, user_message: str, context: Optional[Dict],
+                         chat_history: Optional[List], tools) -> Tuple[Optional[str], Optional[Dict]]:
+        """A stored answer to the same question under the same data, if any.
+        
+        Returns (answer or None, slot to pass to ``_store_response``).
+        """
+        self.last_route["cached"] = None
+        if self.response_cache is None:
+            return None, None
+        try:
+            cached, slot = self.response_cache.lookup(
+                user_message, context, chat_history, variant="tools" if tools else ""
+            )
+        except Exception:
+            return None, None  # a cache problem shouldn't cost the answer
+        self.last_route["cached"] = slot["match"]
+        return cached, slot
+    
+    def _store_response(self, slot: Optional[Dict], text: str):
+        # Answers built on failed lookups are retried next time instead
+        if slot is None or not text or any(call["error"] for call in self.last_tool_calls):
+            return
+        try:
+            self.response_cache.store(slot, text)
+        except Exception:
+            pass
+    
+    @staticmethod
+    def _should_fall_back(error: Exception) -> bool:
+        """Timeouts, dropped connections and overload errors"""
+        return isinstance(error, anthropic.APIConnectionError) or \
+            getattr(error, "status_code", None) in FALLBACK_STATUS_CODES
+    
+    def _record_usage(self, usage, model: Optional[str] = None) -> Dict:
+        """Track input/output and prompt-cache read/write token counts"""
+        self.last_usage = {
+            field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS
+        }
+        with self._usage_lock:
+            for field, count in self.last_usage.items():
+                self.usage_totals[field] += count
+        record_claude_usage(model or self.model, self.last_usage)
+        return self.last_usage
     
     def get_response(self, 
                     user_message: str, 
                     context: Optional[Dict] = None,
-                    chat_history: Optional[List] = None) -> str:
-        """Get response from Claude"""
+                    chat_history: Optional[List] = None,
+                    intent: Optional[str] = None,
+                    tools=None) -> str:
+        """Get response from Claude.
+        
+        With ``tools`` (AssistantTools) Claude may call them; calls are run and
+        their results sent back until it answers (at most MAX_TOOL_ROUNDS rounds).
+        """
         try:
-            # Build system prompt
-            system_prompt = """You are a helpful personal assistant that helps manage daily life. 
-            You have access to the user's calendar and budget information when provided.
-            Be concise, friendly, and practical in your responses."""
+            route = self.route(user_message, intent, context, chat_history)
+            self.last_route = dict(route, fell_back=False)
+            self.last_tool_calls = []
+            cached, slot = self._cached_response(user_message, context, chat_history, tools)
+            if cached is not None:
+                return cached
             
-            # Build messages
-            messages = []
+            request = self._build_request(user_message, context, chat_history, route, tools)
+            turn: Dict = {}
             
-            # Add context if provided
-            if context:
-                context_message = "Current context:\n"
-                if "calendar" in context:
-                    context_message += f"\nCalendar: {context['calendar']}"
-                if "budget" in context:
-                    context_message += f"\nBudget: {context['budget']}"
+            for rounds in range(MAX_TOOL_ROUNDS + 1):
+                # Get response from Claude, retrying once on the fallback model
+                try:
+                    with self.circuit.protect(), self.concurrency.slot(), \
+                            track("claude", "messages.create"):
+                        response = self.client.messages.create(**request)
+                except Exception as e:
+                    if self.last_route["fell_back"] or not route["fallback_model"] or \
+                            not self._should_fall_back(e):
+                        raise
+                    request["model"] = route["fallback_model"]
+                    self.last_route["fell_back"] = True
+                    with self.circuit.protect(), self.concurrency.slot(), \
+                            track("claude", "messages.create"):
+                        response = self.client.messages.create(**request)
+                self._record_usage(response.usage, request["model"])
+                self.last_route["served_by"] = request["model"]
                 
-                messages.append({
-                    "role": "user",
-                    "content": context_message
-                })
-                messages.append({
-                    "role": "assistant",
-                    "content": "I understand the context. How can I help you?"
-                })
-            
-            # Add chat history (last 5 exchanges)
-            if chat_history:
-                for msg in chat_history[-10:]:  # Last 5 exchanges (user + assistant)
-                    messages.append(msg)
-            
-            # Add current message
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            # Get response from Claude
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",  # Using Haiku for cost efficiency
-                max_tokens=500,
-                system=system_prompt,
-                messages=messages
-            )
-            
-            return response.content[0].text
+                if not self._next_tool_round(request, response, tools, turn, rounds):
+                    break
             
+            text = "".join(block.text for block in response.content if block.type == "text")
+            self._store_response(slot, text)
+            return text
+        
         except Exception as e:
             return f"Error getting response from Claude: {str(e)}"
     
+    def stream_response(self,
+                        user_message: str,
+                        context: Optional[Dict] = None,
+                        chat_history: Optional[List] = None,
+                        intent: Optional[str] = None,
+                        tools=None) -> Iterator[str]:
+        """Stream response text from Claude chunk by chunk.
+        
+        Yields text deltas as they arrive (suitable for ``st.write_stream``) and
+        returns the full response text as the generator's return value.
+        Time-to-first-token and total time are stored in ``last_stream_stats``.
+        If the routed model is overloaded or times out before any text arrives,
+        the request is retried once on the fallback model. With ``tools``, tool
+        rounds run between streamed rounds, as in ``get_response``.
+        """
+        started = time.perf_counter()
+        first_token_at = None
+        chunks: List[str] = []
+        self.last_stream_stats = {}
+        self.last_usage = {}
+        self.last_tool_calls = []
+        turn_usage = {field: 0 for field in USAGE_FIELDS}
+        rounds = 0
+        
+        try:
+            route = self.route(user_message, intent, context, chat_history)
+            self.last_route = dict(route, fell_back=False)
+            cached, slot = self._cached_response(user_message, context, chat_history, tools)
+            if cached is not None:
+                first_token_at = time.perf_counter()
+                chunks.append(cached)
+                yield cached
+            else:
+                request = self._build_request(user_message, context, chat_history, route, tools)
+                turn: Dict = {}
+                
+                while True:
+                    round_started_with = len(chunks)
+                    try:
+                        with self.circuit.protect(), self.concurrency.slot(), \
+                                track("claude", "messages.stream"), \
+                                self.client.messages.stream(**request) as stream:
+                            for text in stream.text_stream:
+                                if not text:
+                                    continue
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                if chunks and len(chunks) == round_started_with:
+                                    # Separate this round's text from the previous round's
+                                    chunks.append("\n\n")
+                                    yield "\n\n"
+                                chunks.append(text)
+                                yield text
+                            
+                            message = stream.get_final_message()
+                            for field, count in self._record_usage(message.usage, request["model"]).items():
+                                turn_usage[field] += count
+                        self.last_route["served_by"] = request["model"]
+                    except Exception as e:
+                        # Text already shown can't be taken back, so only retry before it starts
+                        if chunks or self.last_route["fell_back"] or \
+                                not route["fallback_model"] or not self._should_fall_back(e):
+                            raise
+                        request["model"] = route["fallback_model"]
+                        self.last_route["fell_back"] = True
+                        continue
+                    
+                    if not self._next_tool_round(request, message, tools, turn, rounds):
+                        break
+                    rounds += 1
+                
+                self._store_response(slot, "".join(chunks))
+        
+        except Exception as e:
+            error = f"Error getting response from Claude: {str(e)}"
+            chunks.append(error)
+            yield error
+        
+        finished = time.perf_counter()
+        self.last_stream_stats = {
+            "model": self.last_route.get("served_by"),
+            "request_class": self.last_route.get("request_class"),
+            "max_tokens": self.last_route.get("max_tokens"),
+            "fell_back": self.last_route.get("fell_back", False),
+            "cached": self.last_route.get("cached"),
+            "time_to_first_token": (first_token_at - started) if first_token_at else None,
+            "total_time": finished - started,
+            "tool_rounds": rounds,
+            "tool_calls": len(self.last_tool_calls),
+            "turn_input_tokens": turn_usage["input_tokens"],
+            "cache_read_input_tokens": turn_usage["cache_read_input_tokens"],
+            "cache_creation_input_tokens": turn_usage["cache_creation_input_tokens"]
+        }
+        return "".join(chunks)
+    
+    def classify_intent(self, user_message: str, intents: List[str]) -> Optional[str]:
+        """Ask Claude which intent a message belongs to (router fallback)"""
+        try:
+            with self.circuit.protect(), self.concurrency.slot(), \
+                    track("claude", "classify_intent"):
+                response = self.client.messages.create(
+                    model=self.policy.fast_model,
+                    max_tokens=5,
+                    messages=[{
+                        "role": "user",
+                        "content": (
+                            f"Classify this message as one of: {', '.join(intents)}. "
+                            f"Answer with the single word only.\n\nMessage: {user_message}"
+                        )
+                    }]
+                )
+            self._record_usage(response.usage, self.policy.fast_model)
+            answer = response.content[0].text.strip().lower()
+            return next((intent for intent in intents if intent in answer), None)
+        except Exception:
+            return None
+    
     def summarize_text(self, text: str, max_length: int = 100) -> str:
-        """Summarize text using Claude"""
+        """Summarize text using Claude in at most max_length words"""
         try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=max_length,
-                messages=[{
-                    "role": "user",
-                    "content": f"Summarize this in one sentence: {text}"
-                }]
-            )
+            with self.circuit.protect(), self.concurrency.slot(), \
+                    track("claude", "summarize_text"):
+                response = self.client.messages.create(
+                    model=self.policy.fast_model,
+                    # ~1.3 tokens per English word, plus room to finish the sentence
+                    max_tokens=int(max_length * 1.5) + 20,
+                    messages=[{
+                        "role": "user",
+                        "content": (
+                            f"Summarize this in at most {max_length} words, "
+                            f"in as few sentences as needed: {text}"
+                        )
+                    }]
+                )
+            self._record_usage(response.usage, self.policy.fast_model)
             return response.content[0].text
         except Exception as e:
-            return f"Error summarizing: {str(e)}"
\ No newline at end of file
+            return f"Error summarizing: {str(e)}"
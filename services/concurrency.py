@@ -0,0 +1,126 @@
+# services/concurrency.py
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight execution"""
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0}
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def is_inflight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._inflight
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no request budget frees up within the wait timeout"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``capacity`` burst, refilled at ``rate_per_second``"""
+    
+    def __init__(self, capacity: float, rate_per_second: float, name: str = "upstream"):
+        self.capacity = capacity
+        self.rate_per_second = rate_per_second
+        self.name = name
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited_seconds": 0.0, "rejected": 0}
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+    
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+    
+    def acquire(self, tokens: float = 1, timeout: float = 0.0):
+        """Take tokens, waiting up to timeout seconds; raises RateLimitExceeded otherwise"""
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.stats["acquired"] += 1
+                    self.stats["waited_seconds"] += time.monotonic() - started
+                    return
+                wait = (tokens - self._tokens) / self.rate_per_second
+            
+            if time.monotonic() + wait > deadline:
+                with self._lock:
+                    self.stats["rejected"] += 1
+                raise RateLimitExceeded(f"{self.name} request budget exhausted; retry in {wait:.0f}s")
+            time.sleep(min(wait, 1.0))
+
+
+class ConcurrencyLimit:
+    """Caps how many calls to an upstream run at once"""
+    
+    def __init__(self, max_concurrent: int, name: str = "upstream"):
+        self.max_concurrent = max_concurrent
+        self.name = name
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.stats = {"active": 0, "peak": 0, "rejected": 0}
+    
+    @contextmanager
+    def slot(self, timeout: float = 30.0):
+        if not self._semaphore.acquire(timeout=timeout):
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise RateLimitExceeded(f"Too many concurrent {self.name} requests")
+        with self._lock:
+            self.stats["active"] += 1
+            self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats["active"] -= 1
+            self._semaphore.release()
+
+
+# Shared across every Streamlit session in the process.
+# YNAB allows 200 requests per rolling hour per token: a 20-request burst plus a
+# 180/hour refill can never exceed that in any 60-minute window.
+YNAB_RATE_LIMIT = TokenBucket(capacity=20, rate_per_second=180 / 3600, name="YNAB")
+CLAUDE_CONCURRENCY = ConcurrencyLimit(max_concurrent=4, name="Claude")
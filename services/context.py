@@ -0,0 +1,82 @@
+# services/context.py
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Shared by all sessions; providers are I/O bound
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="context")
+
+
+class ContextAssembler:
+    """Runs context providers concurrently for one chat turn.
+    
+    The Chat page builds a new assembler per prompt, so every turn fetches
+    fresh context; within the turn each provider runs at most once, even if
+    it was prefetched before being gathered. A provider that misses its
+    deadline is reported as timed out and its default is used instead of
+    blocking the page.
+    """
+    
+    def __init__(self,
+                 deadlines: Optional[Dict[str, float]] = None,
+                 default_deadline: float = 3.0,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.executor = executor or _EXECUTOR
+        self.providers: Dict[str, Callable[[], Any]] = {}
+        self.timings: Dict[str, Dict] = {}
+        self._futures = {}
+        self._submitted_at: Dict[str, float] = {}
+    
+    def add_provider(self, name: str, fetch: Callable[[], Any], deadline: Optional[float] = None):
+        """Register a zero-argument fetch function under a name"""
+        self.providers[name] = fetch
+        if deadline is not None:
+            self.deadlines[name] = deadline
+    
+    def _timed(self, name: str, fetch: Callable[[], Any]):
+        started = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            self.timings[name] = dict(
+                self.timings.get(name, {}),
+                seconds=time.perf_counter() - started
+            )
+    
+    def prefetch(self, *names: str):
+        """Start providers in the background without waiting for them"""
+        for name in names:
+            if name in self._futures or name not in self.providers:
+                continue
+            self._submitted_at[name] = time.monotonic()
+            self.timings[name] = {"status": "running"}
+            self._futures[name] = self.executor.submit(self._timed, name, self.providers[name])
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        """Wait for one provider, up to its deadline (measured from submission)"""
+        self.prefetch(name)
+        future = self._futures.get(name)
+        if future is None:
+            return default
+        
+        deadline = self.deadlines.get(name, self.default_deadline)
+        remaining = deadline - (time.monotonic() - self._submitted_at[name])
+        try:
+            result = future.result(timeout=max(0.0, remaining))
+            self.timings[name]["status"] = "ok"
+            return result
+        except FutureTimeout:
+            self.timings[name]["status"] = "timed_out"
+            return default
+        except Exception as e:
+            self.timings[name].update(status="error", error=str(e))
+            return default
+    
+    def gather(self, names: Iterable[str], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Fetch several providers concurrently and collect their results"""
+        names = list(names)
+        defaults = defaults or {}
+        self.prefetch(*names)
+        return {name: self.get(name, defaults.get(name)) for name in names}
@@ -0,0 +1,103 @@
+# services/conversation_memory.py
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: Dict) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content)
+
+
+class ConversationMemory:
+    """Packs chat history into a token budget, folding older turns into a summary.
+    
+    The summary is built incrementally: only turns that newly fall out of the
+    window are summarized, together with the previous summary.
+    """
+    
+    def __init__(self,
+                 summarize: Callable[[str], str],
+                 token_budget: int = 2000,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        
+        self.summary: Optional[str] = None
+        self._summarized_count = 0
+        self._summarized_digest = hashlib.sha256()
+        self._lock = threading.Lock()
+    
+    def reset(self):
+        """Forget the summary (e.g. after the chat is cleared)"""
+        self.summary = None
+        self._summarized_count = 0
+        self._summarized_digest = hashlib.sha256()
+    
+    def _digest(self, messages: List[Dict]) -> str:
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(f"{message['role']}:{_message_text(message)}\n".encode())
+        return digest.hexdigest()
+    
+    def _window_start(self, history: List[Dict]) -> int:
+        """Index of the oldest message that still fits in the token budget"""
+        budget = self.token_budget
+        if self.summary:
+            budget -= self.count_tokens(self.summary)
+        
+        start = len(history)
+        used = 0
+        for i in range(len(history) - 1, -1, -1):
+            used += self.count_tokens(_message_text(history[i]))
+            if used > budget:
+                break
+            start = i
+        
+        # The window has to open on a user turn to keep roles alternating
+        while start < len(history) and history[start]["role"] != "user":
+            start += 1
+        return start
+    
+    def pack(self, history: List[Dict]) -> Tuple[Optional[str], List[Dict]]:
+        """Return (summary of older turns, recent messages that fit the budget)"""
+        # May run on a context worker thread; one pack at a time per conversation
+        with self._lock:
+            return self._pack(history)
+    
+    def _pack(self, history: List[Dict]) -> Tuple[Optional[str], List[Dict]]:
+        # History was cleared or rewritten: the cached summary no longer applies
+        if len(history) < self._summarized_count or \
+                self._digest(history[:self._summarized_count]) != self._summarized_digest.hexdigest():
+            self.reset()
+        
+        start = max(self._window_start(history), self._summarized_count)
+        
+        dropped = history[self._summarized_count:start]
+        if dropped:
+            transcript = "\n".join(
+                f"{message['role'].capitalize()}: {_message_text(message)}"
+                for message in dropped
+            )
+            if self.summary:
+                transcript = f"Summary so far: {self.summary}\n{transcript}"
+            
+            summary = self.summarize(transcript)
+            # Keep the previous summary if summarization failed; retry next turn
+            if summary and not summary.startswith("Error"):
+                self.summary = summary
+                for message in dropped:
+                    self._summarized_digest.update(
+                        f"{message['role']}:{_message_text(message)}\n".encode()
+                    )
+                self._summarized_count = start
+        
+        return self.summary, history[self._summarized_count:]
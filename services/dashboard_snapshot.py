@@ -0,0 +1,224 @@
+# services/dashboard_snapshot.py
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+SNAPSHOT_SCHEMA = 1
+# The budget summary is shared through the YNAB service's cache: fresh for 5
+# minutes, then served stale for up to an hour while it is refetched
+SUMMARY_TTL_SECONDS = 300
+SUMMARY_STALE_SECONDS = 3600
+
+
+def load_snapshot(path: str) -> Optional[Dict]:
+    """Read a materialized snapshot file (None if missing or unreadable)"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def snapshot_age_seconds(snapshot: Dict) -> float:
+    generated_at = datetime.fromisoformat(snapshot["generated_at"])
+    return (datetime.now(timezone.utc) - generated_at).total_seconds()
+
+
+class DashboardSnapshotRefresher:
+    """Materializes the Dashboard's data in the background.
+    
+    A daemon thread rebuilds a versioned snapshot (metrics, gauge inputs, top
+    categories, trends and month history) every ``interval_seconds``, when a
+    delta sync reports YNAB changes (checked every ``poll_seconds``), or when
+    ``trigger()`` is called. Page loads just read the latest snapshot.
+    """
+    
+    def __init__(self,
+                 ynab,
+                 path: Optional[str] = None,
+                 interval_seconds: int = 900,
+                 poll_seconds: int = 180,
+                 history_months: int = 6):
+        self.ynab = ynab
+        self.path = path or os.getenv("DASHBOARD_SNAPSHOT_PATH", "dashboard_snapshot.json")
+        self.interval_seconds = interval_seconds
+        # Each poll costs two small delta requests; keep well under YNAB's 200/hour
+        self.poll_seconds = poll_seconds
+        self.history_months = history_months
+        
+        self._snapshot = None
+        self._loaded_mtime = 0.0
+        self._reload()
+        self._wake = threading.Event()
+        self._first_pass = threading.Event()  # set once the thread has tried a first build
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start the background refresher (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dashboard-refresher", daemon=True)
+            self._thread.start()
+        return self
+    
+    def _reload(self):
+        """Pick up a snapshot file written by another process (e.g. the standalone worker)"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime <= self._loaded_mtime:
+            return
+        snapshot = load_snapshot(self.path)
+        if snapshot and snapshot.get("schema") == SNAPSHOT_SCHEMA:
+            self._snapshot = snapshot
+            self._loaded_mtime = mtime
+    
+    def latest(self) -> Optional[Dict]:
+        """The most recent snapshot, without touching any upstream"""
+        self._reload()
+        return self._snapshot
+    
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Wait for the background thread's first build, then return the latest snapshot"""
+        self._first_pass.wait(timeout)
+        return self.latest()
+    
+    def trigger(self):
+        """Ask the background thread to rebuild now (e.g. from a webhook)"""
+        self._wake.set()
+    
+    def _history_start(self) -> str:
+        today = datetime.now()
+        total = today.year * 12 + today.month - 1 - (self.history_months - 1)
+        return f"{total // 12:04d}-{total % 12 + 1:02d}-01"
+    
+    def _summary_key(self) -> str:
+        return f"dashboard_budget:{self.ynab.default_budget_name or 'default'}"
+    
+    def _read_budget(self, force: bool) -> Optional[Dict]:
+        """{"budget", "as_of"} for the current month, through the shared cache when there is one.
+        
+        ``as_of`` is when the summary was read from YNAB. A last-known-good
+        summary served during an outage keeps the time it was saved and is
+        not cached.
+        """
+        served = {}
+        
+        def fetch() -> Optional[Dict]:
+            budget = self.ynab.get_current_month_budget()
+            if budget is None:
+                return None
+            stale_since = self.ynab.fallback.stale_since(f"current_month:{self.ynab.last_budget_id}")
+            served.update(budget=budget, as_of=stale_since or time.time())
+            return None if stale_since else dict(served)
+        
+        cache = self.ynab.cache
+        if cache is None:
+            fetch()
+            return served or None
+        if force:
+            cache.invalidate(self._summary_key())
+        return cache.get_or_fetch(
+            self._summary_key(),
+            fetch,
+            ttl_seconds=SUMMARY_TTL_SECONDS,
+            stale_ttl_seconds=SUMMARY_STALE_SECONDS
+        ) or served or None
+    
+    def refresh_now(self, force: bool = False) -> Optional[Dict]:
+        """Build and persist a new snapshot synchronously.
+        
+        ``force`` skips the cached budget summary (the Refresh button, a
+        trigger, or a sync that found changes). The previous snapshot is kept
+        when the summary is no newer than it, e.g. while YNAB is down.
+        """
+        with self._lock:
+            summary = self._read_budget(force)
+            if summary is None:
+                return self._snapshot
+            
+            previous = self._snapshot
+            as_of = datetime.fromtimestamp(summary["as_of"], timezone.utc)
+            if previous and datetime.fromisoformat(previous["generated_at"]) >= as_of:
+                return previous
+            
+            budget = summary["budget"]
+            insights = self.ynab.get_spending_insights()
+            try:
+                history = self.ynab.get_month_range(self._history_start())
+            except Exception:
+                history = None
+            snapshot = {
+                "schema": SNAPSHOT_SCHEMA,
+                "version": (previous["version"] if previous else 0) + 1,
+                # When the data was read from YNAB, so the page shows its real age
+                "generated_at": as_of.isoformat(),
+                "data_version": self.ynab.get_data_version(),
+                "budget": budget,
+                "gauge": {
+                    "value": budget["remaining"],
+                    "reference": budget["budgeted"],
+                    "over_budget": budget["remaining"] <= 0
+                },
+                # A failed read keeps the previous snapshot's section
+                "insights": insights if insights is not None or not previous else previous["insights"],
+                "history": history if history is not None else (previous["history"] if previous else [])
+            }
+            
+            # Atomic replace so readers in other processes never see a partial file
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+            
+            self._snapshot = snapshot
+            self._loaded_mtime = os.path.getmtime(self.path)
+            return snapshot
+    
+    def _data_changed(self) -> bool:
+        """Run a (cheap) delta sync and report whether YNAB data moved"""
+        engine = self.ynab.sync_engine
+        budget_id = self.ynab.last_budget_id
+        if not engine or not budget_id:
+            return False
+        changed = engine.sync(budget_id)
+        return any(changed.values())
+    
+    def _expired(self) -> bool:
+        return snapshot_age_seconds(self._snapshot) >= self.interval_seconds
+    
+    def _run(self):
+        while True:
+            triggered = self._wake.is_set()
+            self._wake.clear()
+            try:
+                if self._snapshot is None:
+                    # First build; another process may already have cached the summary
+                    self.refresh_now()
+                elif triggered or self._data_changed():
+                    self.refresh_now(force=True)
+                elif self._expired():
+                    self.refresh_now()
+            except Exception:
+                # Keep serving the last snapshot; try again on the next poll
+                pass
+            self._first_pass.set()
+            self._wake.wait(self.poll_seconds)
+
+
+if __name__ == "__main__":
+    # Standalone worker: python -m services.dashboard_snapshot
+    # Pages in other processes read the snapshot file it keeps up to date.
+    from dotenv import load_dotenv
+    from services.cache import TwoTierCache
+    from services.ynab_service import YNABService
+    from services.ynab_sync import create_sync_store
+    
+    load_dotenv()
+    ynab = YNABService(cache=TwoTierCache(), sync_store=create_sync_store())
+    refresher = DashboardSnapshotRefresher(ynab)
+    refresher.start()._thread.join()
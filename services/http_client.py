@@ -0,0 +1,135 @@
+# services/http_client.py
+import asyncio
+import random
+import requests
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Longest an in-request retry waits. YNAB's Retry-After on a 429 can run to
+# the end of its hourly window, far longer than a page should block.
+MAX_RETRY_AFTER_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 5.0
+
+
+class CappedRetry(Retry):
+    """Retry whose Retry-After sleeps are capped at ``max_retry_after`` seconds"""
+    
+    def __init__(self, *args, max_retry_after: float = MAX_RETRY_AFTER_SECONDS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+    
+    def new(self, **kwargs) -> "CappedRetry":
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+    
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.max_retry_after)
+
+
+def build_session(headers: Optional[Dict] = None,
+                  pool_connections: int = 4,
+                  pool_maxsize: int = 10,
+                  retries: int = 3,
+                  backoff_factor: float = 0.5,
+                  read_retries: Optional[int] = None,
+                  max_retry_after: float = MAX_RETRY_AFTER_SECONDS) -> requests.Session:
+    """Create a keep-alive session with a tuned connection pool and retry policy.
+    
+    ``read_retries`` (default: ``retries``) bounds retries after a read
+    timeout; a stalled upstream tends to stall again. Backoff and
+    Retry-After waits are each capped at a few seconds.
+    """
+    retry = CappedRetry(
+        total=retries,
+        connect=retries,
+        read=retries if read_retries is None else read_retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        backoff_max=BACKOFF_MAX_SECONDS,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        max_retry_after=max_retry_after
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry
+    )
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class AsyncJSONClient:
+    """Pooled httpx client for fetching several endpoints concurrently"""
+    
+    def __init__(self,
+                 base_url: str,
+                 headers: Optional[Dict] = None,
+                 max_connections: int = 10,
+                 retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 timeout: tuple = DEFAULT_TIMEOUT,
+                 max_retry_after: float = MAX_RETRY_AFTER_SECONDS):
+        self.base_url = base_url
+        self.headers = headers or {}
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_after = max_retry_after
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self.timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    
+    async def _get(self, client: httpx.AsyncClient, path: str) -> Dict:
+        """GET a path, retrying 429/5xx responses with capped exponential backoff"""
+        for attempt in range(self.retries + 1):
+            response = await client.get(path)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                response.raise_for_status()
+                return response.json()
+            
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = min(float(retry_after), self.max_retry_after)
+            else:
+                delay = min(self.backoff_factor * (2 ** attempt) * (1 + random.random() / 2),
+                            BACKOFF_MAX_SECONDS)
+            await asyncio.sleep(delay)
+    
+    async def get_many(self, paths: List[str]) -> List:
+        """Fetch all paths concurrently over one pooled client.
+        
+        Results are returned in input order; a failed fetch yields its exception.
+        """
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            limits=self.limits,
+            timeout=self.timeout
+        ) as client:
+            return await asyncio.gather(
+                *(self._get(client, path) for path in paths),
+                return_exceptions=True
+            )
+    
+    def get_many_sync(self, paths: List[str]) -> List:
+        """Blocking wrapper around get_many for Streamlit script threads"""
+        return asyncio.run(self.get_many(paths))
@@ -0,0 +1,133 @@
+# services/intent_router.py
+import os
+import json
+import re
+import time
+import zlib
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "intent_prompts.jsonl"
+)
+
+# Which context providers each intent needs
+INTENT_PROVIDERS = {
+    "budget": ["budget"],
+    "calendar": ["calendar"],
+    "general": []
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9$']+")
+
+
+def load_examples(path: str = DEFAULT_EXAMPLES_PATH) -> List[Tuple[str, str]]:
+    """Read labeled (prompt, intent) pairs from a JSONL file"""
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["prompt"], row["intent"]) for row in rows]
+
+
+class IntentRouter:
+    """Tiny local intent classifier deciding which context to fetch for a prompt.
+    
+    Prompts are hashed into TF-IDF weighted word and character n-gram features
+    and scored by a softmax (multinomial logistic) regression trained with
+    NumPy at startup. When the model is unsure, an optional fallback (e.g. a
+    Claude call) decides instead.
+    """
+    
+    def __init__(self,
+                 examples: List[Tuple[str, str]],
+                 dim: int = 2048,
+                 min_confidence: float = 0.4,
+                 fallback: Optional[Callable[[str, List[str]], Optional[str]]] = None):
+        self.dim = dim
+        self.min_confidence = min_confidence
+        self.fallback = fallback
+        self.stats = {"local": 0, "fallback": 0, "seconds": 0.0}
+        self.fit(examples)
+    
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_EXAMPLES_PATH, **kwargs) -> "IntentRouter":
+        return cls(load_examples(path), **kwargs)
+    
+    def _features(self, text: str) -> np.ndarray:
+        """Hashed counts of words, word bigrams and character 4-grams"""
+        words = WORD_PATTERN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 4] for i in range(len(padded) - 3))
+        
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            buckets = np.fromiter(
+                (zlib.crc32(f.encode()) % self.dim for f in features),
+                dtype=np.int64,
+                count=len(features)
+            )
+            np.add.at(vector, buckets, 1.0)
+        return vector
+    
+    def _embed(self, counts: np.ndarray) -> np.ndarray:
+        """TF-IDF weight and L2-normalize feature counts (one row or a matrix)"""
+        weighted = np.log1p(counts) * self.idf
+        norm = np.linalg.norm(weighted, axis=-1, keepdims=True)
+        return weighted / np.maximum(norm, 1e-9)
+    
+    def fit(self,
+            examples: List[Tuple[str, str]],
+            iterations: int = 300,
+            learning_rate: float = 5.0,
+            l2: float = 1e-3):
+        """Fit IDF weights and a softmax regression with full-batch gradient descent"""
+        counts = np.stack([self._features(prompt) for prompt, _ in examples])
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(examples)) / (1 + document_frequency)).astype(np.float32) + 1
+        
+        self.intents = sorted({intent for _, intent in examples})
+        X = self._embed(counts)
+        Y = np.eye(len(self.intents), dtype=np.float32)[
+            [self.intents.index(intent) for _, intent in examples]
+        ]
+        
+        self.weights = np.zeros((self.dim, len(self.intents)), dtype=np.float32)
+        self.bias = np.zeros(len(self.intents), dtype=np.float32)
+        for _ in range(iterations):
+            error = self._softmax(X @ self.weights + self.bias) - Y
+            self.weights -= learning_rate * (X.T @ error / len(X) + l2 * self.weights)
+            self.bias -= learning_rate * error.mean(axis=0) / 10
+    
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+    
+    def probabilities(self, prompt: str) -> Dict[str, float]:
+        probs = self._softmax(self._embed(self._features(prompt)) @ self.weights + self.bias)
+        return dict(zip(self.intents, probs.tolist()))
+    
+    def classify(self, prompt: str) -> Tuple[str, str]:
+        """Return (intent, source) where source is "local" or "fallback" """
+        started = time.perf_counter()
+        probs = self._softmax(self._embed(self._features(prompt)) @ self.weights + self.bias)
+        best = int(np.argmax(probs))
+        intent = self.intents[best]
+        source = "local"
+        
+        if self.fallback and probs[best] < self.min_confidence:
+            decided = self.fallback(prompt, self.intents)
+            if decided in self.intents:
+                intent, source = decided, "fallback"
+        
+        self.stats[source] += 1
+        self.stats["seconds"] += time.perf_counter() - started
+        return intent, source
+    
+    def providers_for(self, prompt: str) -> List[str]:
+        """Context providers to fetch for this prompt"""
+        intent, _ = self.classify(prompt)
+        return INTENT_PROVIDERS.get(intent, [])
@@ -0,0 +1,162 @@
+# services/model_routing.py
+import os
+import re
+from typing import Dict, List, Optional
+
+from services.conversation_memory import estimate_tokens
+from utils.metrics import CLAUDE_PRICING
+
+FAST_MODEL = os.getenv("CLAUDE_FAST_MODEL", "claude-3-haiku-20240307")
+DEFAULT_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-haiku-20240307")
+COMPLEX_MODEL = os.getenv("CLAUDE_COMPLEX_MODEL", "claude-3-5-haiku-20241022")
+FALLBACK_MODEL = os.getenv("CLAUDE_FALLBACK_MODEL", "claude-3-5-haiku-20241022")
+
+# Rough streaming speed used to predict latency: (seconds to first token, output tokens/second)
+MODEL_SPEED = {
+    "claude-3-haiku-20240307": (0.4, 150.0),
+    "claude-3-5-haiku-20241022": (0.6, 100.0),
+    "claude-3-5-sonnet-20241022": (0.9, 70.0),
+    "claude-sonnet-4-20250514": (1.0, 60.0),
+}
+DEFAULT_SPEED = (1.0, 60.0)
+
+# Output budget and request timeout per request class
+REQUEST_CLASSES = {
+    "trivial": {"max_tokens": 80, "timeout": 10.0},
+    "lookup": {"max_tokens": 400, "timeout": 20.0},
+    "general": {"max_tokens": 500, "timeout": 30.0},
+    "complex": {"max_tokens": 1000, "timeout": 45.0},
+}
+MIN_MAX_TOKENS = 120  # latency targets never squeeze answers below this
+
+# Greetings and acknowledgements, optionally with a little filler ("thanks so much!")
+TRIVIAL_PATTERN = re.compile(
+    r"^\W*(hi|hey|hello|yo|thanks|thank you|thx|ty|ok|okay|cool|great|nice|perfect|awesome|"
+    r"good (morning|afternoon|evening|night)|bye|goodbye|see you)"
+    r"([\s,]+(so much|a lot|you|there|again|for that|for the help|later|cool|thanks|great))*\W*$",
+    re.IGNORECASE
+)
+# Open-ended asks. A keyword alone ("why?", "plan lunch") isn't enough: the
+# prompt must also be long enough or ask several things at once.
+COMPLEX_PATTERN = re.compile(
+    r"\b(plan|compare|analy[sz]e|explain|why|strategy|pros and cons|step[- ]by[- ]step|"
+    r"break ?down|itinerary|draft|write)\b",
+    re.IGNORECASE
+)
+COMPLEX_MIN_WORDS = 8
+LIST_ITEM_PATTERN = re.compile(r"^\s*(\d+[.)]|[-*•])\s+\S", re.MULTILINE)
+
+
+def is_multipart(text: str) -> bool:
+    """Several questions, or a numbered/bulleted list of asks"""
+    return text.count("?") > 1 or bool(LIST_ITEM_PATTERN.search(text))
+
+
+def estimate_latency(model: str, max_tokens: int) -> float:
+    """Worst-case seconds to stream max_tokens from model"""
+    first_token, tokens_per_second = MODEL_SPEED.get(model, DEFAULT_SPEED)
+    return first_token + max_tokens / tokens_per_second
+
+
+def estimate_request_cost(model: str, input_tokens: int, max_tokens: int) -> float:
+    """Worst-case USD cost of a request (every output token used)"""
+    prices = CLAUDE_PRICING.get(model)
+    if not prices:
+        return 0.0
+    return (input_tokens * prices[0] + max_tokens * prices[1]) / 1_000_000
+
+
+class ModelRoutingPolicy:
+    """Pick the model, output budget and timeout for each Claude request.
+
+    Requests are classed as trivial (greetings, thanks), lookup (budget or
+    calendar questions), complex (long, or open-ended asks of some length or
+    with several parts) or general. Each class has a default model and
+    max_tokens, which are then adjusted to fit the configured latency and
+    cost targets.
+    """
+
+    def __init__(self,
+                 fast_model: str = FAST_MODEL,
+                 default_model: str = DEFAULT_MODEL,
+                 complex_model: str = COMPLEX_MODEL,
+                 fallback_model: str = FALLBACK_MODEL,
+                 latency_target_seconds: Optional[float] = None,
+                 cost_target_usd: Optional[float] = None):
+        self.models = {
+            "trivial": fast_model,
+            "lookup": default_model,
+            "general": default_model,
+            "complex": complex_model,
+        }
+        self.fast_model = fast_model
+        self.fallback_model = fallback_model
+        # Per-request targets; unset means unconstrained
+        self.latency_target_seconds = latency_target_seconds if latency_target_seconds is not None else \
+            float(os.getenv("CLAUDE_LATENCY_TARGET_SECONDS", "0")) or None
+        self.cost_target_usd = cost_target_usd if cost_target_usd is not None else \
+            float(os.getenv("CLAUDE_COST_TARGET_USD", "0")) or None
+
+    def classify(self, user_message: str, intent: Optional[str] = None) -> str:
+        """Request class from the router's intent and the prompt itself"""
+        text = user_message.strip()
+        if len(text) <= 40 and TRIVIAL_PATTERN.match(text):
+            return "trivial"
+        if len(text) > 600:
+            return "complex"
+        if COMPLEX_PATTERN.search(text) and \
+                (len(text.split()) >= COMPLEX_MIN_WORDS or is_multipart(text)):
+            return "complex"
+        if intent in ("budget", "calendar"):
+            return "lookup"
+        return "general"
+
+    def _token_budget(self, model: str) -> int:
+        """Output tokens model can stream within the latency target"""
+        first_token, tokens_per_second = MODEL_SPEED.get(model, DEFAULT_SPEED)
+        return int((self.latency_target_seconds - first_token) * tokens_per_second)
+
+    def choose(self,
+               user_message: str,
+               intent: Optional[str] = None,
+               input_tokens: Optional[int] = None) -> Dict:
+        """Routing decision: model, max_tokens, timeout, fallback_model, request_class"""
+        request_class = self.classify(user_message, intent)
+        settings = REQUEST_CLASSES[request_class]
+        model = self.models[request_class]
+        max_tokens = settings["max_tokens"]
+        input_tokens = input_tokens if input_tokens is not None else estimate_tokens(user_message)
+
+        # Too slow for the target: prefer the model that fits the longer answer
+        # in time, then shorten the answer to fit
+        if self.latency_target_seconds:
+            if self._token_budget(model) < max_tokens and \
+                    self._token_budget(self.fast_model) > self._token_budget(model):
+                model = self.fast_model
+            max_tokens = max(min(MIN_MAX_TOKENS, max_tokens),
+                             min(max_tokens, self._token_budget(model)))
+
+        # Too expensive for the target: drop to the fast model
+        if self.cost_target_usd and \
+                estimate_request_cost(model, input_tokens, max_tokens) > self.cost_target_usd:
+            model = self.fast_model
+
+        # Overload/timeout retries go to a different model than the one that failed
+        fallback = next(
+            (m for m in (self.fallback_model, self.fast_model) if m and m != model),
+            None
+        )
+
+        return {
+            "request_class": request_class,
+            "model": model,
+            "max_tokens": max_tokens,
+            "timeout": settings["timeout"],
+            "fallback_model": fallback,
+        }
+
+    def providers_needed(self, decision: Dict, providers: List[str]) -> List[str]:
+        """Trivial prompts skip external context; they only need the conversation"""
+        if decision["request_class"] == "trivial":
+            return [name for name in providers if name == "history"]
+        return providers
@@ -0,0 +1,159 @@
+# services/recall.py
+import os
+import json
+import atexit
+import re
+import threading
+import zlib
+import numpy as np
+from typing import Dict, List, Optional
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9$']+")
+
+STOPWORDS = frozenset(
+    "a an and are can did do does for how i i'm in is it me my of on or so the "
+    "this to was what when where which with you your".split()
+)
+
+
+class HashingEmbedder:
+    """CPU-only text embedding: hashed unigrams + bigrams, L2-normalized"""
+    
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+    
+    def embed(self, text: str) -> np.ndarray:
+        tokens = [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+        
+        hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+        # Low bits pick the bucket, a high bit picks the sign (reduces collision bias)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs)
+        
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class RecallIndex:
+    """Incremental NumPy vector index of past chat exchanges.
+    
+    Vectors live in a growable float32 matrix persisted as ``vectors.npy`` and
+    reopened memory-mapped, so a cold start does not read the whole index.
+    """
+    
+    def __init__(self, path: Optional[str] = None, embedder: Optional[HashingEmbedder] = None):
+        self.path = path or os.getenv("RECALL_INDEX_DIR", ".recall_index")
+        self.embedder = embedder or HashingEmbedder()
+        self._lock = threading.Lock()
+        
+        self._vectors = np.zeros((1024, self.embedder.dim), dtype=np.float32)
+        self._count = 0
+        self.entries: List[Dict] = []  # {"user_message", "assistant_response", "created_at"}
+        # Newest chat_history row the Supabase backfill has indexed. Only a
+        # finished backfill moves it: live add() calls don't, or a backfill
+        # still paging would skip the older rows.
+        self.synced_created_at: Optional[str] = None
+        self._indexed = set()  # created_at of every entry, so rows aren't indexed twice
+        self._load()
+        
+        # Anything not saved before exit is re-indexed from Supabase on the next sync
+        atexit.register(self.save)
+    
+    def __len__(self):
+        return self._count
+    
+    def _load(self):
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        entries_path = os.path.join(self.path, "entries.jsonl")
+        if not (os.path.exists(vectors_path) and os.path.exists(entries_path)):
+            return
+        
+        with open(entries_path) as f:
+            self.entries = [json.loads(line) for line in f]
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._count = min(len(self.entries), len(self._vectors))
+        self.entries = self.entries[:self._count]
+        self._indexed = {e["created_at"] for e in self.entries if e.get("created_at")}
+        
+        sync_path = os.path.join(self.path, "sync.json")
+        if os.path.exists(sync_path):
+            with open(sync_path) as f:
+                self.synced_created_at = json.load(f).get("synced_created_at")
+        elif self._indexed:
+            # Indexes saved before sync.json existed were only fed by the backfill
+            self.synced_created_at = max(self._indexed)
+    
+    def save(self):
+        """Persist vectors and entries (vectors reload memory-mapped)"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            # Replace rather than overwrite: _vectors may still map the old file
+            vectors_path = os.path.join(self.path, "vectors.npy")
+            with open(f"{vectors_path}.tmp", "wb") as f:
+                np.save(f, np.asarray(self._vectors[:self._count]))
+            os.replace(f"{vectors_path}.tmp", vectors_path)
+            with open(os.path.join(self.path, "entries.jsonl"), "w") as f:
+                for entry in self.entries:
+                    f.write(json.dumps(entry) + "\n")
+            with open(os.path.join(self.path, "sync.json"), "w") as f:
+                json.dump({"synced_created_at": self.synced_created_at}, f)
+    
+    def add(self, user_message: str, assistant_response: str, created_at: Optional[str] = None):
+        """Embed and append one exchange; one already indexed at ``created_at`` is skipped"""
+        vector = self.embedder.embed(f"{user_message}\n{assistant_response}")
+        with self._lock:
+            if created_at in self._indexed:
+                return
+            if self._count == len(self._vectors) or not self._vectors.flags.writeable:
+                # Grow (and copy out of the read-only memory map) by doubling
+                grown = np.zeros((max(1024, len(self._vectors) * 2), self.embedder.dim), dtype=np.float32)
+                grown[:self._count] = self._vectors[:self._count]
+                self._vectors = grown
+            self._vectors[self._count] = vector
+            self._count += 1
+            self.entries.append({
+                "user_message": user_message,
+                "assistant_response": assistant_response,
+                "created_at": created_at
+            })
+            if created_at:
+                self._indexed.add(created_at)
+    
+    def search(self, query: str, k: int = 3, min_score: float = 0.2) -> List[Dict]:
+        """Top-k exchanges by cosine similarity to the query"""
+        if not self._count:
+            return []
+        
+        q = self.embedder.embed(query)
+        with self._lock:
+            scores = self._vectors[:self._count] @ q
+            k = min(k, self._count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                dict(self.entries[i], score=float(scores[i]))
+                for i in top if scores[i] >= min_score
+            ]
+    
+    def sync_from_supabase(self, supabase, page_size: int = 500) -> int:
+        """Index chat_history rows newer than the last finished backfill"""
+        synced = self.synced_created_at
+        new_rows = []
+        cursor = None
+        while True:
+            rows, cursor = supabase.get_chat_history_page(before=cursor, limit=page_size)
+            fresh = [row for row in rows if synced is None or row["created_at"] > synced]
+            new_rows.extend(fresh)
+            if not cursor or len(fresh) < len(rows):
+                break
+        
+        for row in reversed(new_rows):  # oldest first
+            self.add(row["user_message"], row["assistant_response"], row["created_at"])
+        if new_rows:
+            self.synced_created_at = new_rows[0]["created_at"]
+            self.save()
+        return len(new_rows)
@@ -0,0 +1,244 @@
+# services/resilience.py
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+from services.concurrency import RateLimitExceeded
+from utils.metrics import METRICS
+
+# (connect, read) seconds per upstream. Override with e.g. YNAB_TIMEOUT_SECONDS="2,8".
+UPSTREAM_TIMEOUTS = {
+    "ynab": (3.05, 10.0),
+    "supabase": (2.0, 5.0),
+    "anthropic": (5.0, 60.0),
+    "google_calendar": (3.05, 10.0),
+}
+
+
+def upstream_timeout(upstream: str) -> Tuple[float, float]:
+    """(connect, read) timeout for an upstream, honouring <UPSTREAM>_TIMEOUT_SECONDS"""
+    override = os.getenv(f"{upstream.upper()}_TIMEOUT_SECONDS")
+    if override:
+        connect, _, read = override.partition(",")
+        return float(connect), float(read or connect)
+    return UPSTREAM_TIMEOUTS[upstream]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status from requests/httpx, Anthropic, googleapiclient and PostgREST errors"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "resp", None), "status", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        # PostgREST puts the HTTP status in ``code`` when the body isn't JSON
+        status = error.code
+    return status
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Timeouts, dropped connections, 5xx and 429 count against the circuit.
+    
+    Other HTTP errors (404, 410, ...) mean the upstream answered, and local
+    rate limiting says nothing about the upstream at all.
+    """
+    if isinstance(error, (RateLimitExceeded, CircuitOpenError)):
+        return False
+    if isinstance(getattr(error, "code", None), str):
+        # PostgREST/Postgres error code: the database answered
+        return False
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500 or status == 429
+    return True
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after repeated failures.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail immediately with CircuitOpenError. Once ``reset_timeout_seconds``
+    have passed, one trial call is let through (half-open): success closes the
+    circuit, failure opens it for another period.
+    """
+    
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 3,
+                 reset_timeout_seconds: float = 30.0,
+                 is_failure: Callable[[Exception], bool] = is_upstream_failure):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.is_failure = is_failure
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+    
+    def _transition(self, state: str):
+        self.state = state
+        METRICS.inc("circuit_transitions_total", upstream=self.name, state=state)
+    
+    def is_open(self) -> bool:
+        """Open and still cooling down (a call now would be rejected)"""
+        with self._lock:
+            return self.state == "open" and \
+                time.monotonic() - self._opened_at < self.reset_timeout_seconds
+    
+    def allow(self) -> bool:
+        """Whether a call may go ahead; moves an expired open circuit to half-open"""
+        with self._lock:
+            if self.state == "open" and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+                self._transition("half_open")
+            if self.state == "half_open":
+                if self._trial_running:
+                    return self._reject()
+                self._trial_running = True
+            elif self.state == "open":
+                return self._reject()
+            self.stats["calls"] += 1
+            return True
+    
+    def _reject(self) -> bool:
+        self.stats["rejected"] += 1
+        METRICS.inc("circuit_rejections_total", upstream=self.name)
+        return False
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            if self.state != "closed":
+                self._transition("closed")
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            self.stats["failures"] += 1
+            if self.state == "half_open" or \
+                    (self.state == "closed" and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.stats["opened"] += 1
+                self._transition("open")
+    
+    def release(self):
+        """End a call that neither proved nor disproved upstream health"""
+        with self._lock:
+            self._trial_running = False
+    
+    @contextmanager
+    def protect(self):
+        """Run a block as one upstream call; raises CircuitOpenError when open"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable; retrying in "
+                                   f"{self.retry_in():.0f}s")
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        except BaseException:
+            # e.g. a streaming generator closed early
+            self.release()
+            raise
+        self.record_success()
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.reset_timeout_seconds - (time.monotonic() - self._opened_at))
+    
+    def reset(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+
+def is_unavailable(error: Exception) -> bool:
+    """The upstream failed or its circuit is open: worth serving a fallback"""
+    return isinstance(error, CircuitOpenError) or is_upstream_failure(error)
+
+
+class LastKnownGood:
+    """Remembers each key's last successful result to serve when a refresh fails.
+    
+    Values live in memory and, when a cache is given, in the shared cache so a
+    restarted process can still fall back. The cache is only written when a
+    value changes.
+    """
+    
+    def __init__(self, cache=None, ttl_seconds: int = 7 * 24 * 3600, prefix: str = "lkg"):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._values: Dict[str, Dict] = {}  # key -> {"value", "saved_at"}
+        self._stale_since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            previous = self._values.get(key)
+            entry = {"value": value, "saved_at": time.time()}
+            self._values[key] = entry
+            self._stale_since.pop(key, None)
+        if self.cache is not None and (previous is None or previous["value"] != value):
+            self.cache.set(f"{self.prefix}:{key}", entry, ttl_seconds=self.ttl_seconds)
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """{"value", "saved_at"} of the last good result, or None"""
+        with self._lock:
+            entry = self._values.get(key)
+        if entry is None and self.cache is not None:
+            entry = self.cache.get(f"{self.prefix}:{key}")
+            if entry is not None:
+                with self._lock:
+                    self._values.setdefault(key, entry)
+        return entry
+    
+    def call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """fn(), or the last good value for key if the upstream is unavailable.
+        
+        Other errors, or unavailability with nothing to fall back on, are re-raised.
+        """
+        try:
+            value = fn()
+        except Exception as e:
+            entry = self.get(key) if is_unavailable(e) else None
+            if entry is None:
+                raise
+            with self._lock:
+                self._stale_since[key] = entry["saved_at"]
+            METRICS.inc("fallback_served_total", key=key.split(":")[0])
+            return entry["value"]
+        if value is not None:
+            self._remember(key, value)
+        return value
+    
+    def stale_since(self, key: str) -> Optional[float]:
+        """When the value last served for key was saved, if it was a fallback"""
+        with self._lock:
+            return self._stale_since.get(key)
+
+
+# Shared across every Streamlit session in the process, like the rate limiters
+YNAB_CIRCUIT = CircuitBreaker("ynab")
+SUPABASE_CIRCUIT = CircuitBreaker("supabase", failure_threshold=5, reset_timeout_seconds=15.0)
+CLAUDE_CIRCUIT = CircuitBreaker("anthropic", failure_threshold=3, reset_timeout_seconds=20.0)
+CALENDAR_CIRCUIT = CircuitBreaker("google_calendar", reset_timeout_seconds=60.0)
+CIRCUITS = {c.name: c for c in (YNAB_CIRCUIT, SUPABASE_CIRCUIT, CLAUDE_CIRCUIT, CALENDAR_CIRCUIT)}
@@ -0,0 +1,145 @@
+# services/response_cache.py
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.metrics import METRICS
+
+WORD_PATTERN = re.compile(r"[a-z0-9$%]+")
+NUMBER_PATTERN = re.compile(r"\d")
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase words only, so case, spacing and punctuation don't change the key"""
+    return " ".join(WORD_PATTERN.findall(re.sub(r"['’]", "", text.lower())))
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Claude answers keyed on normalized prompt, context and recent history.
+    
+    Entries live in a TwoTierCache (in-process LRU plus the Supabase api_cache
+    table) with a TTL. Every key includes the YNAB data version, so new budget
+    data retires all earlier answers. With ``similarity_threshold`` set, a
+    prompt that misses can also match an earlier prompt asked under the same
+    context and history (cosine similarity of hashed-token embeddings); that
+    index is kept in memory only.
+    """
+    
+    def __init__(self,
+                 cache,
+                 data_version: Optional[Callable[[], Optional[str]]] = None,
+                 ttl_seconds: int = 1800,
+                 history_turns: int = 1,
+                 similarity_threshold: Optional[float] = None,
+                 max_near_entries: int = 512):
+        self.cache = cache
+        self.data_version = data_version
+        self.ttl_seconds = ttl_seconds
+        self.history_turns = history_turns
+        self.similarity_threshold = similarity_threshold
+        self.max_near_entries = max_near_entries
+        
+        # key -> (scope, prompt, vector) for near-duplicate lookups
+        self._near: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version = None
+        self._embedder = None
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stored": 0}
+    
+    def _scope(self, prompt: str, context: Optional[Dict], chat_history: Optional[List],
+               variant: str) -> str:
+        """Hash of everything besides the prompt that shapes the answer"""
+        version = self.data_version() if self.data_version else None
+        with self._lock:
+            if version != self._version:
+                # Entries for older data can never be looked up again
+                self._version = version
+                self._near.clear()
+        
+        fingerprint = dict(context or {})
+        if fingerprint.get("recall"):
+            # Similarity scores vary with the prompt; the recalled text is what matters
+            fingerprint["recall"] = [
+                (item["user_message"], item["assistant_response"]) for item in fingerprint["recall"]
+            ]
+        # Earlier user prompts only; repeating a question doesn't make it a follow-up
+        asked = [
+            normalize_prompt(message["content"]) for message in chat_history or []
+            if message["role"] == "user" and isinstance(message["content"], str)
+        ]
+        asked = [text for text in asked if text != prompt]
+        window = asked[-self.history_turns:] if self.history_turns else []
+        return _digest([version, fingerprint, window, variant])
+    
+    def _embed(self, prompt: str):
+        if self._embedder is None:
+            from services.recall import HashingEmbedder
+            self._embedder = HashingEmbedder()
+        return self._embedder.embed(prompt)
+    
+    def _find_near(self, scope: str, prompt: str, vector) -> Optional[str]:
+        """Key of the most similar earlier prompt in scope, if similar enough"""
+        numbers = {word for word in prompt.split() if NUMBER_PATTERN.search(word)}
+        best_key, best_score = None, self.similarity_threshold
+        with self._lock:
+            candidates = [(key, entry) for key, entry in self._near.items() if entry[0] == scope]
+        for key, (_, other, other_vector) in candidates:
+            # "spent in 2024" and "spent in 2025" embed alike but need different answers
+            if {word for word in other.split() if NUMBER_PATTERN.search(word)} != numbers:
+                continue
+            score = float(vector @ other_vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+    
+    def lookup(self,
+               user_message: str,
+               context: Optional[Dict] = None,
+               chat_history: Optional[List] = None,
+               variant: str = "") -> Tuple[Optional[str], Dict]:
+        """(cached response or None, slot); pass the slot to ``store`` after a miss.
+        
+        ``variant`` separates answers produced differently for the same input
+        (e.g. with and without tools). slot["match"] is "exact", "near" or None.
+        """
+        prompt = normalize_prompt(user_message)
+        scope = self._scope(prompt, context, chat_history, variant)
+        slot = {"key": f"claude_response:{scope}:{_digest(prompt)}", "scope": scope,
+                "prompt": prompt, "match": None}
+        
+        entry = self.cache.get(slot["key"])
+        if entry is None and self.similarity_threshold is not None and prompt:
+            slot["vector"] = self._embed(prompt)
+            near_key = self._find_near(scope, prompt, slot["vector"])
+            entry = self.cache.get(near_key) if near_key else None
+            if entry is not None:
+                slot["match"] = "near"
+        elif entry is not None:
+            slot["match"] = "exact"
+        
+        with self._lock:
+            self.stats[{"exact": "exact_hits", "near": "near_hits", None: "misses"}[slot["match"]]] += 1
+        METRICS.inc("claude_response_cache_total", result=slot["match"] or "miss")
+        return (entry["response"] if entry else None), slot
+    
+    def store(self, slot: Dict, response: str):
+        """Cache the answer for a slot returned by ``lookup``"""
+        self.cache.set(slot["key"], {"response": response, "saved_at": time.time()},
+                       ttl_seconds=self.ttl_seconds)
+        near = self.similarity_threshold is not None and slot["prompt"]
+        vector = slot.get("vector")
+        if near and vector is None:
+            vector = self._embed(slot["prompt"])
+        with self._lock:
+            self.stats["stored"] += 1
+            if near:
+                self._near[slot["key"]] = (slot["scope"], slot["prompt"], vector)
+                while len(self._near) > self.max_near_entries:
+                    self._near.popitem(last=False)
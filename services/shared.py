@@ -0,0 +1,98 @@
+# services/shared.py
+"""Process-wide service singletons shared by every page and session.
+
+Each getter is cached with ``st.cache_resource`` so the Dashboard and Chat
+pages reuse the same clients, caches and rate limiters instead of building
+one set per page. Services (and their SDK imports) are only constructed the
+first time a page asks for them.
+"""
+import os
+import streamlit as st
+from typing import Callable, Dict
+
+
+class LazyServices:
+    """Dict-style access to services that are built on first lookup"""
+    
+    def __init__(self, factories: Dict[str, Callable]):
+        self._factories = factories
+    
+    def __getitem__(self, name: str):
+        # Factories are cached getters, so repeat lookups are cheap
+        return self._factories[name]()
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+
+@st.cache_resource
+def get_supabase():
+    from services.supabase_client import SupabaseService
+    return SupabaseService()
+
+
+@st.cache_resource
+def get_cache():
+    from services.cache import TwoTierCache
+    return TwoTierCache(backend=get_supabase())
+
+
+@st.cache_resource
+def get_sync_store():
+    """Local copy of synced YNAB and Calendar records"""
+    from services.ynab_sync import create_sync_store
+    return create_sync_store(get_supabase())
+
+
+@st.cache_resource
+def get_ynab():
+    from services.ynab_service import YNABService
+    return YNABService(
+        default_budget_name=os.getenv("YNAB_DEFAULT_BUDGET_NAME"),
+        cache=get_cache(),
+        sync_store=get_sync_store()
+    )
+
+
+@st.cache_resource
+def get_calendar():
+    """Calendar events, kept current by a background incremental sync"""
+    from services.calendar_service import CalendarService
+    return CalendarService(store=get_sync_store()).start()
+
+
+@st.cache_resource
+def get_response_cache():
+    """Stored Claude answers, retired whenever the YNAB data changes"""
+    if os.getenv("CLAUDE_RESPONSE_CACHE", "1") == "0":
+        return None
+    from services.cache import TwoTierCache
+    from services.response_cache import ResponseCache
+    similarity = os.getenv("CLAUDE_RESPONSE_CACHE_SIMILARITY")
+    return ResponseCache(
+        cache=TwoTierCache(backend=get_supabase(), max_entries=512, name="claude_response"),
+        # The last synced version; the Chat page syncs first on turns that read budget data
+        data_version=lambda: get_ynab().get_data_version(),
+        ttl_seconds=int(os.getenv("CLAUDE_RESPONSE_CACHE_TTL_SECONDS", "1800")),
+        similarity_threshold=float(similarity) if similarity else None
+    )
+
+
+@st.cache_resource
+def get_claude():
+    from services.claude_service import ClaudeService
+    return ClaudeService(response_cache=get_response_cache())
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Start the /metrics endpoint once per process (only when METRICS_PORT is set)"""
+    from utils.metrics import start_metrics_server
+    return start_metrics_server()
+
+
+@st.cache_resource
+def get_readiness_monitor():
+    """Connection status for Supabase, YNAB and Anthropic, checked in the background"""
+    from utils.health import ReadinessMonitor
+    return ReadinessMonitor().start()
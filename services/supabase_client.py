@@ -1,8 +1,12 @@
 # services/supabase_client.py
 import os
-from datetime import datetime, timedelta
-from supabase import create_client, Client
+from datetime import datetime, timedelta, timezone
+from supabase import create_client, Client, ClientOptions
 import streamlit as st
+from typing import Optional, Tuple
+from services.resilience import CircuitOpenError, SUPABASE_CIRCUIT, upstream_timeout
+from services.write_behind import WriteBehindQueue
+from utils.metrics import timed, track
 
 class SupabaseService:
     def __init__(self):
@@ -13,63 +17,165 @@ class SupabaseService:
             st.error("Supabase credentials not found. Please check your .env file.")
             st.stop()
             
-        self.client: Client = create_client(url, key)
+        # The client's own default is a 120s read timeout
+        import httpx
+        connect, read = upstream_timeout("supabase")
+        timeout = httpx.Timeout(read, connect=connect)
+        self.client: Client = create_client(url, key, options=ClientOptions(
+            postgrest_client_timeout=timeout,
+            storage_client_timeout=timeout
+        ))
+        # Shared by every instance; when open, reads return empty results immediately
+        self.circuit = SUPABASE_CIRCUIT
+        
+        # Chat turns are persisted in batches by a background worker
+        self.chat_writer = WriteBehindQueue(self._insert_chats, name="chat-history-writer")
+    
+    @timed("supabase", "insert_chats")
+    def _insert_chats(self, rows):
+        """Insert a batch of chat rows (runs on the writer thread; errors are retried)"""
+        with self.circuit.protect():
+            self.client.table("chat_history").insert(rows).execute()
+    
+    @staticmethod
+    def _report(message: str, error: Exception):
+        """Show a Supabase error; an open circuit fails quietly so pages render at once"""
+        if not isinstance(error, CircuitOpenError):
+            st.error(f"{message}: {str(error)}")
     
     def save_chat(self, user_message: str, assistant_response: str):
-        """Save chat interaction to database"""
-        try:
-            result = self.client.table("chat_history").insert({
-                "user_message": user_message,
-                "assistant_response": assistant_response
-            }).execute()
-            return result
-        except Exception as e:
-            st.error(f"Error saving chat: {str(e)}")
-            return None
+        """Queue a chat interaction for saving without blocking the page.
+        
+        Returns the queued row.
+        """
+        row = {
+            "user_message": user_message,
+            "assistant_response": assistant_response,
+            # Stamped at enqueue time so batching can't reorder turns
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        if not self.chat_writer.put(row):
+            st.warning("Supabase has been unreachable for a while; this message won't be saved")
+        return row
     
     def get_chat_history(self, limit: int = 10):
         """Get recent chat history"""
+        # Read-your-writes: make sure queued turns are in the table first
+        self.chat_writer.flush(timeout=2.0)
         try:
-            result = self.client.table("chat_history")\
-                .select("*")\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
+            with self.circuit.protect(), track("supabase", "get_chat_history"):
+                result = self.client.table("chat_history")\
+                    .select("*")\
+                    .order("created_at", desc=True)\
+                    .limit(limit)\
+                    .execute()
             return result.data
         except Exception as e:
-            st.error(f"Error fetching chat history: {str(e)}")
+            self._report("Error fetching chat history", e)
             return []
     
-    def get_cached_data(self, cache_key: str, max_age_minutes: int = 60):
-        """Get cached data if not expired"""
+    def get_chat_history_page(self,
+                              before: Optional[Tuple[str, object]] = None,
+                              limit: int = 20):
+        """Get a page of chat history, newest first, using keyset pagination.
+        
+        ``before`` is the (created_at, id) cursor returned by the previous page.
+        Returns (rows, next_cursor); next_cursor is None once history is exhausted.
+        Served by the (created_at desc, id desc) index in migrations/.
+        """
+        self.chat_writer.flush(timeout=2.0)
         try:
-            current_time = datetime.now().isoformat()
-            result = self.client.table("api_cache")\
+            query = self.client.table("chat_history")\
                 .select("*")\
-                .eq("cache_key", cache_key)\
-                .gte("expires_at", current_time)\
-                .single()\
-                .execute()
+                .order("created_at", desc=True)\
+                .order("id", desc=True)\
+                .limit(limit)
+            
+            if before:
+                created_at, row_id = before
+                # Rows strictly older than the cursor; id breaks created_at ties
+                query = query.or_(
+                    f'created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt.{row_id})'
+                )
+            
+            with self.circuit.protect(), track("supabase", "get_chat_history_page"):
+                rows = query.execute().data
+            next_cursor = None
+            if len(rows) == limit:
+                next_cursor = (rows[-1]["created_at"], rows[-1]["id"])
+            return rows, next_cursor
+        except Exception as e:
+            self._report("Error fetching chat history", e)
+            return [], None
+    
+    def get_cached_entry(self, cache_key: str):
+        """Get the raw cache row ({"data", "expires_at"}) even if it has expired"""
+        try:
+            with self.circuit.protect(), track("supabase", "get_cached_entry"):
+                result = self.client.table("api_cache")\
+                    .select("data, expires_at")\
+                    .eq("cache_key", cache_key)\
+                    .limit(1)\
+                    .execute()
+            
+            # A miss is an empty result, not an error
+            if result.data:
+                return result.data[0]
+            return None
+        except Exception as e:
+            self._report("Error fetching cached data", e)
+            return None
+    
+    def get_cached_data(self, cache_key: str, raise_errors: bool = False):
+        """Get cached data if not expired.
+        
+        With ``raise_errors`` a failed read raises instead of looking like a miss.
+        """
+        try:
+            current_time = datetime.now(timezone.utc).isoformat()
+            with self.circuit.protect(), track("supabase", "get_cached_data"):
+                result = self.client.table("api_cache")\
+                    .select("data")\
+                    .eq("cache_key", cache_key)\
+                    .gte("expires_at", current_time)\
+                    .limit(1)\
+                    .execute()
             
             if result.data:
-                return result.data.get("data")
+                return result.data[0].get("data")
             return None
         except Exception as e:
-            st.error(f"Error fetching cached data: {str(e)}")
+            if raise_errors:
+                raise
+            self._report("Error fetching cached data", e)
             return None
     
-    def set_cached_data(self, cache_key: str, data: dict, ttl_minutes: int = 60):
+    def set_cached_data(self, cache_key: str, data, ttl_minutes: float = 60):
         """Cache data with expiration"""
         try:
-            expires_at = (datetime.now() + timedelta(minutes=ttl_minutes)).isoformat()
+            expires_at = (datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)).isoformat()
             
             # Upsert (insert or update)
-            result = self.client.table("api_cache").upsert({
-                "cache_key": cache_key,
-                "data": data,
-                "expires_at": expires_at
-            }).execute()
+            with self.circuit.protect(), track("supabase", "set_cached_data"):
+                result = self.client.table("api_cache").upsert({
+                    "cache_key": cache_key,
+                    "data": data,
+                    "expires_at": expires_at
+                }).execute()
             return result
         except Exception as e:
-            st.error(f"Error caching data: {str(e)}")
+            self._report("Error caching data", e)
+            return None
+    
+    def delete_cached_data(self, cache_key: str):
+        """Remove a cache entry"""
+        try:
+            with self.circuit.protect(), track("supabase", "delete_cached_data"):
+                return self.client.table("api_cache")\
+                    .delete()\
+                    .eq("cache_key", cache_key)\
+                    .execute()
+        except Exception as e:
+            self._report("Error deleting cached data", e)
             return None
\ No newline at end of file
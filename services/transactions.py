@@ -0,0 +1,203 @@
+# services/transactions.py
+import os
+import threading
+import pandas as pd
+from datetime import date
+from typing import Dict, List, Optional
+
+from services.ynab_sync import INTERNAL_CATEGORIES
+
+COLUMNS = ["id", "date", "amount", "payee_name", "category_name", "is_transfer"]
+
+
+def transactions_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Flatten YNAB transaction records (splits become one row per subtransaction)"""
+    rows = []
+    for t in records:
+        if t.get("deleted"):
+            continue
+        subtransactions = [s for s in t.get("subtransactions") or [] if not s.get("deleted")]
+        for part in subtransactions or [t]:
+            rows.append((
+                part["id"],
+                t["date"],
+                part["amount"],
+                part.get("payee_name") or t.get("payee_name"),
+                part.get("category_name") or t.get("category_name"),
+                bool(part.get("transfer_account_id") or t.get("transfer_account_id")),
+                t["id"]
+            ))
+    
+    frame = pd.DataFrame(rows, columns=COLUMNS + ["parent_id"])
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["amount"] = frame["amount"].astype("float64") / 1000  # milliunits → dollars
+    frame["payee_name"] = frame["payee_name"].astype("string")
+    frame["category_name"] = frame["category_name"].astype("string")
+    return frame
+
+
+class TransactionLedger:
+    """Columnar (Parquet) copy of synced transactions, one file per budget.
+    
+    Registered as a YNABSyncEngine listener so each delta is merged as it
+    arrives; a missing file is rebuilt from the sync store.
+    """
+    
+    def __init__(self, store, path: Optional[str] = None):
+        self.store = store
+        self.path = path or os.getenv("YNAB_LEDGER_DIR", ".ynab_ledger")
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+    
+    def _file(self, budget_id: str) -> str:
+        return os.path.join(self.path, f"{budget_id}.parquet")
+    
+    def _save(self, budget_id: str):
+        os.makedirs(self.path, exist_ok=True)
+        self._frames[budget_id].to_parquet(self._file(budget_id), index=False)
+    
+    def _load(self, budget_id: str) -> pd.DataFrame:
+        """The budget's frame, read from disk or the sync store if needed (hold the lock)"""
+        if budget_id not in self._frames:
+            if os.path.exists(self._file(budget_id)):
+                self._frames[budget_id] = pd.read_parquet(self._file(budget_id))
+            else:
+                records = self.store.get_records(budget_id, "transactions")
+                self._frames[budget_id] = transactions_to_frame(records)
+                self._save(budget_id)
+        return self._frames[budget_id]
+    
+    def frame(self, budget_id: str) -> pd.DataFrame:
+        """All transactions for a budget as a DataFrame"""
+        with self._lock:
+            return self._load(budget_id)
+    
+    def apply(self, budget_id: str, kind: str, records: List[Dict], replace: bool = False):
+        """Sync listener: merge a transaction delta into the columnar copy"""
+        if kind != "transactions":
+            return
+        
+        try:
+            changes = transactions_to_frame(records)
+            if replace:
+                with self._lock:
+                    self._frames[budget_id] = changes
+                    self._save(budget_id)
+                return
+            
+            with self._lock:
+                # Read and merge under one lock so overlapping deltas can't drop each other
+                current = self._load(budget_id)
+                # Every changed parent (including deletions) replaces all of its old rows
+                changed_parents = pd.Index([r["id"] for r in records])
+                kept = current[~current["parent_id"].isin(changed_parents)]
+                self._frames[budget_id] = pd.concat([kept, changes], ignore_index=True)
+                self._save(budget_id)
+        except Exception:
+            # Fall back to rebuilding from the sync store on next read
+            with self._lock:
+                self._frames.pop(budget_id, None)
+                if os.path.exists(self._file(budget_id)):
+                    os.remove(self._file(budget_id))
+
+
+def spending_insights(frame: pd.DataFrame,
+                      today: Optional[date] = None,
+                      months: int = 12,
+                      top_n: int = 5) -> Dict:
+    """Month-over-month trend, burn rate, top payees and category projections"""
+    today = pd.Timestamp(today or date.today())
+    month_start = today.to_period("M").to_timestamp()
+    days_in_month = today.days_in_month
+    elapsed_fraction = today.day / days_in_month
+    
+    # Spending = outflows that are not transfers or Ready to Assign
+    spending = frame[
+        (frame["amount"] < 0)
+        & ~frame["is_transfer"]
+        & ~frame["category_name"].isin(INTERNAL_CATEGORIES)
+        & (frame["date"] <= today)
+    ]
+    spent = -spending["amount"]
+    month = spending["date"].dt.to_period("M")
+    
+    monthly = spent.groupby(month).sum()
+    monthly = monthly.reindex(
+        pd.period_range(end=today.to_period("M"), periods=months, freq="M"),
+        fill_value=0.0
+    )
+    
+    # Compare the last two completed months
+    completed = monthly.iloc[:-1]
+    month_over_month = None
+    if len(completed) >= 2 and completed.iloc[-2] > 0:
+        month_over_month = float(completed.iloc[-1] / completed.iloc[-2] - 1)
+    
+    current = spending["date"] >= month_start
+    current_spent = spent[current]
+    month_to_date = float(current_spent.sum())
+    burn_rate = month_to_date / today.day
+    
+    by_payee = current_spent.groupby(spending.loc[current, "payee_name"]).sum().nlargest(top_n)
+    by_category = current_spent.groupby(spending.loc[current, "category_name"]).sum()
+    projected = (by_category / elapsed_fraction).nlargest(top_n)
+    
+    return {
+        "monthly": [
+            {"month": str(period), "spent": float(value)}
+            for period, value in monthly.items()
+        ],
+        "month_over_month": month_over_month,
+        "month_to_date": month_to_date,
+        "burn_rate_per_day": burn_rate,
+        "projected_month_spend": burn_rate * days_in_month,
+        "top_payees": [
+            {"payee": str(payee), "spent": float(value)}
+            for payee, value in by_payee.items()
+        ],
+        "category_projections": [
+            {
+                "category": str(category),
+                "spent": float(by_category[category]),
+                "projected": float(value)
+            }
+            for category, value in projected.items()
+        ]
+    }
+
+
+def search_transactions(frame: pd.DataFrame,
+                        payee: Optional[str] = None,
+                        category: Optional[str] = None,
+                        since: Optional[str] = None,
+                        until: Optional[str] = None,
+                        limit: int = 10) -> Dict:
+    """Transactions matching a payee/category substring and date range, newest first.
+    
+    ``total_spent`` covers every match, not just the ``limit`` rows returned.
+    """
+    mask = pd.Series(True, index=frame.index)
+    if payee:
+        mask &= frame["payee_name"].str.contains(payee, case=False, regex=False, na=False)
+    if category:
+        mask &= frame["category_name"].str.contains(category, case=False, regex=False, na=False)
+    if since:
+        mask &= frame["date"] >= pd.Timestamp(since)
+    if until:
+        mask &= frame["date"] <= pd.Timestamp(until)
+    
+    matches = frame[mask].sort_values("date", ascending=False)
+    outflows = matches.loc[matches["amount"] < 0, "amount"]
+    return {
+        "count": int(len(matches)),
+        "total_spent": float(-outflows.sum()),
+        "transactions": [
+            {
+                "date": row.date.date().isoformat(),
+                "payee": None if pd.isna(row.payee_name) else str(row.payee_name),
+                "category": None if pd.isna(row.category_name) else str(row.category_name),
+                "amount": float(row.amount)
+            }
+            for row in matches.head(limit).itertuples()
+        ]
+    }
@@ -0,0 +1,192 @@
+# services/write_behind.py
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List
+from services.resilience import CircuitOpenError
+from utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Queue markers used to wake the worker
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Background worker that batches writes off the Streamlit script thread.
+    
+    Rows are written in enqueue order by ``write_batch(rows)``. A batch is sent
+    when it reaches ``max_batch_size`` or ``flush_interval_seconds`` after its
+    first row. A failed batch stays at the head of the queue and is retried
+    with exponential backoff until it is written; rejections from an open
+    circuit breaker wait for the circuit instead of counting as attempts.
+    At most ``max_pending_rows`` rows are held; rows beyond that, or still
+    unwritten when the interpreter exits, are dropped and logged as errors.
+    """
+    
+    def __init__(self,
+                 write_batch: Callable[[List[Dict]], None],
+                 max_batch_size: int = 20,
+                 flush_interval_seconds: float = 2.0,
+                 max_retries: int = 5,
+                 retry_backoff_seconds: float = 0.5,
+                 max_pending_rows: int = 5000,
+                 name: str = "write-behind"):
+        self.write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        # Failed attempts before the outage is logged; retries continue after that
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_pending_rows = max_pending_rows
+        self.name = name
+        
+        self._queue: "queue.Queue" = queue.Queue()
+        self._done = threading.Condition()
+        self._wake = threading.Event()  # cuts a retry wait short at exit
+        self._enqueued = 0
+        self._completed = 0  # written or dropped
+        self._stopping = False
+        self._stats = {
+            "batches_written": 0,
+            "rows_written": 0,
+            "failures": 0,
+            "circuit_waits": 0,
+            "rows_dropped": 0,
+            "last_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "last_error": None
+        }
+        
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+    
+    def put(self, row: Dict) -> bool:
+        """Queue a row for writing; returns immediately, False if the queue is full"""
+        with self._done:
+            if self._enqueued - self._completed >= self.max_pending_rows:
+                self._stats["rows_dropped"] += 1
+                full = True
+            else:
+                self._enqueued += 1
+                full = False
+        if full:
+            self._report_dropped(1, "queue full")
+            return False
+        self._queue.put(row)
+        return True
+    
+    def _report_dropped(self, count: int, reason: str):
+        METRICS.inc("write_behind_rows_dropped_total", count, queue=self.name)
+        logger.error("%s dropped %d row(s) (%s); last error: %s",
+                     self.name, count, reason, self._stats["last_error"])
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is written; False on timeout"""
+        with self._done:
+            target = self._enqueued
+            if self._completed >= target:
+                return True
+        self._queue.put(_FLUSH)
+        with self._done:
+            return self._done.wait_for(lambda: self._completed >= target, timeout)
+    
+    def close(self, timeout: float = 10.0):
+        """Flush pending rows and stop the worker"""
+        if self._stopping:
+            return
+        self._stopping = True
+        self._queue.put(_STOP)
+        self._wake.set()
+        self._worker.join(timeout)
+        with self._done:
+            unwritten = self._enqueued - self._completed
+        if unwritten:
+            self._stats["rows_dropped"] += unwritten
+            self._report_dropped(unwritten, "still unwritten at exit")
+    
+    def _next_batch(self):
+        """Collect rows until the batch is full, the interval elapses or a marker arrives"""
+        batch = []
+        urgent = False
+        deadline = None
+        
+        while len(batch) < self.max_batch_size:
+            try:
+                if urgent:
+                    item = self._queue.get_nowait()
+                elif deadline is None:
+                    item = self._queue.get()
+                else:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            
+            if item is _STOP or item is _FLUSH:
+                urgent = True
+                continue
+            
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval_seconds
+        
+        return batch
+    
+    def _write(self, batch: List[Dict]):
+        """Write a batch, retrying until it succeeds; later batches wait behind it"""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self.write_batch(batch)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._stats["batches_written"] += 1
+                self._stats["rows_written"] += len(batch)
+                self._stats["last_flush_ms"] = elapsed_ms
+                self._stats["total_flush_ms"] += elapsed_ms
+                break
+            except CircuitOpenError as e:
+                # Nothing was attempted; wait for the circuit to let a probe through
+                self._stats["circuit_waits"] += 1
+                self._stats["last_error"] = str(e) or "circuit open"
+                delay = self.retry_backoff_seconds * (2 ** min(attempt, 6))
+            except Exception as e:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = str(e)
+                attempt += 1
+                if attempt == self.max_retries:
+                    logger.error("%s: %d row(s) still unwritten after %d attempts, retrying: %s",
+                                 self.name, len(batch), attempt, e)
+                delay = self.retry_backoff_seconds * (2 ** min(attempt - 1, 6))
+            if self._stopping:
+                # Exiting: close() reports the rows left unwritten
+                return
+            self._wake.wait(min(delay, 30))
+        
+        with self._done:
+            self._completed += len(batch)
+            self._done.notify_all()
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            # The stop marker may have been taken while collecting that batch
+            if self._stopping and self._queue.empty():
+                return
+    
+    def stats(self) -> Dict:
+        """Queue depth and flush latency metrics"""
+        with self._done:
+            depth = self._enqueued - self._completed
+        stats = dict(self._stats)
+        stats["queue_depth"] = depth
+        stats["avg_flush_ms"] = (
+            stats["total_flush_ms"] / stats["batches_written"] if stats["batches_written"] else 0.0
+        )
+        return stats
@@ -1,55 +1,265 @@
 # services/ynab_service.py
 
 import os
+import time
+import threading
 import requests
 import streamlit as st
-from typing import Dict, Optional
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from datetime import date
+from typing import Dict, List, Optional
+from services.cache import TwoTierCache
+from services.concurrency import RateLimitExceeded, SingleFlight, YNAB_RATE_LIMIT
+from services.http_client import AsyncJSONClient, build_session
+from services.resilience import (
+    CircuitOpenError, LastKnownGood, YNAB_CIRCUIT, is_upstream_failure, upstream_timeout
+)
+from services.ynab_sync import INTERNAL_CATEGORIES, YNABSyncEngine
+from utils.metrics import track
+
+# What get_budget_context_for_llm returns when there is no summary to describe
+BUDGET_UNAVAILABLE = "Budget information not available."
+
+def month_starts(start: str, end: str) -> List[str]:
+    """First-of-month dates ("YYYY-MM-01") from start to end, inclusive"""
+    year, month = int(start[:4]), int(start[5:7])
+    end_year, end_month = int(end[:4]), int(end[5:7])
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year:04d}-{month:02d}-01")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
 
 class YNABService:
-    def __init__(self, default_budget_name: Optional[str] = None):
+    BUDGET_INDEX_CACHE_KEY = "ynab_budget_index"
+    # Closed months don't change, so their snapshots are kept indefinitely
+    CLOSED_MONTH_TTL_SECONDS = 10 * 365 * 24 * 3600
+    # How long a request may wait for the shared hourly request budget
+    RATE_LIMIT_WAIT_SECONDS = 5.0
+    
+    def __init__(self,
+                 default_budget_name: Optional[str] = None,
+                 cache=None,
+                 budget_index_ttl_minutes: int = 60,
+                 sync_store=None):
+        # Most recent error or warning, kept even when there is no page to show it on
+        self.last_error: Optional[str] = None
+        
         # Azure App Service environment variables
         self.access_token = os.getenv("YNAB_ACCESS_TOKEN")
-        self.base_url = "https://api.youneedabudget.com/v1"
+        self.base_url = os.getenv("YNAB_BASE_URL", "https://api.youneedabudget.com/v1")
         
         self.default_budget_name = (
             default_budget_name or 
             os.getenv("YNAB_DEFAULT_BUDGET_NAME")
         )
         
+        # Optional TwoTierCache used to keep the budget name→ID index across processes
+        self.cache = cache
+        self.budget_index_ttl_minutes = budget_index_ttl_minutes
+        self._budget_index: Optional[List[Dict]] = None
+        self._budget_index_expires_at = 0.0
+        self.sync_engine = None
+        self._sync_store = sync_store
+        self._ledger = None
+        self._ledger_lock = threading.Lock()
+        self.last_budget_id: Optional[str] = None
+        self._missing_budget_names = set()  # already reported as not found
+        # Closed-month summaries; memory-only when there is no shared cache
+        self._month_cache = cache if cache is not None else TwoTierCache(name="ynab_months")
+        self._month_keys = set()
+        
+        # This instance is shared by every session, so identical concurrent
+        # reads share one request and all requests draw on one hourly budget
+        self._flights = SingleFlight()
+        self.rate_limit = YNAB_RATE_LIMIT
+        
+        # Requests give up after these deadlines; repeated failures open the
+        # circuit so pages fall back to the last good summary without waiting
+        self.timeout = upstream_timeout("ynab")
+        self.circuit = YNAB_CIRCUIT
+        self.fallback = LastKnownGood(cache=cache, prefix="ynab_lkg")
+        
         if not self.access_token:
             self.is_connected = False
-            st.warning("YNAB_ACCESS_TOKEN not found in environment variables")
+            self._notify("warning", "YNAB_ACCESS_TOKEN not found in environment variables")
         else:
             self.is_connected = True
             self.headers = {
                 "Authorization": f"Bearer {self.access_token}",
                 "Content-Type": "application/json"
             }
+            # Persistent pooled session so calls reuse the same TCP/TLS connection
+            self.session = build_session(headers=self.headers, read_retries=1)
+            self.async_client = AsyncJSONClient(self.base_url, headers=self.headers,
+                                                timeout=self.timeout)
+            
+            # With a store, month data is delta-synced locally instead of re-downloaded
+            if sync_store is not None:
+                self.sync_engine = YNABSyncEngine(self._get, sync_store)
+                # Columnar transaction history kept current by the same deltas
+                self.sync_engine.listeners.append(
+                    lambda *args: self.ledger.apply(*args)
+                )
+    
+    def _notify(self, level: str, message: str):
+        """Show a message on the page (st.error, st.info, ...).
+        
+        Background threads such as the dashboard refresher have no page, so
+        there the message is only kept in ``last_error``.
+        """
+        if level in ("error", "warning"):
+            self.last_error = message
+        if get_script_run_ctx(suppress_warning=True) is not None:
+            getattr(st, level)(message)
+    
+    @property
+    def ledger(self):
+        """Transaction ledger, built on first use so pandas loads off the startup path"""
+        with self._ledger_lock:
+            if self._ledger is None and self.sync_engine is not None:
+                from services.transactions import TransactionLedger
+                self._ledger = TransactionLedger(self._sync_store)
+        return self._ledger
+    
+    def _get(self, path: str) -> Dict:
+        """GET a YNAB endpoint over the pooled session and return its data payload.
+        
+        Concurrent GETs of the same path share one request.
+        """
+        return self._flights.do(path, lambda: self._fetch(path))
+    
+    def _fetch(self, path: str) -> Dict:
+        with self.circuit.protect():
+            self.rate_limit.acquire(timeout=self.RATE_LIMIT_WAIT_SECONDS)
+            with track("ynab", "get"):
+                response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+                response.raise_for_status()
+        return response.json()["data"]
     
     # ...rest of existing code...
     
     def list_budget_names(self):
         """Helper method to see all available budget names"""
-        budgets = self.get_budgets()
+        budgets = self.get_budget_index()
         if budgets:
             return [budget["name"] for budget in budgets]
         return []
     
+    def get_budget_index(self) -> Optional[List[Dict]]:
+        """Get the cached [{"id", "name"}] budget index, refreshing it when expired"""
+        if self._budget_index is not None and time.time() < self._budget_index_expires_at:
+            return self._budget_index
+        
+        index = None
+        
+        # A cold process can pick the index up from Supabase instead of /budgets
+        if self.cache:
+            cached = self.cache.get(self.BUDGET_INDEX_CACHE_KEY)
+            if cached:
+                index = cached.get("budgets")
+        
+        if not index:
+            budgets = self.get_budgets()
+            if not budgets:
+                # Keep using an expired index rather than failing every lookup
+                return self._budget_index
+            index = [{"id": b["id"], "name": b["name"]} for b in budgets]
+            if self.cache:
+                self.cache.set(
+                    self.BUDGET_INDEX_CACHE_KEY,
+                    {"budgets": index},
+                    ttl_seconds=self.budget_index_ttl_minutes * 60
+                )
+        
+        self._budget_index = index
+        self._budget_index_expires_at = time.time() + self.budget_index_ttl_minutes * 60
+        return index
+    
+    def invalidate_budget_index(self):
+        """Drop the budget index so the next lookup re-lists budgets"""
+        self._budget_index = None
+        self._budget_index_expires_at = 0.0
+        if self.cache:
+            self.cache.invalidate(self.BUDGET_INDEX_CACHE_KEY)
+    
     def get_budgets(self):
         """Get all budgets"""
         if not self.is_connected:
             return None
             
         try:
-            response = requests.get(
-                f"{self.base_url}/budgets",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()["data"]["budgets"]
+            return self._get("/budgets")["budgets"]
+        except CircuitOpenError:
+            return None
         except Exception as e:
-            st.error(f"YNAB Error: {str(e)}")
+            self._notify("error", f"YNAB Error: {str(e)}")
+            return None
+    
+    def resolve_budget_id(self, budget_name: Optional[str] = None) -> Optional[str]:
+        """Turn a budget name (or the default) into a budget ID.
+        
+        Called on every budget read, often mid-response, so it stays quiet
+        apart from reporting a missing budget name once.
+        """
+        # Resolve budget names to IDs (cached, no /budgets call when warm)
+        budgets = self.get_budget_index()
+        if not budgets:
             return None
+        
+        # Determine which budget to use
+        budget_name_to_use = budget_name or self.default_budget_name
+        
+        if budget_name_to_use:
+            # Find budget by exact name match
+            budget = next((b for b in budgets if b["name"] == budget_name_to_use), None)
+            if not budget:
+                available_names = [b['name'] for b in budgets]
+                if budget_name_to_use not in self._missing_budget_names:
+                    self._missing_budget_names.add(budget_name_to_use)
+                    self._notify("error", f"Budget '{budget_name_to_use}' not found. Available budgets: "
+                                          f"{available_names}. Using '{available_names[0]}' instead.")
+                return budgets[0]["id"]
+            return budget["id"]
+        
+        # No specific budget name, use first one
+        return budgets[0]["id"]
+    
+    def _summarize_month(self, month_data: Dict) -> Dict:
+        """Convert a YNAB month payload into the summary used by the pages"""
+        summary = {
+            "month": month_data["month"],  # This will be the actual month from YNAB
+            "budgeted": month_data["budgeted"] / 1000,  # Convert from milliunits
+            "spent": abs(month_data["activity"]) / 1000,
+            "remaining": (month_data["budgeted"] + month_data["activity"]) / 1000,
+            "categories": [],
+            "age_of_money": month_data.get("age_of_money", 0)
+        }
+        
+        # Filter out internal categories and get top spending
+        valid_categories = [
+            cat for cat in month_data["categories"] 
+            if not cat["hidden"] and 
+            cat["name"] not in INTERNAL_CATEGORIES and
+            cat["activity"] < 0  # Only categories with spending
+        ]
+        
+        # Sort by spending amount
+        categories = sorted(
+            valid_categories, 
+            key=lambda x: abs(x["activity"]), 
+            reverse=True
+        )[:5]
+        
+        for cat in categories:
+            summary["categories"].append({
+                "name": cat["name"],
+                "budgeted": cat["budgeted"] / 1000,
+                "spent": abs(cat["activity"]) / 1000,
+                "remaining": cat["balance"] / 1000
+            })
+        
+        return summary
     
     def get_current_month_budget(self, budget_name: Optional[str] = None) -> Optional[Dict]:
         """Get current month's budget summary"""
@@ -57,91 +267,234 @@ class YNABService:
             return None
             
         try:
-            # Get all budgets
-            budgets = self.get_budgets()
-            if not budgets:
+            budget_id = self.resolve_budget_id(budget_name)
+            if not budget_id:
                 return None
+            self.last_budget_id = budget_id
             
-            # Determine which budget to use
-            budget_name_to_use = budget_name or self.default_budget_name
-            
-            if budget_name_to_use:
-                # Find budget by exact name match
-                budget = next((b for b in budgets if b["name"] == budget_name_to_use), None)
-                if not budget:
-                    available_names = [b['name'] for b in budgets]
-                    st.error(f"Budget '{budget_name_to_use}' not found. Available budgets: {available_names}")
-                    st.info(f"Using first available budget: '{available_names[0]}' instead.")
-                    budget_id = budgets[0]["id"]
-                else:
-                    budget_id = budget["id"]
-                    st.success(f"✅ Using budget: '{budget_name_to_use}'")
-            else:
-                # No specific budget name, use first one
-                budget_id = budgets[0]["id"]
-                st.info(f"Using default budget: '{budgets[0]['name']}'")
-            
-            
-            # Use 'current' for the current month instead of a specific date
-            # This ensures we always get valid data
-            response = requests.get(
-                f"{self.base_url}/budgets/{budget_id}/months/current",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            
-            month_data = response.json()["data"]["month"]
-            
-            # Process the data
-            summary = {
-                "month": month_data["month"],  # This will be the actual month from YNAB
-                "budgeted": month_data["budgeted"] / 1000,  # Convert from milliunits
-                "spent": abs(month_data["activity"]) / 1000,
-                "remaining": (month_data["budgeted"] + month_data["activity"]) / 1000,
-                "categories": [],
-                "age_of_money": month_data.get("age_of_money", 0)
-            }
-            
-            # Filter out internal categories and get top spending
-            valid_categories = [
-                cat for cat in month_data["categories"] 
-                if not cat["hidden"] and 
-                cat["name"] not in ["Inflow: Ready to Assign", "Internal Master Category"] and
-                cat["activity"] < 0  # Only categories with spending
-            ]
-            
-            # Sort by spending amount
-            categories = sorted(
-                valid_categories, 
-                key=lambda x: abs(x["activity"]), 
-                reverse=True
-            )[:5]
-            
-            for cat in categories:
-                summary["categories"].append({
-                    "name": cat["name"],
-                    "budgeted": cat["budgeted"] / 1000,
-                    "spent": abs(cat["activity"]) / 1000,
-                    "remaining": cat["balance"] / 1000
-                })
-            
+            # Sessions asking at the same time wait on the first one's result.
+            # If YNAB fails (or its circuit is open) the last good summary is served.
+            key = f"current_month:{budget_id}"
+            summary = self.fallback.call(key, lambda: self._flights.do(
+                ("current_month", budget_id), lambda: self._load_current_month(budget_id)
+            ))
+            stale_since = self.fallback.stale_since(key)
+            if stale_since:
+                self._notify(
+                    "warning",
+                    "YNAB is not responding; showing budget data from "
+                    f"{time.strftime('%b %d %I:%M %p', time.localtime(stale_since))}"
+                )
             return summary
             
+        except CircuitOpenError as e:
+            self._notify("warning", f"YNAB Error: {str(e)}")
+            return None
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
-                st.error("YNAB budget not found. Please check your access token.")
+                self._notify("error", "YNAB budget not found. Please check your access token.")
             else:
-                st.error(f"YNAB HTTP Error: {e}")
+                self._notify("error", f"YNAB HTTP Error: {e}")
             return None
         except Exception as e:
-            st.error(f"YNAB Error: {str(e)}")
+            self._notify("error", f"YNAB Error: {str(e)}")
+            return None
+    
+    def _load_current_month(self, budget_id: str) -> Dict:
+        if self.sync_engine:
+            # Pull only what changed since the last sync, then read locally
+            self.sync_engine.sync(budget_id)
+            month_data = self.sync_engine.get_month(budget_id)
+        else:
+            # Use 'current' for the current month instead of a specific date
+            # This ensures we always get valid data
+            month_data = self._get(f"/budgets/{budget_id}/months/current")["month"]
+        
+        return self._summarize_month(month_data)
+    
+    def get_months(self, budget_id: str, months: List[str]) -> Dict[str, Optional[Dict]]:
+        """Fetch several month payloads concurrently (e.g. ["2025-06-01", "current"])"""
+        if not self.is_connected or not months:
+            return {}
+        
+        paths = [f"/budgets/{budget_id}/months/{month}" for month in months]
+        if not self.circuit.allow():
+            return {}
+        try:
+            for _ in paths:
+                self.rate_limit.acquire(timeout=self.RATE_LIMIT_WAIT_SECONDS)
+            with track("ynab", "get_many"):
+                results = self.async_client.get_many_sync(paths)
+        except RateLimitExceeded as e:
+            self.circuit.release()
+            self._notify("error", f"YNAB Error: {str(e)}")
+            return {}
+        except Exception as e:
+            # Callers keep whatever they already have (e.g. cached closed months)
+            self.circuit.record_failure()
+            self._notify("error", f"YNAB Error: {str(e)}")
+            return {}
+        
+        # One batch counts as one call against the circuit
+        if any(isinstance(r, Exception) and is_upstream_failure(r) for r in results):
+            self.circuit.record_failure()
+        else:
+            self.circuit.record_success()
+        
+        fetched = {}
+        for month, result in zip(months, results):
+            if isinstance(result, Exception):
+                self._notify("error", f"YNAB Error ({month}): {str(result)}")
+                fetched[month] = None
+            else:
+                fetched[month] = result["data"]["month"]
+        return fetched
+    
+    def get_month_range(self,
+                        start: str,
+                        end: Optional[str] = None,
+                        budget_name: Optional[str] = None) -> List[Dict]:
+        """Month summaries from start to end (default: current month), oldest first.
+        
+        Closed months are read through the cache without expiry, so sessions
+        asking for the same month share one fetch; only the current month is
+        fetched on every call. Months that are fetched go out in one
+        concurrent batch; if it fails, the cached months are still returned.
+        """
+        if not self.is_connected:
+            return []
+        
+        budget_id = self.resolve_budget_id(budget_name)
+        if not budget_id:
+            return []
+        
+        current = date.today().replace(day=1).isoformat()
+        months = [m for m in month_starts(start, end or current) if m <= current]
+        missing = [
+            m for m in months
+            if m == current or not self._month_cache.contains(self._month_key(budget_id, m))
+        ]
+        fetched = {}  # month -> summary (None on failure)
+        
+        def load(month: str) -> Optional[Dict]:
+            if month not in fetched:
+                # The first miss fetches every missing month in one batch
+                batch = [m for m in missing if m not in fetched and m != month] + [month]
+                for m, month_data in self.get_months(budget_id, batch).items():
+                    fetched[m] = self._summarize_month(month_data) if month_data else None
+                    # Cache the rest of the batch now so concurrent readers hit it
+                    if m != month and m < current and fetched[m] is not None:
+                        self._month_cache.set(self._month_key(budget_id, m), fetched[m],
+                                              ttl_seconds=self.CLOSED_MONTH_TTL_SECONDS)
+            return fetched.get(month)
+        
+        snapshots = []
+        for month in months:
+            if month < current:
+                key = self._month_key(budget_id, month)
+                snapshot = self._month_cache.get_or_fetch(
+                    key, lambda month=month: load(month), ttl_seconds=self.CLOSED_MONTH_TTL_SECONDS
+                )
+            else:
+                snapshot = load(month)
+            if snapshot:
+                snapshots.append(snapshot)
+        return snapshots
+    
+    def _month_key(self, budget_id: str, month: str) -> str:
+        key = f"ynab_month:{budget_id}:{month}"
+        self._month_keys.add(key)
+        return key
+    
+    def invalidate_month_snapshots(self):
+        """Forget cached closed-month snapshots (e.g. after editing a past month)"""
+        for key in list(self._month_keys):
+            self._month_cache.invalidate(key)
+        self._month_keys.clear()
+    
+    def get_data_version(self, refresh: bool = False) -> Optional[str]:
+        """Version of the most recently read budget data, if delta sync is enabled.
+        
+        With ``refresh`` pending changes are pulled first (at most once per sync
+        interval), so the version reflects YNAB now rather than the last read.
+        """
+        if not self.sync_engine:
+            return None
+        if refresh:
+            try:
+                budget_id = self.last_budget_id or self.resolve_budget_id()
+                if budget_id:
+                    self.last_budget_id = budget_id
+                    self.sync_engine.sync(budget_id)
+            except Exception:
+                pass  # YNAB unreachable: the last synced version still describes our data
+        if not self.last_budget_id:
+            return None
+        return self.sync_engine.data_version(self.last_budget_id)
+    
+    def get_categories(self, budget_name: Optional[str] = None) -> Optional[List[Dict]]:
+        """Every visible current-month category with budgeted/spent/remaining in dollars"""
+        if not self.is_connected:
+            return None
+        try:
+            budget_id = self.resolve_budget_id(budget_name)
+            if not budget_id:
+                return None
+            self.last_budget_id = budget_id
+            if self.sync_engine:
+                self.sync_engine.sync(budget_id)
+                categories = self._sync_store.get_records(budget_id, "categories")
+            else:
+                categories = self._get(f"/budgets/{budget_id}/months/current")["month"]["categories"]
+        except Exception as e:
+            self._notify("error", f"YNAB Error: {str(e)}")
+            return None
+        
+        return [
+            {
+                "name": cat["name"],
+                "group": cat.get("category_group_name"),
+                "budgeted": cat["budgeted"] / 1000,
+                "spent": abs(cat["activity"]) / 1000,
+                "remaining": cat["balance"] / 1000
+            }
+            for cat in categories
+            if not cat.get("hidden") and not cat.get("deleted") and cat["name"] not in INTERNAL_CATEGORIES
+        ]
+    
+    def search_transactions(self, **filters) -> Optional[Dict]:
+        """Search synced transactions (see services.transactions.search_transactions)"""
+        if not self.ledger:
+            return None
+        budget_id = self.last_budget_id or self.resolve_budget_id()
+        if not budget_id:
+            return None
+        try:
+            self.sync_engine.sync(budget_id)
+        except Exception:
+            pass  # search what was synced before YNAB became unreachable
+        from services.transactions import search_transactions
+        return search_transactions(self.ledger.frame(budget_id), **filters)
+    
+    def get_spending_insights(self) -> Optional[Dict]:
+        """Trends, burn rate, top payees and projections from synced transactions"""
+        if not self.ledger:
+            return None
+        try:
+            budget_id = self.last_budget_id or self.resolve_budget_id()
+            if not budget_id:
+                return None
+            from services.transactions import spending_insights
+            return spending_insights(self.ledger.frame(budget_id))
+        except Exception as e:
+            self._notify("error", f"Spending analytics error: {str(e)}")
             return None
     
     def get_budget_context_for_llm(self, budget_name: Optional[str] = None) -> str:
         """Format budget data for Claude"""
         summary = self.get_current_month_budget(budget_name)
         if not summary:
-            return "Budget information not available."
+            return BUDGET_UNAVAILABLE
         
         context = f"""Current Month Budget ({summary['month']}):
 - Total Budgeted: ${summary['budgeted']:,.2f}
@@ -154,4 +507,16 @@ Top Spending Categories:"""
         for cat in summary['categories']:
             context += f"\n- {cat['name']}: ${cat['spent']:,.2f} of ${cat['budgeted']:,.2f}"
         
+        insights = self.get_spending_insights()
+        if insights:
+            context += f"""
+
+Spending Trends:
+- Burn Rate: ${insights['burn_rate_per_day']:,.2f}/day (projected ${insights['projected_month_spend']:,.2f} this month)"""
+            if insights["month_over_month"] is not None:
+                context += f"\n- Last Month vs Month Before: {insights['month_over_month']:+.0%}"
+            if insights["top_payees"]:
+                payees = ", ".join(f"{p['payee']} (${p['spent']:,.0f})" for p in insights["top_payees"])
+                context += f"\n- Top Payees This Month: {payees}"
+        
         return context
\ No newline at end of file
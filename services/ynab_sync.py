@@ -0,0 +1,380 @@
+# services/ynab_sync.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+# Categories that are bookkeeping rather than spending
+INTERNAL_CATEGORIES = ["Inflow: Ready to Assign", "Internal Master Category"]
+
+
+class SQLiteSyncStore:
+    """Local SQLite store for YNAB records and their server_knowledge"""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("YNAB_SYNC_DB", "ynab_sync.sqlite")
+        self._lock = threading.Lock()
+        # Shared by Streamlit script threads; access is serialized by the lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                budget_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                server_knowledge INTEGER,
+                synced_at REAL,
+                PRIMARY KEY (budget_id, kind)
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                budget_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (budget_id, kind, id)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                budget_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (budget_id, key)
+            );
+        """)
+        self._conn.commit()
+    
+    def get_knowledge(self, budget_id: str, kind: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT server_knowledge FROM sync_state WHERE budget_id = ? AND kind = ?",
+                (budget_id, kind)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def get_synced_at(self, budget_id: str, kind: str) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sync_state WHERE budget_id = ? AND kind = ?",
+                (budget_id, kind)
+            ).fetchone()
+        return row[0] if row and row[0] else 0.0
+    
+    def apply(self, budget_id: str, kind: str, records: List[Dict],
+              server_knowledge: int, replace: bool = False):
+        """Merge changed records (dropping deleted ones) and advance server_knowledge"""
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute(
+                    "DELETE FROM records WHERE budget_id = ? AND kind = ?",
+                    (budget_id, kind)
+                )
+            self._conn.executemany(
+                "DELETE FROM records WHERE budget_id = ? AND kind = ? AND id = ?",
+                [(budget_id, kind, r["id"]) for r in records if r.get("deleted")]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (budget_id, kind, id, data) VALUES (?, ?, ?, ?)",
+                [(budget_id, kind, r["id"], json.dumps(r)) for r in records if not r.get("deleted")]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (budget_id, kind, server_knowledge, synced_at) "
+                "VALUES (?, ?, ?, ?)",
+                (budget_id, kind, server_knowledge, time.time())
+            )
+    
+    def touch(self, budget_id: str, kind: str):
+        """Record a sync that found no changes"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sync_state SET synced_at = ? WHERE budget_id = ? AND kind = ?",
+                (time.time(), budget_id, kind)
+            )
+    
+    def get_records(self, budget_id: str, kind: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM records WHERE budget_id = ? AND kind = ?",
+                (budget_id, kind)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def get_meta(self, budget_id: str, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE budget_id = ? AND key = ?",
+                (budget_id, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def set_meta(self, budget_id: str, key: str, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (budget_id, key, value) VALUES (?, ?, ?)",
+                (budget_id, key, json.dumps(value))
+            )
+
+
+class SupabaseSyncStore:
+    """Sync store kept in SupabaseService's api_cache table.
+    
+    Each (budget, kind) collection is split into chunks (transactions by
+    month, other kinds whole) stored as separate JSON documents, plus a small
+    manifest holding server_knowledge. A delta rewrites only the chunks it
+    touches, so state survives restarts of ephemeral App Service instances
+    without re-uploading the whole history on every sync.
+    """
+    
+    TTL_MINUTES = 60 * 24 * 30
+    
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._collections: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, budget_id: str, kind: str, chunk: Optional[str] = None) -> str:
+        key = f"ynab_sync:{budget_id}:{kind}"
+        return f"{key}:{chunk}" if chunk else key
+    
+    @staticmethod
+    def _chunk(kind: str, record: Dict) -> str:
+        if kind == "transactions":
+            return (record.get("date") or "")[:7] or "undated"
+        return "all"
+    
+    @staticmethod
+    def _empty() -> Dict:
+        # chunks: {chunk: {id: record}}; index: {id: chunk}
+        return {"server_knowledge": None, "synced_at": 0.0, "chunks": {}, "index": {}}
+    
+    def _load(self, budget_id: str, kind: str) -> Dict:
+        key = self._key(budget_id, kind)
+        if key in self._collections:
+            return self._collections[key]
+        
+        collection = self._empty()
+        try:
+            manifest = self.supabase.get_cached_data(key, raise_errors=True)
+            if manifest and "records" in manifest:
+                # Single-document layout from before chunking: rewritten on the next save
+                collection["legacy"] = True
+                records = manifest["records"].values()
+            elif manifest:
+                records = []
+                for chunk in manifest["chunks"]:
+                    stored = self.supabase.get_cached_data(self._key(budget_id, kind, chunk),
+                                                           raise_errors=True)
+                    if stored is None:
+                        # An expired chunk leaves a gap; start over with a full pull
+                        manifest, records = None, []
+                        break
+                    records.extend(stored.values())
+            else:
+                records = []
+        except Exception:
+            # Not remembered, so the next call reads Supabase again
+            return collection
+        
+        if manifest:
+            collection["server_knowledge"] = manifest["server_knowledge"]
+            collection["synced_at"] = manifest["synced_at"]
+        for record in records:
+            chunk = self._chunk(kind, record)
+            collection["chunks"].setdefault(chunk, {})[record["id"]] = record
+            collection["index"][record["id"]] = chunk
+        self._collections[key] = collection
+        return collection
+    
+    def _save(self, budget_id: str, kind: str, collection: Dict, dirty: set):
+        """Write the changed chunks, then the manifest that lists them"""
+        if collection.pop("legacy", False):
+            dirty = dirty | set(collection["chunks"])
+        for chunk in sorted(dirty):
+            key = self._key(budget_id, kind, chunk)
+            if collection["chunks"].get(chunk):
+                self.supabase.set_cached_data(key, collection["chunks"][chunk],
+                                              ttl_minutes=self.TTL_MINUTES)
+            else:
+                collection["chunks"].pop(chunk, None)
+                self.supabase.delete_cached_data(key)
+        self.supabase.set_cached_data(self._key(budget_id, kind), {
+            "server_knowledge": collection["server_knowledge"],
+            "synced_at": collection["synced_at"],
+            "chunks": sorted(collection["chunks"])
+        }, ttl_minutes=self.TTL_MINUTES)
+    
+    def get_knowledge(self, budget_id: str, kind: str) -> Optional[int]:
+        with self._lock:
+            return self._load(budget_id, kind)["server_knowledge"]
+    
+    def get_synced_at(self, budget_id: str, kind: str) -> float:
+        with self._lock:
+            return self._load(budget_id, kind)["synced_at"]
+    
+    def apply(self, budget_id: str, kind: str, records: List[Dict],
+              server_knowledge: int, replace: bool = False):
+        with self._lock:
+            collection = self._load(budget_id, kind)
+            dirty = set()
+            if replace:
+                dirty.update(collection["chunks"])
+                collection["chunks"], collection["index"] = {}, {}
+            for record in records:
+                # A record can move chunk (e.g. a transaction re-dated to another month)
+                previous = collection["index"].pop(record["id"], None)
+                if previous is not None:
+                    collection["chunks"][previous].pop(record["id"], None)
+                    dirty.add(previous)
+                if not record.get("deleted"):
+                    chunk = self._chunk(kind, record)
+                    collection["chunks"].setdefault(chunk, {})[record["id"]] = record
+                    collection["index"][record["id"]] = chunk
+                    dirty.add(chunk)
+            collection["server_knowledge"] = server_knowledge
+            collection["synced_at"] = time.time()
+            self._save(budget_id, kind, collection, dirty)
+    
+    def touch(self, budget_id: str, kind: str):
+        with self._lock:
+            # Kept in memory only; a restart simply syncs once more
+            self._load(budget_id, kind)["synced_at"] = time.time()
+    
+    def get_records(self, budget_id: str, kind: str) -> List[Dict]:
+        with self._lock:
+            return [record for chunk in self._load(budget_id, kind)["chunks"].values()
+                    for record in chunk.values()]
+    
+    def _load_meta(self, budget_id: str) -> Dict:
+        key = self._key(budget_id, "meta")
+        if key not in self._collections:
+            try:
+                doc = self.supabase.get_cached_data(key, raise_errors=True)
+            except Exception:
+                return {"records": {}}
+            self._collections[key] = doc or {"records": {}}
+        return self._collections[key]
+    
+    def get_meta(self, budget_id: str, key: str):
+        with self._lock:
+            return self._load_meta(budget_id)["records"].get(key)
+    
+    def set_meta(self, budget_id: str, key: str, value):
+        with self._lock:
+            doc = self._load_meta(budget_id)
+            doc["records"][key] = value
+            self._collections[self._key(budget_id, "meta")] = doc
+            self.supabase.set_cached_data(self._key(budget_id, "meta"), doc,
+                                          ttl_minutes=self.TTL_MINUTES)
+
+
+def create_sync_store(supabase=None):
+    """Build the store selected by YNAB_SYNC_BACKEND ("sqlite" by default)"""
+    backend = os.getenv("YNAB_SYNC_BACKEND", "sqlite").lower()
+    if backend == "supabase" and supabase is not None:
+        return SupabaseSyncStore(supabase)
+    return SQLiteSyncStore()
+
+
+class YNABSyncEngine:
+    """Delta sync of YNAB categories and transactions via last_knowledge_of_server"""
+    
+    def __init__(self,
+                 fetch: Callable[[str], Dict],
+                 store,
+                 min_sync_interval_seconds: int = 30):
+        # fetch(path) returns the "data" payload of a YNAB GET request
+        self.fetch = fetch
+        self.store = store
+        self.min_sync_interval_seconds = min_sync_interval_seconds
+        # Called as listener(budget_id, kind, records, replace) after each merge
+        self.listeners: List[Callable] = []
+        # One sync per budget at a time; callers that wait see its result
+        self._budget_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+    
+    def _delta_path(self, path: str, knowledge: Optional[int]) -> str:
+        if knowledge is None:
+            return path
+        return f"{path}?last_knowledge_of_server={knowledge}"
+    
+    def sync(self, budget_id: str, force: bool = False) -> Dict[str, int]:
+        """Pull changes since the last sync and merge them into the store.
+        
+        Returns the number of changed records per kind. Concurrent calls for
+        the same budget run one at a time, so only the first one fetches.
+        """
+        with self._locks_guard:
+            lock = self._budget_locks.setdefault(budget_id, threading.Lock())
+        with lock:
+            return self._sync(budget_id, force)
+    
+    def _sync(self, budget_id: str, force: bool) -> Dict[str, int]:
+        current_month = date.today().replace(day=1).isoformat()
+        month_rolled_over = self.store.get_meta(budget_id, "synced_month") != current_month
+        
+        last_synced = self.store.get_synced_at(budget_id, "categories")
+        if not force and not month_rolled_over and \
+                time.time() - last_synced < self.min_sync_interval_seconds:
+            return {}
+        
+        changed = {}
+        
+        # Category amounts are for the current month, so a new month needs a full pull
+        knowledge = None if month_rolled_over else self.store.get_knowledge(budget_id, "categories")
+        data = self.fetch(self._delta_path(f"/budgets/{budget_id}/categories", knowledge))
+        categories = [
+            dict(cat, category_group_name=group["name"])
+            for group in data["category_groups"]
+            for cat in group["categories"]
+        ]
+        changed["categories"] = len(categories)
+        if categories or knowledge is None:
+            self.store.apply(budget_id, "categories", categories,
+                             data["server_knowledge"], replace=knowledge is None)
+        else:
+            self.store.touch(budget_id, "categories")
+        
+        knowledge = self.store.get_knowledge(budget_id, "transactions")
+        data = self.fetch(self._delta_path(f"/budgets/{budget_id}/transactions", knowledge))
+        changed["transactions"] = len(data["transactions"])
+        if data["transactions"] or knowledge is None:
+            self.store.apply(budget_id, "transactions", data["transactions"],
+                             data["server_knowledge"], replace=knowledge is None)
+            for listener in self.listeners:
+                listener(budget_id, "transactions", data["transactions"], knowledge is None)
+        else:
+            self.store.touch(budget_id, "transactions")
+        
+        # Age of money only moves with transactions; refresh it when they change
+        if month_rolled_over or changed["transactions"]:
+            month = self.fetch(f"/budgets/{budget_id}/months/current")["month"]
+            self.store.set_meta(budget_id, "month", month["month"])
+            self.store.set_meta(budget_id, "age_of_money", month.get("age_of_money"))
+            self.store.set_meta(budget_id, "synced_month", current_month)
+        
+        return changed
+    
+    def data_version(self, budget_id: str) -> Optional[str]:
+        """Identifier that changes whenever the synced data for a budget changes"""
+        categories = self.store.get_knowledge(budget_id, "categories")
+        transactions = self.store.get_knowledge(budget_id, "transactions")
+        if categories is None and transactions is None:
+            return None
+        return f"{budget_id}:{categories}:{transactions}"
+    
+    def get_month(self, budget_id: str) -> Optional[Dict]:
+        """Rebuild a /months/current-shaped payload from the local store"""
+        month = self.store.get_meta(budget_id, "month")
+        if month is None:
+            return None
+        
+        categories = self.store.get_records(budget_id, "categories")
+        # Month totals exclude income sitting in Ready to Assign
+        counted = [cat for cat in categories if cat["name"] not in INTERNAL_CATEGORIES]
+        
+        return {
+            "month": month,
+            "budgeted": sum(cat["budgeted"] for cat in counted),
+            "activity": sum(cat["activity"] for cat in counted),
+            "age_of_money": self.store.get_meta(budget_id, "age_of_money"),
+            "categories": categories
+        }
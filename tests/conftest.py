@@ -0,0 +1,111 @@
+# tests/conftest.py
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.resilience import CIRCUITS
+
+
+@pytest.fixture(autouse=True)
+def closed_circuits():
+    """Circuit breakers are shared by the whole process; start each test closed"""
+    for circuit in CIRCUITS.values():
+        circuit.reset()
+    yield
+    for circuit in CIRCUITS.values():
+        circuit.reset()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append({"path": self.path, "client": self.client_address,
+                                     "headers": dict(self.headers)})
+        status, payload, headers = self.server.respond(self.path)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for concurrent batches; a full backlog drops connects for a 1s SYN retry
+    request_queue_size = 64
+
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server; set ``respond(path) -> (status, json, headers)`` per test.
+
+    ``requests`` records each request's path, client address and headers.
+    """
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.respond = lambda path: (200, {"data": {}}, None)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeCacheBackend:
+    """In-memory stand-in for SupabaseService's api_cache methods"""
+
+    def __init__(self):
+        self.rows = {}  # cache_key -> {"data", "expires_at"}
+        self.reads = 0
+        self.written = []  # keys, in write order
+
+    def get_cached_entry(self, cache_key):
+        self.reads += 1
+        return self.rows.get(cache_key)
+
+    def get_cached_data(self, cache_key, raise_errors=False):
+        row = self.get_cached_entry(cache_key)
+        if row and datetime.fromisoformat(row["expires_at"]) > datetime.now(timezone.utc):
+            return row["data"]
+        return None
+
+    def set_cached_data(self, cache_key, data, ttl_minutes=60):
+        self.written.append(cache_key)
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)
+        self.rows[cache_key] = {"data": json.loads(json.dumps(data)), "expires_at": expires_at.isoformat()}
+
+    def delete_cached_data(self, cache_key):
+        self.rows.pop(cache_key, None)
+
+
+@pytest.fixture
+def cache_backend():
+    return FakeCacheBackend()
+
+
+@pytest.fixture
+def make_ynab(stub_server, monkeypatch, tmp_path):
+    """Build YNABServices that talk to stub_server, with their own request budget"""
+    from services.concurrency import TokenBucket
+    from services.ynab_service import YNABService
+
+    monkeypatch.setenv("YNAB_ACCESS_TOKEN", "test-token")
+    monkeypatch.setenv("YNAB_BASE_URL", f"{stub_server.url}/v1")
+    monkeypatch.setenv("YNAB_LEDGER_DIR", str(tmp_path / "ledger"))
+    monkeypatch.delenv("YNAB_DEFAULT_BUDGET_NAME", raising=False)
+
+    def make(**kwargs):
+        ynab = YNABService(**kwargs)
+        ynab.rate_limit = TokenBucket(capacity=10 ** 6, rate_per_second=10 ** 6)
+        return ynab
+    return make
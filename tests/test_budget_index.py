@@ -0,0 +1,56 @@
+# tests/test_budget_index.py
+import pytest
+
+from services.cache import TwoTierCache
+
+BUDGETS = [{"id": "b-home", "name": "Home"}, {"id": "b-work", "name": "Work"}]
+
+
+@pytest.fixture
+def budgets_server(stub_server):
+    stub_server.respond = lambda path: (200, {"data": {"budgets": BUDGETS}}, None)
+    return stub_server
+
+
+def budget_listings(server):
+    return sum(request["path"] == "/v1/budgets" for request in server.requests)
+
+
+def test_warm_index_resolves_without_listing_budgets(budgets_server, make_ynab):
+    ynab = make_ynab(default_budget_name="Work")
+
+    assert ynab.resolve_budget_id() == "b-work"
+    assert ynab.resolve_budget_id("Home") == "b-home"
+    assert ynab.resolve_budget_id() == "b-work"
+    assert budget_listings(budgets_server) == 1
+
+
+def test_cold_process_reads_index_from_shared_cache(budgets_server, make_ynab, cache_backend):
+    make_ynab(cache=TwoTierCache(backend=cache_backend)).resolve_budget_id()
+
+    restarted = make_ynab(cache=TwoTierCache(backend=cache_backend), default_budget_name="Work")
+
+    assert restarted.resolve_budget_id() == "b-work"
+    assert budget_listings(budgets_server) == 1
+
+
+def test_invalidated_index_is_listed_again(budgets_server, make_ynab, cache_backend):
+    ynab = make_ynab(cache=TwoTierCache(backend=cache_backend))
+    ynab.resolve_budget_id()
+
+    ynab.invalidate_budget_index()
+    ynab.resolve_budget_id()
+
+    assert budget_listings(budgets_server) == 2
+
+
+def test_unknown_name_falls_back_to_first_budget_and_reports_once(budgets_server, make_ynab):
+    ynab = make_ynab(default_budget_name="Holiday")
+
+    assert ynab.resolve_budget_id() == "b-home"
+    first_error = ynab.last_error
+    ynab.last_error = None
+    assert ynab.resolve_budget_id() == "b-home"
+
+    assert "Holiday" in first_error
+    assert ynab.last_error is None
@@ -0,0 +1,107 @@
+# tests/test_cache.py
+import threading
+import time
+
+from services.cache import TwoTierCache
+
+
+class Counter:
+    """fetch() that counts calls and can be slowed down or told to fail"""
+
+    def __init__(self, value="fresh", delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+def test_miss_fetches_then_hits_until_ttl():
+    cache = TwoTierCache()
+    fetch = Counter()
+
+    assert cache.get_or_fetch("k", fetch, ttl_seconds=60) == "fresh"
+    assert cache.get_or_fetch("k", fetch, ttl_seconds=60) == "fresh"
+
+    assert fetch.calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["fetches"]) == (1, 1, 1)
+    assert stats["avg_fetch_ms"] >= 0
+
+
+def test_backend_row_serves_a_cold_process(cache_backend):
+    TwoTierCache(backend=cache_backend).set("k", {"v": 1}, ttl_seconds=60)
+    fetch = Counter()
+
+    cold = TwoTierCache(backend=cache_backend)
+
+    assert cold.get_or_fetch("k", fetch) == {"v": 1}
+    assert fetch.calls == 0 and cold.stats()["backend_hits"] == 1
+
+
+def test_expired_value_is_served_stale_while_one_refetch_runs():
+    cache = TwoTierCache()
+    cache.set("k", "old", ttl_seconds=-1)
+    fetch = Counter(delay=0.1)
+
+    served = [cache.get_or_fetch("k", fetch, stale_ttl_seconds=60) for _ in range(3)]
+
+    assert served == ["old"] * 3
+    time.sleep(0.3)
+    assert fetch.calls == 1
+    assert cache.get("k") == "fresh"
+    assert cache.stats()["stale_hits"] == 3
+
+
+def test_too_stale_value_is_refetched_inline():
+    cache = TwoTierCache()
+    cache.set("k", "old", ttl_seconds=-120)
+
+    assert cache.get_or_fetch("k", Counter(), stale_ttl_seconds=60) == "fresh"
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TwoTierCache()
+    fetch = Counter(delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["fresh"] * 5
+    assert fetch.calls == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_failed_fetch_is_not_cached():
+    cache = TwoTierCache()
+    fetch = Counter(value=None)
+
+    cache.get_or_fetch("k", fetch)
+    cache.get_or_fetch("k", fetch)
+
+    assert fetch.calls == 2
+
+
+def test_lru_evicts_oldest_entry():
+    cache = TwoTierCache(max_entries=2)
+    for key in "abc":
+        cache.set(key, key, ttl_seconds=60)
+
+    assert cache.get("a") is None and cache.get("c") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_contains_checks_freshness_without_counting_a_lookup(cache_backend):
+    TwoTierCache(backend=cache_backend).set("k", "v", ttl_seconds=60)
+    cache = TwoTierCache(backend=cache_backend)
+    cache.set("old", "v", ttl_seconds=-1)
+
+    assert cache.contains("k") and not cache.contains("old") and not cache.contains("none")
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 0)
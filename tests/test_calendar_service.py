@@ -0,0 +1,193 @@
+# tests/test_calendar_service.py
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services.calendar_service import CalendarService, EventIndex, normalize_event
+from services.ynab_sync import SQLiteSyncStore
+
+NOW = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class FakeHttpError(Exception):
+    """Shaped like googleapiclient.errors.HttpError (status on .resp)"""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+
+
+class FakeCalendarAPI:
+    """``events().list(...).execute()`` over in-memory events, with paging and syncTokens.
+
+    Sync tokens are opaque strings naming the change sequence they were issued
+    at; tokens older than ``expired_before`` answer 410 Gone.
+    """
+
+    def __init__(self, page_size=2):
+        self.by_id = {}
+        self.sequence = 0
+        self.expired_before = 0
+        self.page_size = page_size
+        self.calls = []
+
+    def put(self, event_id, start, minutes=60, **fields):
+        self.sequence += 1
+        self.by_id[event_id] = dict(
+            {"id": event_id, "summary": f"Event {event_id}",
+             "start": {"dateTime": start.isoformat()},
+             "end": {"dateTime": (start + timedelta(minutes=minutes)).isoformat()}},
+            status="confirmed", _seq=self.sequence, **fields
+        )
+
+    def cancel(self, event_id):
+        self.sequence += 1
+        self.by_id[event_id] = {"id": event_id, "status": "cancelled", "_seq": self.sequence}
+
+    def events(self):
+        return self
+
+    def list(self, calendarId, singleEvents=True, maxResults=250, pageToken=None, syncToken=None, timeMin=None):
+        return SimpleNamespace(execute=lambda: self._list(pageToken, syncToken))
+
+    def _list(self, page_token, sync_token):
+        self.calls.append(sync_token)
+        since = int(sync_token.removeprefix("sync-")) if sync_token else 0
+        if sync_token and since < self.expired_before:
+            raise FakeHttpError(410)
+        matching = sorted(
+            (e for e in self.by_id.values()
+             if e["_seq"] > since and (sync_token or e["status"] != "cancelled")),
+            key=lambda e: e["_seq"]
+        )
+        offset = int(page_token or 0)
+        page = matching[offset:offset + self.page_size]
+        response = {"items": [{k: v for k, v in e.items() if k != "_seq"} for e in page]}
+        if offset + self.page_size < len(matching):
+            response["nextPageToken"] = str(offset + self.page_size)
+        else:
+            response["nextSyncToken"] = f"sync-{self.sequence}"
+        return response
+
+
+@pytest.fixture
+def api():
+    api = FakeCalendarAPI()
+    for i in range(5):
+        api.put(f"e{i}", NOW + timedelta(hours=i + 1))
+    return api
+
+
+@pytest.fixture
+def make_calendar(tmp_path, monkeypatch):
+    monkeypatch.setenv("CALENDAR_TIMEZONE", "UTC")
+
+    def make(api):
+        return CalendarService(service=api, store=SQLiteSyncStore(str(tmp_path / "sync.sqlite")))
+    return make
+
+
+def summaries(events):
+    return [event["summary"] for event in events]
+
+
+def test_full_sync_then_incremental_with_sync_token(api, make_calendar):
+    calendar = make_calendar(api)
+
+    assert calendar.sync() == {"events": 5, "full": 1}
+    assert api.calls == [None, None, None]  # three pages, no token
+
+    api.put("e1", NOW + timedelta(hours=2), summary="Dentist")
+    api.cancel("e4")
+    api.calls.clear()
+
+    assert calendar.sync(force=True) == {"events": 2, "full": 0}
+    assert api.calls == ["sync-5"]
+    assert summaries(calendar.upcoming(days=1, now=NOW.timestamp())) == \
+        ["Event e0", "Dentist", "Event e2", "Event e3"]
+
+
+def test_sync_within_interval_makes_no_call(api, make_calendar):
+    calendar = make_calendar(api)
+    calendar.sync()
+    api.calls.clear()
+
+    assert calendar.sync() == {}
+    assert api.calls == []
+
+
+def test_expired_token_falls_back_to_a_full_sync(api, make_calendar):
+    calendar = make_calendar(api)
+    calendar.sync()
+    api.cancel("e0")
+    api.expired_before = api.sequence
+
+    assert calendar.sync(force=True) == {"events": 4, "full": 1}
+    assert "e0" not in {event["id"] for event in calendar.upcoming(days=1, now=NOW.timestamp())}
+
+
+def test_restart_resumes_from_the_stored_token(api, make_calendar):
+    make_calendar(api).sync()
+    api.put("e9", NOW + timedelta(minutes=30))
+    api.calls.clear()
+
+    restarted = make_calendar(api)
+
+    assert restarted.next_event(now=NOW.timestamp())["id"] == "e0"
+    assert restarted.sync(force=True) == {"events": 1, "full": 0}
+    assert api.calls == ["sync-5"]
+    assert restarted.next_event(now=NOW.timestamp())["id"] == "e9"
+
+
+def test_next_event_skips_all_day_events(api, make_calendar):
+    api.by_id.clear()
+    api.sequence += 1
+    api.by_id["trip"] = {"id": "trip", "summary": "Trip", "status": "confirmed", "_seq": api.sequence,
+                         "start": {"date": (NOW + timedelta(days=1)).date().isoformat()},
+                         "end": {"date": (NOW + timedelta(days=4)).date().isoformat()}}
+    api.put("call", NOW + timedelta(days=2))
+    calendar = make_calendar(api)
+    calendar.sync()
+
+    assert calendar.next_event(now=NOW.timestamp())["id"] == "call"
+    day_after = (NOW + timedelta(days=2)).date()
+    assert summaries(calendar.events_on(day_after)) == ["Trip", "Event call"]
+    assert calendar.describe(calendar.events_on(day_after)[0]) == "all day"
+
+
+def test_index_lookups_match_a_linear_scan():
+    tz = timezone.utc
+    raw = [{"id": f"e{i}", "start": {"dateTime": (NOW + timedelta(minutes=37 * i)).isoformat()},
+            "end": {"dateTime": (NOW + timedelta(minutes=37 * i + 45 + (i % 3) * 1500)).isoformat()}}
+           for i in range(200)]
+    events = [normalize_event(event, tz) for event in raw]
+    index = EventIndex(events)
+
+    start, end = NOW.timestamp() + 3600 * 20, NOW.timestamp() + 3600 * 44
+    expected = sorted((e for e in events if e["start"] < end and e["end"] > start),
+                      key=lambda e: (e["start"], e["end"], e["id"]))
+
+    assert index.overlapping(start, end) == expected
+    assert index.next_after(start) == min((e for e in events if e["start"] > start),
+                                          key=lambda e: e["start"])
+
+
+def test_context_lists_today_and_coming_up(api, make_calendar):
+    api.put("later", NOW + timedelta(days=3), summary="Quarterly review")
+    calendar = make_calendar(api)
+    calendar.sync()
+
+    context = calendar.get_calendar_context_for_llm()
+
+    assert context.startswith("Today (")
+    assert "Coming up:" in context and "Quarterly review" in context
+
+
+def test_unconfigured_calendar_reports_unavailable(tmp_path, monkeypatch):
+    monkeypatch.delenv("GOOGLE_CALENDAR_CREDENTIALS", raising=False)
+    calendar = CalendarService(store=SQLiteSyncStore(str(tmp_path / "sync.sqlite")))
+
+    assert not calendar.is_connected
+    assert calendar.sync() == {}
+    assert calendar.get_calendar_context_for_llm() == "Calendar information not available"
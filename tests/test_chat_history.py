@@ -0,0 +1,95 @@
+# tests/test_chat_history.py
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from services.resilience import SUPABASE_CIRCUIT
+from services.supabase_client import SupabaseService
+
+CURSOR_FILTER = re.compile(r'created_at\.lt\."(.+)",and\(created_at\.eq\."(.+)",id\.lt\.(\d+)\)')
+
+
+class FakeQuery:
+    """The slice of the PostgREST builder get_chat_history_page uses"""
+
+    def __init__(self, table):
+        self.table = table
+        self.orders = []
+        self.filters = []
+        self.limit_to = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.limit_to = count
+        return self
+
+    def or_(self, expression):
+        self.filters.append(expression)
+        return self
+
+    def execute(self):
+        self.table.queries.append(self)
+        rows = list(self.table.rows)
+        for expression in self.filters:
+            created_at, _, row_id = CURSOR_FILTER.fullmatch(expression).groups()
+            rows = [row for row in rows if row["created_at"] < created_at
+                    or (row["created_at"] == created_at and row["id"] < int(row_id))]
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        return SimpleNamespace(data=rows[:self.limit_to])
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+@pytest.fixture
+def chats():
+    # Pairs of rows share a timestamp, so pages must break ties on id
+    rows = [{"id": i, "created_at": f"2026-10-0{1 + (i - 1) // 2}T09:00:00+00:00",
+             "user_message": f"q{i}", "assistant_response": f"a{i}"} for i in range(1, 8)]
+    service = SupabaseService.__new__(SupabaseService)
+    service.client = FakeTable(rows)
+    service.circuit = SUPABASE_CIRCUIT
+    service.chat_writer = SimpleNamespace(flush=lambda timeout: True)
+    return service
+
+
+def test_pages_walk_history_newest_first_without_gaps(chats):
+    seen = []
+    rows, cursor = chats.get_chat_history_page(limit=3)
+    seen.extend(rows)
+    while cursor:
+        rows, cursor = chats.get_chat_history_page(before=cursor, limit=3)
+        seen.extend(rows)
+
+    assert [row["id"] for row in seen] == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_each_page_is_one_bounded_keyset_query(chats):
+    _, cursor = chats.get_chat_history_page(limit=3)
+    chats.get_chat_history_page(before=cursor, limit=3)
+
+    first, second = chats.client.queries
+    assert first.filters == [] and first.limit_to == 3
+    assert first.orders == [("created_at", True), ("id", True)]
+    assert second.filters == ['created_at.lt."2026-10-03T09:00:00+00:00",'
+                              'and(created_at.eq."2026-10-03T09:00:00+00:00",id.lt.5)']
+
+
+def test_short_page_ends_history(chats):
+    rows, cursor = chats.get_chat_history_page(limit=10)
+
+    assert len(rows) == 7 and cursor is None
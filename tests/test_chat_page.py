@@ -0,0 +1,123 @@
+# tests/test_chat_page.py
+from types import SimpleNamespace
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import services.shared
+from services.claude_service import ClaudeService
+
+CHAT_PAGE = "pages/2_💬_Chat.py"
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.text_stream = chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text="".join(self.text_stream))],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=100, output_tokens=len(self.text_stream))
+        )
+
+
+class FakeClient:
+    """messages.stream answers each request with the next scripted chunks"""
+
+    def __init__(self):
+        self.scripts = []
+        self.messages = self
+
+    def stream(self, **request):
+        return FakeStream(self.scripts.pop(0))
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.saved = []
+        self.chat_writer = SimpleNamespace(stats=lambda: {})
+
+    def get_chat_history_page(self, before=None, limit=5):
+        return [], None
+
+    def save_chat(self, user_message, assistant_response):
+        self.saved.append((user_message, assistant_response))
+        return {"created_at": f"2026-01-01T00:00:0{len(self.saved)}+00:00"}
+
+
+class FakeYNAB:
+    is_connected = True
+
+    def __init__(self):
+        self.context_reads = 0
+
+    def get_budget_context_for_llm(self):
+        self.context_reads += 1
+        return "Groceries: $200 of $300 left"
+
+    def get_data_version(self, refresh=False):
+        return "v1"
+
+
+@pytest.fixture
+def chat_page(monkeypatch, tmp_path):
+    """The Chat page, signed in, with Claude, YNAB and Supabase faked"""
+    monkeypatch.setenv("RECALL_INDEX_DIR", str(tmp_path / "recall"))
+    monkeypatch.setenv("CHAT_TOOL_MODE", "0")
+    fakes = SimpleNamespace(client=FakeClient(), supabase=FakeSupabase(), ynab=FakeYNAB())
+    claude = ClaudeService(client=fakes.client)
+    calendar = SimpleNamespace(is_connected=False, last_error=None,
+                               get_calendar_context_for_llm=lambda: "")
+    monkeypatch.setattr(services.shared, "get_claude", lambda: claude)
+    monkeypatch.setattr(services.shared, "get_supabase", lambda: fakes.supabase)
+    monkeypatch.setattr(services.shared, "get_ynab", lambda: fakes.ynab)
+    monkeypatch.setattr(services.shared, "get_calendar", lambda: calendar)
+    monkeypatch.setattr(services.shared, "get_metrics_server", lambda: None)
+    monkeypatch.setattr(services.shared, "get_readiness_monitor",
+                        lambda: SimpleNamespace(check=lambda name: None))
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(CHAT_PAGE, default_timeout=30)
+    app.session_state["authenticated"] = True
+    fakes.app = app.run()
+    yield fakes
+    st.cache_resource.clear()
+
+
+def send(fakes, prompt, *chunks):
+    fakes.client.scripts.append(list(chunks))
+    fakes.app.chat_input[0].set_value(prompt).run()
+    assert not fakes.app.exception
+
+
+def test_trivial_prompt_skips_recall_and_budget(chat_page):
+    send(chat_page, "thanks!", "You're ", "welcome!")
+
+    assert chat_page.supabase.saved == [("thanks!", "You're welcome!")]
+    assert chat_page.ynab.context_reads == 0
+    assert "recall" not in chat_page.app.session_state["last_context"]
+
+
+def test_budget_prompt_gets_budget_context(chat_page):
+    send(chat_page, "How much is left for groceries this month?", "$200 left.")
+
+    assert chat_page.ynab.context_reads == 1
+    assert chat_page.app.session_state["last_context"]["budget"] == "Groceries: $200 of $300 left"
+
+
+def test_page_load_reads_no_budget_and_renders_stored_history(chat_page):
+    send(chat_page, "thanks!", "You're welcome!")
+    chat_page.app.run()
+
+    assert chat_page.ynab.context_reads == 0
+    assert [message.markdown[0].value for message in chat_page.app.chat_message] == \
+        ["thanks!", "You're welcome!"]
+    assert chat_page.app.sidebar.info[0].value == "⏳ Checking YNAB connection..."
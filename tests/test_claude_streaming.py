@@ -0,0 +1,121 @@
+# tests/test_claude_streaming.py
+from types import SimpleNamespace
+
+import anthropic
+import httpx
+
+from services.claude_service import ClaudeService
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeStream:
+    def __init__(self, script):
+        self.script = script
+
+    def __enter__(self):
+        if isinstance(self.script, Exception):
+            raise self.script
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for item in self.script:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text="".join(self.script))],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=100, output_tokens=len(self.script))
+        )
+
+
+class FakeClient:
+    """messages.stream plays one scripted call per request"""
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.requests = []
+        self.messages = self
+
+    def stream(self, **request):
+        self.requests.append(dict(request))
+        return FakeStream(self.scripts.pop(0))
+
+
+def consume(generator):
+    """Chunks yielded and the generator's return value, as st.write_stream sees them"""
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(generator))
+        except StopIteration as stop:
+            return chunks, stop.value
+
+
+CHUNKS = ["Groceries ", "are at ", "72%."]
+
+
+def test_chunks_arrive_in_order_and_full_text_is_returned():
+    claude = ClaudeService(client=FakeClient(CHUNKS))
+
+    chunks, final = consume(claude.stream_response("How are groceries?"))
+
+    assert chunks == CHUNKS
+    assert final == "Groceries are at 72%."
+    stats = claude.last_stream_stats
+    assert 0 < stats["time_to_first_token"] <= stats["total_time"]
+    assert claude.last_usage["input_tokens"] == 100
+
+
+def test_overload_before_any_text_retries_on_fallback_model():
+    client = FakeClient(StatusError(529), CHUNKS)
+    claude = ClaudeService(client=client)
+
+    chunks, _ = consume(claude.stream_response("How are groceries?"))
+
+    assert chunks == CHUNKS
+    routed, retried = (request["model"] for request in client.requests)
+    assert retried == claude.last_route["fallback_model"] != routed
+    assert claude.last_stream_stats["fell_back"] is True
+
+
+def test_dropped_connection_falls_back_too():
+    error = anthropic.APIConnectionError(request=httpx.Request("POST", "http://fake/v1/messages"))
+    claude = ClaudeService(client=FakeClient(error, CHUNKS))
+
+    chunks, _ = consume(claude.stream_response("How are groceries?"))
+
+    assert chunks == CHUNKS
+
+
+def test_bad_request_is_not_retried():
+    client = FakeClient(StatusError(400))
+    claude = ClaudeService(client=client)
+
+    chunks, final = consume(claude.stream_response("How are groceries?"))
+
+    assert len(client.requests) == 1
+    assert chunks == [final] and final.startswith("Error getting response")
+
+
+def test_failure_mid_stream_keeps_shown_text_and_does_not_retry():
+    client = FakeClient(CHUNKS[:2] + [StatusError(529)])
+    claude = ClaudeService(client=client)
+
+    chunks, final = consume(claude.stream_response("How are groceries?"))
+
+    assert len(client.requests) == 1
+    assert chunks[:2] == CHUNKS[:2]
+    assert chunks[2].startswith("Error getting response")
+    assert final == "".join(chunks)
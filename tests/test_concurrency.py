@@ -0,0 +1,91 @@
+# tests/test_concurrency.py
+import threading
+import time
+
+import pytest
+
+from services.concurrency import ConcurrencyLimit, RateLimitExceeded, SingleFlight, TokenBucket
+
+
+def run_together(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_calls_with_one_key_share_an_execution():
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return "summary"
+
+    run_together(8, lambda: results.append(flights.do("current_month", fetch)))
+
+    assert results == ["summary"] * 8
+    assert len(calls) == 1
+    assert flights.stats == {"calls": 8, "executions": 1, "coalesced": 7}
+
+
+def test_waiting_callers_see_the_owner_error():
+    flights = SingleFlight()
+    errors = []
+
+    def fail():
+        time.sleep(0.1)
+        raise ConnectionError("YNAB down")
+
+    def call():
+        try:
+            flights.do("k", fail)
+        except ConnectionError as e:
+            errors.append(e)
+
+    run_together(3, call)
+
+    assert len(errors) == 3 and not flights.is_inflight("k")
+
+
+def test_bucket_allows_a_burst_then_rejects():
+    bucket = TokenBucket(capacity=3, rate_per_second=0.001)
+    for _ in range(3):
+        bucket.acquire()
+
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(timeout=0.1)
+    assert bucket.stats["rejected"] == 1
+
+
+def test_bucket_waits_for_a_refill_within_the_timeout():
+    bucket = TokenBucket(capacity=1, rate_per_second=20)
+    bucket.acquire()
+
+    started = time.perf_counter()
+    bucket.acquire(timeout=1)
+
+    assert 0.03 < time.perf_counter() - started < 0.5
+
+
+def test_concurrency_limit_caps_active_calls():
+    limit = ConcurrencyLimit(max_concurrent=2)
+
+    def call():
+        with limit.slot():
+            time.sleep(0.05)
+
+    run_together(6, call)
+
+    assert limit.stats["peak"] == 2 and limit.stats["active"] == 0
+
+
+def test_full_limit_rejects_after_timeout():
+    limit = ConcurrencyLimit(max_concurrent=1)
+    with limit.slot():
+        with pytest.raises(RateLimitExceeded):
+            with limit.slot(timeout=0.05):
+                pass
@@ -0,0 +1,54 @@
+# tests/test_context.py
+import threading
+import time
+
+from services.context import ContextAssembler
+
+
+def slow(value, seconds):
+    def fetch():
+        time.sleep(seconds)
+        return value
+    return fetch
+
+
+def test_providers_run_concurrently():
+    assembler = ContextAssembler()
+    for name in ("budget", "calendar", "recall"):
+        assembler.add_provider(name, slow(name, 0.2))
+
+    started = time.perf_counter()
+    results = assembler.gather(["budget", "calendar", "recall"])
+
+    assert results == {"budget": "budget", "calendar": "calendar", "recall": "recall"}
+    assert time.perf_counter() - started < 0.5
+
+
+def test_late_or_failing_provider_gets_its_default():
+    assembler = ContextAssembler(deadlines={"budget": 0.05})
+    assembler.add_provider("budget", slow("late", 0.5))
+    assembler.add_provider("recall", lambda: 1 / 0)
+
+    results = assembler.gather(["budget", "recall"], defaults={"budget": "n/a", "recall": []})
+
+    assert results == {"budget": "n/a", "recall": []}
+    assert assembler.timings["budget"]["status"] == "timed_out"
+    assert assembler.timings["recall"]["status"] == "error"
+
+
+def test_prefetched_provider_runs_once():
+    calls = []
+    release = threading.Event()
+    assembler = ContextAssembler(deadlines={"budget": 0.3})
+    assembler.add_provider("budget", lambda: calls.append(1) or release.wait(0.2) or "summary")
+
+    assembler.prefetch("budget")
+    time.sleep(0.2)
+    result = assembler.gather(["budget"])
+
+    assert result == {"budget": "summary"}
+    assert calls == [1]
+
+
+def test_unknown_provider_returns_default():
+    assert ContextAssembler().gather(["weather"], defaults={"weather": "none"}) == {"weather": "none"}
@@ -0,0 +1,81 @@
+# tests/test_conversation_memory.py
+from services.conversation_memory import ConversationMemory
+
+
+def turns(count, words=40):
+    """count user/assistant pairs of about ``words`` tokens each"""
+    history = []
+    for i in range(count):
+        history.append({"role": "user", "content": f"question {i} " + "word " * words})
+        history.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return history
+
+
+class Summarizer:
+    def __init__(self, reply="summary"):
+        self.reply = reply
+        self.transcripts = []
+
+    def __call__(self, transcript):
+        self.transcripts.append(transcript)
+        return self.reply
+
+
+def tokens(memory, messages):
+    return sum(memory.count_tokens(message["content"]) for message in messages)
+
+
+def test_history_within_budget_is_sent_as_is():
+    summarize = Summarizer()
+    memory = ConversationMemory(summarize, token_budget=2000)
+    history = turns(3)
+
+    assert memory.pack(history) == (None, history)
+    assert summarize.transcripts == []
+
+
+def test_older_turns_are_folded_into_a_summary():
+    summarize = Summarizer()
+    memory = ConversationMemory(summarize, token_budget=250)
+    history = turns(8)
+
+    summary, recent = memory.pack(history)
+
+    assert summary == "summary"
+    assert recent == history[-len(recent):] and recent[0]["role"] == "user"
+    assert tokens(memory, recent) + memory.count_tokens(summary) <= 250
+    assert "question 0" in summarize.transcripts[0]
+
+
+def test_only_newly_dropped_turns_are_summarized():
+    summarize = Summarizer()
+    memory = ConversationMemory(summarize, token_budget=250)
+    history = turns(8)
+    memory.pack(history)
+
+    memory.pack(history + turns(9)[-2:])
+
+    assert len(summarize.transcripts) == 2
+    latest = summarize.transcripts[1]
+    assert latest.startswith("Summary so far: summary")
+    assert "question 0" not in latest
+
+
+def test_failed_summary_keeps_previous_and_retries():
+    summarize = Summarizer(reply="Error getting response: overloaded")
+    memory = ConversationMemory(summarize, token_budget=250)
+    history = turns(8)
+
+    summary, recent = memory.pack(history)
+    assert summary is None and recent == history
+
+    summarize.reply = "summary"
+    assert memory.pack(history)[0] == "summary"
+
+
+def test_cleared_history_drops_the_summary():
+    memory = ConversationMemory(Summarizer(), token_budget=250)
+    memory.pack(turns(8))
+
+    fresh = turns(1)
+    assert memory.pack(fresh) == (None, fresh)
@@ -0,0 +1,119 @@
+# tests/test_dashboard_page.py
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import plotly.graph_objects as go
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import services.shared
+from services.cache import TwoTierCache
+
+DASHBOARD_PAGE = "pages/1_📊_Dashboard.py"
+BUDGET = {"month": date.today().replace(day=1).isoformat(), "budgeted": 3000.0, "spent": 1200.0,
+          "remaining": 1800.0, "age_of_money": 30,
+          "categories": [{"name": "Groceries", "budgeted": 600.0, "spent": 420.0}]}
+
+
+class FakeYNAB:
+    """The parts of YNABService the Dashboard and its snapshot refresher read"""
+    is_connected = True
+    default_budget_name = "Home"
+    sync_engine = None
+    last_budget_id = "b1"
+
+    def __init__(self):
+        self.cache = TwoTierCache()
+        self.fallback = SimpleNamespace(stale_since=lambda key: None)
+        self.budget_reads = 0
+
+    def get_current_month_budget(self):
+        self.budget_reads += 1
+        return dict(BUDGET)
+
+    def get_data_version(self):
+        return "v1"
+
+    def get_spending_insights(self):
+        return None
+
+    def get_month_range(self, start):
+        return [{"month": start, "budgeted": 3000.0, "spent": 1000.0},
+                {"month": BUDGET["month"], "budgeted": 3000.0, "spent": 1200.0}]
+
+
+class FakeCalendar:
+    is_connected = True
+    last_error = None
+
+    def __init__(self):
+        start = time.time() + 3600
+        self.events = [{"id": "e1", "summary": "Dentist", "start": start, "end": start + 1800,
+                        "all_day": False}]
+
+    def next_event(self):
+        return self.events[0]
+
+    def todays_events(self):
+        return self.events
+
+    def describe(self, event, with_day=False):
+        return "03:00 PM–03:30 PM"
+
+
+@pytest.fixture
+def dashboard(monkeypatch, tmp_path):
+    """The Dashboard, signed in, counting YNAB reads, Supabase use and gauge builds"""
+    monkeypatch.setenv("DASHBOARD_SNAPSHOT_PATH", str(tmp_path / "snapshot.json"))
+    fakes = SimpleNamespace(ynab=FakeYNAB(), supabase_built=0, gauges_built=0)
+
+    def get_supabase():
+        fakes.supabase_built += 1
+
+    indicator = go.Indicator
+
+    def counting_indicator(*args, **kwargs):
+        fakes.gauges_built += 1
+        return indicator(*args, **kwargs)
+
+    monkeypatch.setattr(go, "Indicator", counting_indicator)
+    monkeypatch.setattr(services.shared, "get_ynab", lambda: fakes.ynab)
+    monkeypatch.setattr(services.shared, "get_supabase", get_supabase)
+    monkeypatch.setattr(services.shared, "get_calendar", FakeCalendar)
+    monkeypatch.setattr(services.shared, "get_metrics_server", lambda: None)
+    monkeypatch.setattr(services.shared, "get_readiness_monitor",
+                        lambda: SimpleNamespace(check=lambda name: {"ok": True}))
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(DASHBOARD_PAGE, default_timeout=30)
+    app.session_state["authenticated"] = True
+    fakes.app = app.run()
+    assert not app.exception
+    yield fakes
+    st.cache_resource.clear()
+
+
+def click(app, label):
+    [button] = [button for button in app.button if button.label == label]
+    button.click().run()
+    assert not app.exception
+
+
+def test_button_presses_reuse_the_snapshot_and_its_figures(dashboard):
+    click(dashboard.app, "📅 Today's Events")
+    assert any("Dentist" in md.value for md in dashboard.app.markdown)
+    click(dashboard.app, "📊 View Full Budget")
+
+    assert dashboard.ynab.budget_reads == 1
+    assert dashboard.gauges_built == 1
+    assert dashboard.supabase_built == 0
+
+
+def test_refresh_builds_a_new_snapshot_and_redraws_once(dashboard):
+    click(dashboard.app, "🔄 Refresh Data")
+
+    assert dashboard.ynab.budget_reads == 2
+    assert dashboard.gauges_built == 2
+    assert "snapshot v2" in dashboard.app.caption[0].value
@@ -0,0 +1,115 @@
+# tests/test_dashboard_snapshot.py
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services.cache import TwoTierCache
+from services.dashboard_snapshot import DashboardSnapshotRefresher
+
+BUDGET = {"budgeted": 3000.0, "spent": 1200.0, "remaining": 1800.0, "categories": []}
+
+
+class FakeYNAB:
+    """The parts of YNABService the refresher reads"""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.default_budget_name = "Home"
+        self.sync_engine = None
+        self.last_budget_id = "b1"
+        self.budget_reads = 0
+        self.history_error = None
+        # Set to a timestamp to serve the budget as a last-known-good fallback
+        self.stale_since = None
+        self.fallback = SimpleNamespace(stale_since=lambda key: self.stale_since)
+
+    def get_current_month_budget(self):
+        self.budget_reads += 1
+        return dict(BUDGET)
+
+    def get_data_version(self):
+        return "v1"
+
+    def get_spending_insights(self):
+        return None
+
+    def get_month_range(self, start):
+        if self.history_error:
+            raise self.history_error
+        return [{"month": start, "budgeted": 3000.0, "spent": 1000.0}]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "snapshot.json")
+
+
+def test_cold_process_takes_the_summary_from_the_shared_cache(cache_backend, snapshot_path, tmp_path):
+    first = FakeYNAB(TwoTierCache(backend=cache_backend))
+    DashboardSnapshotRefresher(first, path=snapshot_path).refresh_now()
+
+    second = FakeYNAB(TwoTierCache(backend=cache_backend))
+    snapshot = DashboardSnapshotRefresher(second, path=str(tmp_path / "other.json")).refresh_now()
+
+    assert snapshot["budget"] == BUDGET
+    assert (first.budget_reads, second.budget_reads) == (1, 0)
+
+
+def test_forced_refresh_skips_the_cached_summary(snapshot_path):
+    ynab = FakeYNAB(TwoTierCache())
+    refresher = DashboardSnapshotRefresher(ynab, path=snapshot_path)
+
+    refresher.refresh_now()
+    assert refresher.refresh_now()["version"] == 1
+    assert ynab.budget_reads == 1
+
+    snapshot = refresher.refresh_now(force=True)
+    assert ynab.budget_reads == 2
+    assert snapshot["version"] == 2
+
+
+def test_fallback_summary_is_dated_when_it_was_saved(snapshot_path):
+    ynab = FakeYNAB(TwoTierCache())
+    ynab.stale_since = time.time() - 3600
+
+    snapshot = DashboardSnapshotRefresher(ynab, path=snapshot_path).refresh_now()
+
+    generated_at = datetime.fromisoformat(snapshot["generated_at"])
+    assert generated_at == datetime.fromtimestamp(ynab.stale_since, timezone.utc)
+
+
+def test_fallback_summary_keeps_a_newer_snapshot_and_is_not_cached(snapshot_path):
+    ynab = FakeYNAB(TwoTierCache())
+    refresher = DashboardSnapshotRefresher(ynab, path=snapshot_path)
+    first = refresher.refresh_now()
+
+    ynab.stale_since = time.time() - 3600
+    assert refresher.refresh_now(force=True) is first
+
+    ynab.stale_since = None
+    assert refresher.refresh_now()["version"] == 2
+    assert ynab.budget_reads == 3
+
+
+def test_failed_history_read_keeps_the_previous_history(snapshot_path):
+    ynab = FakeYNAB()
+    refresher = DashboardSnapshotRefresher(ynab, path=snapshot_path)
+    history = refresher.refresh_now()["history"]
+
+    ynab.history_error = ConnectionError("YNAB unreachable")
+    snapshot = refresher.refresh_now()
+
+    assert snapshot["version"] == 2
+    assert snapshot["history"] == history
+
+
+def test_first_page_load_waits_for_the_background_build(snapshot_path):
+    ynab = FakeYNAB()
+    refresher = DashboardSnapshotRefresher(ynab, path=snapshot_path, poll_seconds=60).start()
+
+    snapshot = refresher.wait(timeout=5)
+
+    assert snapshot["budget"] == BUDGET
+    assert ynab.budget_reads == 1
@@ -0,0 +1,76 @@
+# tests/test_health.py
+import time
+
+import pytest
+
+from utils import health
+
+
+@pytest.fixture
+def probes(monkeypatch, tmp_path):
+    """Replace the upstream probes with counting fakes and isolate the probe cache"""
+    monkeypatch.setattr(health, "PROBE_CACHE_PATH", str(tmp_path / "probes.json"))
+    calls = {"supabase": 0, "ynab": 0, "anthropic": 0}
+    results = {name: {"ok": True, "status_code": 200} for name in calls}
+
+    def fake(name):
+        def probe():
+            calls[name] += 1
+            time.sleep(0.05)
+            result = results[name]
+            if isinstance(result, Exception):
+                raise result
+            return None if result is None else dict(result)
+        return probe
+
+    monkeypatch.setattr(health, "PROBES", {name: fake(name) for name in calls})
+    health.reset_probe_cache()
+    yield calls, results
+    health.reset_probe_cache()
+
+
+def test_liveness_reports_missing_configuration(monkeypatch):
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+
+    result = health.liveness()
+
+    assert result["status"] == "unhealthy" and "APP_PASSWORD" in result["missing_vars"]
+
+
+def test_probes_run_concurrently_and_are_cached(probes):
+    calls, _ = probes
+
+    started = time.perf_counter()
+    first = health.readiness()
+    elapsed = time.perf_counter() - started
+    second = health.readiness()
+
+    assert first["status"] == "ready" and elapsed < 0.14
+    assert all(check["latency_ms"] >= 50 for check in first["checks"].values())
+    assert all(check["cached"] for check in second["checks"].values())
+    assert calls == {"supabase": 1, "ynab": 1, "anthropic": 1}
+
+
+def test_failing_upstream_makes_the_app_not_ready(probes):
+    _, results = probes
+    results["anthropic"] = ConnectionError("refused")
+    results["ynab"] = None  # no token: budget features are just off
+
+    result = health.readiness()
+
+    assert result["status"] == "not_ready"
+    assert result["checks"]["anthropic"]["error"] == "ConnectionError: refused"
+    ynab = result["checks"]["ynab"]
+    assert ynab["ok"] and ynab["skipped"] == "not configured"
+
+
+def test_another_process_reuses_saved_probe_results(probes):
+    calls, _ = probes
+    health.readiness()
+
+    # A fresh process starts with an empty in-memory cache
+    health._probe_cache.clear()
+    result = health.readiness()
+
+    assert all(check["cached"] for check in result["checks"].values())
+    assert calls["supabase"] == 1
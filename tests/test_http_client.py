@@ -0,0 +1,92 @@
+# tests/test_http_client.py
+import time
+
+import httpx
+
+from services.http_client import AsyncJSONClient, build_session
+
+
+def test_session_reuses_one_connection(stub_server):
+    session = build_session()
+
+    for _ in range(3):
+        assert session.get(f"{stub_server.url}/v1/user").status_code == 200
+
+    assert len({request["client"] for request in stub_server.requests}) == 1
+
+
+def test_session_retries_transient_errors(stub_server):
+    statuses = [503, 502, 200]
+    stub_server.respond = lambda path: (statuses.pop(0), {"data": {}}, None)
+    session = build_session(backoff_factor=0)
+
+    response = session.get(f"{stub_server.url}/v1/user")
+
+    assert response.status_code == 200
+    assert len(stub_server.requests) == 3
+
+
+def test_session_does_not_retry_client_errors(stub_server):
+    stub_server.respond = lambda path: (404, {"error": "not found"}, None)
+
+    response = build_session(backoff_factor=0).get(f"{stub_server.url}/v1/missing")
+
+    assert response.status_code == 404
+    assert len(stub_server.requests) == 1
+
+
+def test_get_many_keeps_input_order_and_returns_failures(stub_server):
+    attempts = {}
+
+    def respond(path):
+        attempts[path] = attempts.get(path, 0) + 1
+        if path == "/flaky" and attempts[path] == 1:
+            return 503, {}, None
+        if path == "/missing":
+            return 404, {}, None
+        return 200, {"data": path}, None
+
+    stub_server.respond = respond
+    client = AsyncJSONClient(stub_server.url, backoff_factor=0)
+
+    first, flaky, missing = client.get_many_sync(["/first", "/flaky", "/missing"])
+
+    assert first == {"data": "/first"}
+    assert flaky == {"data": "/flaky"} and attempts["/flaky"] == 2
+    assert isinstance(missing, Exception)
+    assert attempts["/missing"] == 1
+
+
+def test_get_many_gives_up_after_retries(stub_server):
+    stub_server.respond = lambda path: (503, {}, None)
+    client = AsyncJSONClient(stub_server.url, retries=2, backoff_factor=0)
+
+    [result] = client.get_many_sync(["/down"])
+
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert len(stub_server.requests) == 3
+
+
+def test_session_caps_a_long_retry_after(stub_server):
+    statuses = [429, 200]
+    stub_server.respond = lambda path: (statuses.pop(0), {"data": {}}, {"Retry-After": "3600"})
+    session = build_session(max_retry_after=0.05)
+
+    started = time.perf_counter()
+    response = session.get(f"{stub_server.url}/v1/user")
+
+    assert response.status_code == 200
+    assert len(stub_server.requests) == 2
+    assert time.perf_counter() - started < 1
+
+
+def test_get_many_caps_a_long_retry_after(stub_server):
+    statuses = [429, 200]
+    stub_server.respond = lambda path: (statuses.pop(0), {"data": path}, {"Retry-After": "3600"})
+    client = AsyncJSONClient(stub_server.url, max_retry_after=0.05)
+
+    started = time.perf_counter()
+    [result] = client.get_many_sync(["/limited"])
+
+    assert result == {"data": "/limited"}
+    assert time.perf_counter() - started < 1
@@ -0,0 +1,38 @@
+# tests/test_intent_router.py
+import pytest
+
+from services.intent_router import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter.from_file()
+
+
+@pytest.mark.parametrize("prompt, providers", [
+    ("How much is left in my grocery budget?", ["budget"]),
+    ("What's on my calendar tomorrow?", ["calendar"]),
+    ("Write a haiku about autumn", []),
+])
+def test_prompts_route_to_their_context(router, prompt, providers):
+    assert router.providers_for(prompt) == providers
+
+
+def test_unsure_prediction_asks_the_fallback():
+    asked = []
+
+    def fallback(prompt, intents):
+        asked.append((prompt, intents))
+        return "calendar"
+
+    router = IntentRouter.from_file(min_confidence=1.01, fallback=fallback)
+
+    assert router.classify("How much is left in my grocery budget?") == ("calendar", "fallback")
+    assert asked[0][1] == router.intents
+    assert router.stats["fallback"] == 1
+
+
+def test_unusable_fallback_answer_keeps_the_local_intent():
+    router = IntentRouter.from_file(min_confidence=1.01, fallback=lambda prompt, intents: None)
+
+    assert router.classify("How much is left in my grocery budget?") == ("budget", "local")
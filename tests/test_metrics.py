@@ -0,0 +1,76 @@
+# tests/test_metrics.py
+import json
+import socket
+import urllib.request
+
+import pytest
+
+from utils.metrics import METRICS, MetricsRegistry, record_claude_usage, start_metrics_server, track
+
+
+def test_track_times_calls_and_counts_errors():
+    registry = MetricsRegistry()
+    with track("ynab", "get_month", registry):
+        pass
+    with pytest.raises(ConnectionError):
+        with track("ynab", "get_month", registry):
+            raise ConnectionError("down")
+
+    snapshot = registry.snapshot()
+    [histogram] = snapshot["histograms"]
+    assert histogram["labels"] == {"upstream": "ynab", "operation": "get_month"}
+    assert histogram["count"] == 2
+    assert snapshot["counters"] == [{"name": "upstream_errors_total",
+                                     "labels": {"operation": "get_month", "upstream": "ynab"},
+                                     "value": 1}]
+
+
+def test_claude_usage_records_tokens_and_cost():
+    registry = MetricsRegistry()
+    usage = {"input_tokens": 1_000_000, "output_tokens": 0,
+             "cache_creation_input_tokens": 0, "cache_read_input_tokens": 1_000_000}
+
+    record_claude_usage("claude-3-haiku-20240307", usage, registry)
+
+    counters = {(c["name"], c["labels"].get("kind")): c["value"] for c in registry.snapshot()["counters"]}
+    assert counters[("claude_tokens_total", "input")] == 1_000_000
+    assert counters[("claude_tokens_total", "cache_read_input")] == 1_000_000
+    assert ("claude_tokens_total", "output") not in counters
+    assert counters[("claude_cost_usd_total", None)] == pytest.approx(0.25 + 0.03)
+
+
+def test_prometheus_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for seconds in (0.004, 0.2, 60):
+        registry.observe("upstream_request_seconds", seconds, upstream="claude")
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE upstream_request_seconds histogram" in text
+    assert 'upstream_request_seconds_bucket{upstream="claude",le="0.005"} 1' in text
+    assert 'upstream_request_seconds_bucket{upstream="claude",le="0.25"} 2' in text
+    assert 'upstream_request_seconds_bucket{upstream="claude",le="+Inf"} 3' in text
+    assert 'upstream_request_seconds_count{upstream="claude"} 3' in text
+
+
+def test_metrics_server_exports_the_shared_registry():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    METRICS.inc("cache_lookups_total", cache="test_metrics", result="hit")
+    server = start_metrics_server(port)
+    try:
+        text = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        data = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json", timeout=5).read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'cache_lookups_total{cache="test_metrics",result="hit"}' in text
+    assert any(c["labels"].get("cache") == "test_metrics" for c in data["counters"])
+
+
+def test_metrics_server_is_off_without_a_port(monkeypatch):
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+
+    assert start_metrics_server() is None
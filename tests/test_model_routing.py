@@ -0,0 +1,64 @@
+# tests/test_model_routing.py
+import pytest
+
+from services.model_routing import REQUEST_CLASSES, ModelRoutingPolicy, estimate_latency
+
+POLICY = ModelRoutingPolicy(fast_model="fast", default_model="default", complex_model="complex",
+                            fallback_model="fallback", latency_target_seconds=0, cost_target_usd=0)
+
+
+@pytest.mark.parametrize("prompt, intent, request_class", [
+    ("thanks so much!", "general", "trivial"),
+    ("How much is left for groceries?", "budget", "lookup"),
+    ("What's on tomorrow?", "calendar", "lookup"),
+    ("Plan a cheap weekend trip to the coast with my remaining fun money", "budget", "complex"),
+    ("Why?", "general", "general"),
+    ("Tell me a joke", "general", "general"),
+])
+def test_prompts_are_classed(prompt, intent, request_class):
+    assert POLICY.classify(prompt, intent) == request_class
+
+
+def test_each_class_gets_its_model_and_output_budget():
+    trivial = POLICY.choose("hi", "general")
+    complex_ = POLICY.choose("Compare my spending this month and last month and explain it", "budget")
+
+    assert (trivial["model"], trivial["max_tokens"]) == ("fast", REQUEST_CLASSES["trivial"]["max_tokens"])
+    assert (complex_["model"], complex_["max_tokens"]) == ("complex", REQUEST_CLASSES["complex"]["max_tokens"])
+    assert complex_["fallback_model"] == "fallback"
+
+
+def test_fallback_is_never_the_failing_model():
+    policy = ModelRoutingPolicy(fast_model="fast", default_model="fallback", fallback_model="fallback",
+                                latency_target_seconds=0, cost_target_usd=0)
+
+    assert policy.choose("Tell me a joke")["fallback_model"] == "fast"
+
+
+def test_latency_target_shortens_the_answer():
+    policy = ModelRoutingPolicy(fast_model="claude-3-haiku-20240307",
+                                complex_model="claude-3-5-haiku-20241022",
+                                latency_target_seconds=3.0, cost_target_usd=0)
+
+    decision = policy.choose("Explain step by step how to build an emergency fund on my budget", "budget")
+
+    assert decision["model"] == "claude-3-haiku-20240307"
+    assert estimate_latency(decision["model"], decision["max_tokens"]) <= 3.0
+
+
+def test_cost_target_drops_to_the_fast_model():
+    policy = ModelRoutingPolicy(fast_model="claude-3-haiku-20240307",
+                                complex_model="claude-3-5-sonnet-20241022",
+                                latency_target_seconds=0, cost_target_usd=0.001)
+
+    decision = policy.choose("Compare my spending this month and last month and explain it",
+                             input_tokens=2000)
+
+    assert decision["model"] == "claude-3-haiku-20240307"
+
+
+def test_trivial_prompts_skip_external_context():
+    decision = POLICY.choose("thank you")
+
+    assert POLICY.providers_needed(decision, ["history", "recall", "budget"]) == ["history"]
+    assert POLICY.providers_needed(POLICY.choose("Tell me a joke"), ["history", "recall"]) == ["history", "recall"]
@@ -0,0 +1,107 @@
+# tests/test_month_range.py
+import time
+from datetime import date
+
+import httpx
+import pytest
+
+from services.cache import TwoTierCache
+from services.ynab_service import month_starts
+
+CURRENT = date.today().replace(day=1)
+START = f"{CURRENT.year - 1:04d}-{CURRENT.month:02d}-01"  # 13 months including this one
+
+
+@pytest.fixture
+def months_server(stub_server):
+    stub_server.delay = 0.0
+    stub_server.failing = set()
+
+    def respond(path):
+        if path == "/v1/budgets":
+            return 200, {"data": {"budgets": [{"id": "b1", "name": "Home"}]}}, None
+        month = path.rsplit("/", 1)[1]
+        time.sleep(stub_server.delay)
+        if month in stub_server.failing:
+            return 404, {"error": {"id": "404.2"}}, None
+        return 200, {"data": {"month": {
+            "month": month, "budgeted": 500000, "activity": -320000, "age_of_money": 30,
+            "categories": []
+        }}}, None
+    stub_server.respond = respond
+    return stub_server
+
+
+def month_reads(server):
+    return [request["path"].rsplit("/", 1)[1] for request in server.requests if "/months/" in request["path"]]
+
+
+def test_closed_months_are_fetched_once(months_server, make_ynab):
+    ynab = make_ynab()
+
+    first = ynab.get_month_range(START)
+    months_server.requests.clear()
+    second = ynab.get_month_range(START)
+
+    assert len(first) == 13 and second == first
+    assert month_reads(months_server) == [CURRENT.isoformat()]
+
+
+def test_closed_months_come_from_the_shared_cache(months_server, make_ynab, cache_backend):
+    make_ynab(cache=TwoTierCache(backend=cache_backend)).get_month_range(START)
+    months_server.requests.clear()
+
+    restarted = make_ynab(cache=TwoTierCache(backend=cache_backend))
+
+    assert len(restarted.get_month_range(START)) == 13
+    assert month_reads(months_server) == [CURRENT.isoformat()]
+
+
+def test_invalidated_months_are_fetched_again(months_server, make_ynab):
+    ynab = make_ynab()
+    ynab.get_month_range(START)
+    months_server.requests.clear()
+
+    ynab.invalidate_month_snapshots()
+    ynab.get_month_range(START)
+
+    assert len(month_reads(months_server)) == 13
+
+
+def test_cold_range_fetches_months_concurrently(months_server, make_ynab):
+    months_server.delay = 0.1
+    ynab = make_ynab()
+    ynab.resolve_budget_id()
+
+    started = time.perf_counter()
+    history = ynab.get_month_range(START)
+
+    assert [m["month"] for m in history] == sorted(m["month"] for m in history)
+    assert len(history) == 13
+    assert time.perf_counter() - started < 0.1 * 13 / 2
+
+
+def test_failed_month_is_left_out_and_retried_next_time(months_server, make_ynab):
+    ynab = make_ynab()
+    months_server.failing = {START}
+
+    assert len(ynab.get_month_range(START)) == 12
+
+    months_server.failing = set()
+    months_server.requests.clear()
+    assert len(ynab.get_month_range(START)) == 13
+    assert sorted(month_reads(months_server)) == [START, CURRENT.isoformat()]
+
+
+def test_failed_batch_returns_the_cached_months(months_server, make_ynab):
+    ynab = make_ynab()
+    ynab.get_month_range(START)
+
+    def unreachable(paths):
+        raise httpx.ConnectError("YNAB unreachable")
+
+    ynab.async_client.get_many_sync = unreachable
+    history = ynab.get_month_range(START)
+
+    assert [m["month"] for m in history] == month_starts(START, CURRENT.isoformat())[:-1]
+    assert "YNAB unreachable" in ynab.last_error
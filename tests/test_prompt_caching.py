@@ -0,0 +1,96 @@
+# tests/test_prompt_caching.py
+from types import SimpleNamespace
+
+from services.claude_service import CACHE_BREAKPOINT, ClaudeService
+
+HISTORY = [
+    {"role": "user", "content": "How are groceries?"},
+    {"role": "assistant", "content": "Groceries are at 72%."}
+]
+CONTEXT = {"budget": "Remaining: $1,800.00", "calendar": "Dentist at 3pm"}
+
+
+def breakpoints(request):
+    blocks = list(request["system"])
+    for message in request["messages"]:
+        if isinstance(message["content"], list):
+            blocks.extend(message["content"])
+    return [block for block in blocks if block.get("cache_control") == CACHE_BREAKPOINT]
+
+
+def test_last_history_message_carries_a_breakpoint():
+    claude = ClaudeService(client=object())
+
+    request = claude._build_request("And dining out?", context=dict(CONTEXT), chat_history=HISTORY)
+
+    *_, last_history, current = request["messages"]
+    assert last_history["content"] == [{"type": "text", "text": "Groceries are at 72%.",
+                                         "cache_control": CACHE_BREAKPOINT}]
+    assert current == {"role": "user", "content": "And dining out?"}
+    # System prompt, context block, history: within Anthropic's limit of four
+    assert len(breakpoints(request)) == 3
+    assert HISTORY[-1]["content"] == "Groceries are at 72%."
+
+
+def test_context_block_is_reused_for_the_same_data_version():
+    claude = ClaudeService(client=object())
+
+    first = claude._get_context_messages({**CONTEXT, "version": ("v1", "Dentist at 3pm")})
+    again = claude._get_context_messages({**CONTEXT, "version": ("v1", "Dentist at 3pm")})
+    changed = claude._get_context_messages({**CONTEXT, "budget": "Remaining: $900.00",
+                                            "version": ("v2", "Dentist at 3pm")})
+
+    assert again is first
+    assert "$900.00" in changed[0]["content"][0]["text"]
+
+
+def test_context_without_a_version_is_always_rebuilt():
+    claude = ClaudeService(client=object())
+
+    claude._get_context_messages({"budget": "Budget information not available."})
+    live = claude._get_context_messages({"budget": "Remaining: $1,800.00"})
+
+    assert "$1,800.00" in live[0]["content"][0]["text"]
+
+
+class ToolRoundsClient:
+    """messages.create asks for one tool per round, then answers"""
+
+    def __init__(self, tool_rounds):
+        self.tool_rounds = tool_rounds
+        self.requests = []
+        self.messages = self
+
+    def create(self, **request):
+        self.requests.append(dict(request))
+        usage = SimpleNamespace(input_tokens=100, output_tokens=20)
+        if len(self.requests) <= self.tool_rounds:
+            call = SimpleNamespace(type="tool_use", id=f"toolu_{len(self.requests)}",
+                                   name="get_category", input={"name": "grocer"})
+            return SimpleNamespace(content=[call], stop_reason="tool_use", usage=usage)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="$200 left.")],
+                               stop_reason="end_turn", usage=usage)
+
+
+class FakeTools:
+    def definitions(self):
+        return [{"name": "get_category", "input_schema": {"type": "object"}}]
+
+    def run(self, name, args, turn):
+        return '{"Groceries": 200}', False, "executed"
+
+
+def test_each_tool_round_moves_the_breakpoint_to_the_newest_results():
+    client = ToolRoundsClient(tool_rounds=2)
+    claude = ClaudeService(client=client)
+
+    claude.get_response("How much is left for groceries?", context=dict(CONTEXT),
+                        chat_history=HISTORY, tools=FakeTools())
+
+    first, second, third = client.requests
+    assert len(breakpoints(first)) == 3
+    assert second["messages"][-1]["content"][-1]["cache_control"] == CACHE_BREAKPOINT
+    # The second round's results take over the first round's breakpoint
+    assert "cache_control" not in third["messages"][-3]["content"][-1]
+    assert third["messages"][-1]["content"][-1]["cache_control"] == CACHE_BREAKPOINT
+    assert len(breakpoints(second)) == len(breakpoints(third)) == 4
@@ -0,0 +1,71 @@
+# tests/test_recall.py
+from services.recall import RecallIndex
+
+EXCHANGES = [
+    ("How much did I spend on groceries?", "About $450 at Costco and Safeway."),
+    ("When is my dentist appointment?", "Thursday at 3pm."),
+    ("Should I cancel the gym membership?", "You used it twice last month."),
+]
+
+
+def filled(path):
+    index = RecallIndex(str(path))
+    for i, (question, answer) in enumerate(EXCHANGES):
+        index.add(question, answer, f"2026-10-0{i + 1}T09:00:00+00:00")
+    return index
+
+
+def test_search_ranks_the_related_exchange_first(tmp_path):
+    index = filled(tmp_path)
+
+    [best, *_] = index.search("grocery spending at costco")
+
+    assert best["user_message"] == EXCHANGES[0][0]
+    assert index.search("quantum chromodynamics") == []
+
+
+def test_index_reloads_after_restart_and_keeps_growing(tmp_path):
+    filled(tmp_path).save()
+
+    restarted = RecallIndex(str(tmp_path))
+    restarted.add("Did I pay rent?", "Yes, on the 1st.", "2026-10-04T09:00:00+00:00")
+
+    assert len(restarted) == 4
+    assert restarted.search("dentist appointment")[0]["assistant_response"] == "Thursday at 3pm."
+
+
+def test_same_row_is_indexed_once(tmp_path):
+    index = filled(tmp_path)
+
+    index.add(*EXCHANGES[0], "2026-10-01T09:00:00+00:00")
+
+    assert len(index) == 3
+
+
+class PagedHistory:
+    """get_chat_history_page over rows held newest first"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.pages = 0
+
+    def get_chat_history_page(self, before=None, limit=20):
+        self.pages += 1
+        start = 0 if before is None else before + 1
+        rows = self.rows[start:start + limit]
+        return rows, (start + limit - 1 if len(rows) == limit else None)
+
+
+def test_backfill_indexes_only_rows_newer_than_the_last_sync(tmp_path):
+    rows = [{"user_message": f"question {i}", "assistant_response": f"answer {i}",
+             "created_at": f"2026-10-{i:02d}T09:00:00+00:00"} for i in range(20, 0, -1)]
+    index = RecallIndex(str(tmp_path))
+    assert index.sync_from_supabase(PagedHistory(rows), page_size=8) == 20
+
+    newer = [{"user_message": "question 21", "assistant_response": "answer 21",
+              "created_at": "2026-10-21T09:00:00+00:00"}] + rows
+    history = PagedHistory(newer)
+
+    assert index.sync_from_supabase(history, page_size=8) == 1
+    assert history.pages == 1
+    assert len(index) == 21
@@ -0,0 +1,107 @@
+# tests/test_response_cache.py
+from types import SimpleNamespace
+
+from services.cache import TwoTierCache
+from services.claude_service import ClaudeService
+from services.response_cache import ResponseCache, normalize_prompt
+from utils.metrics import METRICS
+
+CONTEXT = {"budget": "Remaining: $1,800.00"}
+
+
+class DataVersion:
+    def __init__(self):
+        self.value = "v1"
+
+    def __call__(self):
+        return self.value
+
+
+def ask(cache, prompt, context=CONTEXT, history=None, variant=""):
+    """Look a prompt up; on a miss, store an answer naming the prompt"""
+    cached, slot = cache.lookup(prompt, context, history, variant)
+    if cached is None:
+        cache.store(slot, f"answer to {prompt}")
+    return cached, slot["match"]
+
+
+def test_normalized_repeat_is_an_exact_hit():
+    cache = ResponseCache(TwoTierCache(), data_version=DataVersion())
+    ask(cache, "How much have I spent?")
+
+    assert normalize_prompt("how much have i SPENT") == "how much have i spent"
+    assert ask(cache, "  how much have I spent ") == ("answer to How much have I spent?", "exact")
+    assert cache.stats == {"exact_hits": 1, "near_hits": 0, "misses": 1, "stored": 1}
+
+
+def test_new_data_version_retires_earlier_answers():
+    version = DataVersion()
+    cache = ResponseCache(TwoTierCache(), data_version=version, similarity_threshold=0.8)
+    ask(cache, "How much have I spent?")
+    assert cache.lookup("how much have i spent so far", CONTEXT)[1]["match"] == "near"
+
+    version.value = "v2"
+
+    assert cache.lookup("How much have I spent?", CONTEXT)[0] is None
+    assert cache.lookup("how much have i spent so far", CONTEXT)[0] is None
+    assert cache.stats["misses"] == 3
+
+
+def test_context_history_and_variant_scope_the_answer():
+    cache = ResponseCache(TwoTierCache(), data_version=DataVersion())
+    ask(cache, "And dining out?", history=[{"role": "user", "content": "How are groceries?"}])
+
+    assert ask(cache, "And dining out?", history=[{"role": "user", "content": "How is rent?"}])[1] is None
+    assert ask(cache, "And dining out?", context={"budget": "Remaining: $900.00"})[1] is None
+    assert ask(cache, "And dining out?", variant="tools")[1] is None
+
+
+def test_near_duplicate_matches_unless_numbers_differ():
+    cache = ResponseCache(TwoTierCache(), data_version=DataVersion(), similarity_threshold=0.5)
+    ask(cache, "How much did I spend on groceries in 2025?")
+
+    assert ask(cache, "how much did i spend on groceries in 2025")[1] == "exact"
+    assert ask(cache, "How much have I spent on groceries in 2025?") == \
+        ("answer to How much did I spend on groceries in 2025?", "near")
+    assert ask(cache, "How much did I spend on groceries in 2024?") == (None, None)
+
+
+def test_answers_are_shared_through_the_backend(cache_backend):
+    ask(ResponseCache(TwoTierCache(backend=cache_backend), data_version=DataVersion()),
+        "How much have I spent?")
+
+    restarted = ResponseCache(TwoTierCache(backend=cache_backend), data_version=DataVersion())
+
+    assert ask(restarted, "How much have I spent?")[1] == "exact"
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+        self.messages = self
+
+    def create(self, **request):
+        self.calls += 1
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="You spent $1,200.")],
+                               stop_reason="end_turn",
+                               usage=SimpleNamespace(input_tokens=100, output_tokens=10))
+
+
+def hits_recorded():
+    return sum(c["value"] for c in METRICS.snapshot()["counters"]
+               if c["name"] == "claude_response_cache_total" and c["labels"]["result"] == "exact")
+
+
+def test_claude_answers_a_repeat_from_the_cache_and_flags_it():
+    client = CountingClient()
+    claude = ClaudeService(client=client,
+                           response_cache=ResponseCache(TwoTierCache(), data_version=DataVersion()))
+    before = hits_recorded()
+
+    first = claude.get_response("How much have I spent?", context=dict(CONTEXT))
+    second = claude.get_response("how much have I spent", context=dict(CONTEXT))
+
+    assert first == second == "You spent $1,200."
+    assert client.calls == 1
+    assert claude.last_route["cached"] == "exact"
+    assert hits_recorded() == before + 1
@@ -0,0 +1,41 @@
+# tests/test_startup.py
+import json
+import subprocess
+import sys
+
+import pytest
+
+from services.shared import LazyServices
+
+# What the pages import before their first service lookup
+PAGE_IMPORTS = [
+    "utils.auth", "utils.health", "utils.metrics", "services.shared", "services.context",
+    "services.conversation_memory", "services.dashboard_snapshot", "services.resilience",
+]
+HEAVY_MODULES = ["anthropic", "supabase", "pandas", "googleapiclient", "services.ynab_service"]
+
+
+def test_page_imports_leave_the_sdks_unloaded():
+    code = (
+        "import importlib, json, sys\n"
+        f"for name in {PAGE_IMPORTS!r}: importlib.import_module(name)\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert json.loads(output.stdout) == []
+
+
+def test_services_are_built_on_first_lookup_only():
+    built = []
+    services = LazyServices({
+        "ynab": lambda: built.append("ynab") or "ynab service",
+        "calendar": lambda: built.append("calendar") or "calendar service",
+    })
+
+    assert "calendar" in services and "claude" not in services
+    assert built == []
+    assert services["ynab"] == "ynab service"
+    assert built == ["ynab"]
+    with pytest.raises(KeyError):
+        services["claude"]
@@ -0,0 +1,82 @@
+# tests/test_transactions.py
+from datetime import date
+
+import pytest
+
+from services.transactions import TransactionLedger, search_transactions, spending_insights
+
+TODAY = date(2026, 10, 15)
+
+
+def txn(id, day, amount, payee, category="Groceries", **fields):
+    return {"id": id, "date": day, "amount": amount, "payee_name": payee,
+            "category_name": category, "deleted": False, **fields}
+
+
+RECORDS = [
+    txn("t1", "2026-10-02", -60000, "Costco"),
+    txn("t2", "2026-10-10", -30000, "Safeway"),
+    txn("t3", "2026-09-12", -120000, "Costco"),
+    txn("t4", "2026-08-20", -80000, "Costco"),
+    txn("t5", "2026-10-05", 2500000, "Employer", "Inflow: Ready to Assign"),
+    txn("t6", "2026-10-06", -500000, "Transfer : Savings", None, transfer_account_id="a2"),
+    txn("t7", "2026-10-08", -90000, "Target", None, subtransactions=[
+        {"id": "s1", "amount": -50000, "category_name": "Household", "deleted": False},
+        {"id": "s2", "amount": -40000, "category_name": "Groceries", "deleted": False},
+    ]),
+]
+
+
+class Store:
+    def __init__(self, records):
+        self.records = records
+
+    def get_records(self, budget_id, kind):
+        return self.records
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return TransactionLedger(Store(RECORDS), path=str(tmp_path))
+
+
+def test_insights_skip_transfers_and_income_and_split_subtransactions(ledger):
+    insights = spending_insights(ledger.frame("b1"), today=TODAY, months=3)
+
+    assert insights["monthly"] == [{"month": "2026-08", "spent": 80.0},
+                                   {"month": "2026-09", "spent": 120.0},
+                                   {"month": "2026-10", "spent": 180.0}]
+    assert insights["month_over_month"] == pytest.approx(0.5)
+    assert insights["burn_rate_per_day"] == pytest.approx(12.0)
+    assert insights["top_payees"][0] == {"payee": "Target", "spent": 90.0}
+    groceries = next(c for c in insights["category_projections"] if c["category"] == "Groceries")
+    assert groceries["spent"] == 130.0
+
+
+def test_delta_replaces_changed_and_deleted_transactions(ledger):
+    ledger.frame("b1")
+
+    ledger.apply("b1", "transactions", [
+        txn("t1", "2026-10-02", -10000, "Costco"),
+        {**RECORDS[6], "deleted": True},
+    ])
+
+    frame = ledger.frame("b1")
+    assert set(frame["parent_id"]) == {"t1", "t2", "t3", "t4", "t5", "t6"}
+    assert frame.loc[frame["id"] == "t1", "amount"].item() == -10.0
+
+
+def test_ledger_is_read_back_from_parquet(ledger, tmp_path):
+    ledger.frame("b1")
+
+    reopened = TransactionLedger(Store([]), path=str(tmp_path))
+
+    assert len(reopened.frame("b1")) == 8
+
+
+def test_search_totals_every_match_but_returns_the_newest(ledger):
+    result = search_transactions(ledger.frame("b1"), payee="costco", limit=2)
+
+    assert result["count"] == 3
+    assert result["total_spent"] == 260.0
+    assert [t["date"] for t in result["transactions"]] == ["2026-10-02", "2026-09-12"]
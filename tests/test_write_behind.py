@@ -0,0 +1,74 @@
+# tests/test_write_behind.py
+import threading
+import time
+
+from services.resilience import CircuitOpenError
+from services.write_behind import WriteBehindQueue
+
+
+class Sink:
+    """write_batch that records batches and can fail its first calls"""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.batches = []
+        self.thread = None
+
+    def __call__(self, rows):
+        self.thread = threading.current_thread()
+        time.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        self.batches.append([row["n"] for row in rows])
+
+
+def test_put_returns_before_the_write_and_rows_are_batched_in_order():
+    sink = Sink(delay=0.2)
+    writer = WriteBehindQueue(sink, max_batch_size=3, flush_interval_seconds=0.05)
+
+    started = time.perf_counter()
+    for n in range(7):
+        assert writer.put({"n": n})
+    assert time.perf_counter() - started < 0.1
+
+    assert writer.flush(timeout=5)
+    assert [n for batch in sink.batches for n in batch] == list(range(7))
+    assert max(len(batch) for batch in sink.batches) == 3
+    assert sink.thread is not threading.current_thread()
+    writer.close()
+
+
+def test_failed_batch_is_retried_before_later_rows():
+    sink = Sink(failures=[ConnectionError("down"), CircuitOpenError("open")])
+    writer = WriteBehindQueue(sink, flush_interval_seconds=0.01, retry_backoff_seconds=0.01)
+
+    writer.put({"n": 1})
+    writer.put({"n": 2})
+    assert writer.flush(timeout=5)
+
+    assert [n for batch in sink.batches for n in batch] == [1, 2]
+    stats = writer.stats()
+    assert (stats["failures"], stats["circuit_waits"], stats["queue_depth"]) == (1, 1, 0)
+    writer.close()
+
+
+def test_full_queue_drops_new_rows():
+    sink = Sink(delay=0.2)
+    writer = WriteBehindQueue(sink, max_batch_size=1, max_pending_rows=2)
+
+    results = [writer.put({"n": n}) for n in range(4)]
+
+    assert results == [True, True, False, False]
+    assert writer.stats()["rows_dropped"] == 2
+    writer.close()
+
+
+def test_close_writes_what_is_pending():
+    sink = Sink()
+    writer = WriteBehindQueue(sink, flush_interval_seconds=60)
+    writer.put({"n": 1})
+
+    writer.close()
+
+    assert sink.batches == [[1]]
@@ -0,0 +1,187 @@
+# tests/test_ynab_sync.py
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from services.ynab_sync import SQLiteSyncStore, SupabaseSyncStore, YNABSyncEngine
+
+TODAY = date.today()
+LAST_MONTH = (TODAY.replace(day=1) - TODAY.resolution).isoformat()
+
+
+class FakeYNAB:
+    """fetch(path) for budget b1, answering delta requests the way YNAB does"""
+
+    def __init__(self, delay=0.0):
+        self.knowledge = 10
+        self.delay = delay
+        self.paths = []
+        self.categories = {
+            f"c{i}": {"id": f"c{i}", "name": name, "hidden": False, "deleted": False,
+                      "budgeted": 300000, "activity": -100000, "balance": 200000, "_knowledge": 10}
+            for i, name in enumerate(["Groceries", "Dining Out", "Rent"])
+        }
+        self.transactions = {
+            f"t{i}": {"id": f"t{i}", "date": day, "amount": -20000, "payee_name": "Costco",
+                      "deleted": False, "_knowledge": 10}
+            for i, day in enumerate([TODAY.isoformat(), TODAY.isoformat(), LAST_MONTH])
+        }
+
+    def change(self, records, record_id, **fields):
+        self.knowledge += 1
+        record = records.setdefault(record_id, {"id": record_id, "deleted": False})
+        record.update(fields, _knowledge=self.knowledge)
+
+    def __call__(self, path):
+        self.paths.append(path)
+        time.sleep(self.delay)
+        since = int(path.split("last_knowledge_of_server=")[1]) if "?" in path else 0
+
+        def changed(records):
+            # A full pull (no knowledge) leaves deleted records out
+            return [r for r in records.values() if r["_knowledge"] > since and (since or not r["deleted"])]
+
+        if "/categories" in path:
+            return {"server_knowledge": self.knowledge,
+                    "category_groups": [{"name": "Everyday", "categories": changed(self.categories)}]}
+        if "/transactions" in path:
+            return {"server_knowledge": self.knowledge, "transactions": changed(self.transactions)}
+        return {"month": {"month": TODAY.replace(day=1).isoformat(), "age_of_money": 30}}
+
+
+def ids(store, kind):
+    return sorted(record["id"] for record in store.get_records("b1", kind))
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def store(request, tmp_path, cache_backend):
+    if request.param == "sqlite":
+        return SQLiteSyncStore(str(tmp_path / "sync.sqlite"))
+    return SupabaseSyncStore(cache_backend)
+
+
+def test_first_sync_pulls_everything_then_only_deltas(store):
+    ynab = FakeYNAB()
+    engine = YNABSyncEngine(ynab, store)
+
+    engine.sync("b1")
+    assert ids(store, "transactions") == ["t0", "t1", "t2"]
+    assert not any("last_knowledge_of_server" in path for path in ynab.paths)
+
+    ynab.change(ynab.transactions, "t1", deleted=True)
+    ynab.change(ynab.transactions, "t9", date=TODAY.isoformat(), amount=-5000)
+    ynab.paths.clear()
+    changed = engine.sync("b1", force=True)
+
+    assert changed == {"categories": 0, "transactions": 2}
+    assert ids(store, "transactions") == ["t0", "t2", "t9"]
+    assert all("last_knowledge_of_server=10" in path for path in ynab.paths[:2])
+
+
+def test_sync_within_interval_fetches_nothing(store):
+    ynab = FakeYNAB()
+    engine = YNABSyncEngine(ynab, store, min_sync_interval_seconds=60)
+    engine.sync("b1")
+    ynab.paths.clear()
+
+    assert engine.sync("b1") == {}
+    assert ynab.paths == []
+
+
+def test_data_version_changes_with_synced_data(store):
+    ynab = FakeYNAB()
+    engine = YNABSyncEngine(ynab, store)
+    engine.sync("b1")
+    before = engine.data_version("b1")
+
+    assert engine.sync("b1", force=True) == {"categories": 0, "transactions": 0}
+    assert engine.data_version("b1") == before
+
+    ynab.change(ynab.categories, "c0", budgeted=400000)
+    engine.sync("b1", force=True)
+    assert engine.data_version("b1") != before
+
+
+def test_concurrent_syncs_of_one_budget_fetch_once(store):
+    ynab = FakeYNAB(delay=0.05)
+    engine = YNABSyncEngine(ynab, store, min_sync_interval_seconds=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engine.sync("b1"))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum("/categories" in path for path in ynab.paths) == 1
+    assert sum(bool(result) for result in results) == 1
+
+
+def test_supabase_delta_rewrites_only_the_touched_month(cache_backend):
+    ynab = FakeYNAB()
+    engine = YNABSyncEngine(ynab, SupabaseSyncStore(cache_backend))
+    engine.sync("b1")
+    cache_backend.written.clear()
+
+    ynab.change(ynab.transactions, "t2", amount=-1000)
+    engine.sync("b1", force=True)
+
+    written = [key for key in cache_backend.written if ":transactions" in key]
+    assert written == [f"ynab_sync:b1:transactions:{LAST_MONTH[:7]}", "ynab_sync:b1:transactions"]
+
+
+def test_supabase_store_reloads_chunks_after_restart(cache_backend):
+    ynab = FakeYNAB()
+    engine = YNABSyncEngine(ynab, SupabaseSyncStore(cache_backend))
+    engine.sync("b1")
+    # Re-dated into this month: leaves last month's chunk
+    ynab.change(ynab.transactions, "t2", date=TODAY.isoformat())
+    engine.sync("b1", force=True)
+
+    restarted = SupabaseSyncStore(cache_backend)
+
+    assert ids(restarted, "transactions") == ["t0", "t1", "t2"]
+    assert restarted.get_knowledge("b1", "transactions") == ynab.knowledge
+    assert f"ynab_sync:b1:transactions:{LAST_MONTH[:7]}" not in cache_backend.rows
+
+
+def test_supabase_store_reads_the_single_document_layout(cache_backend):
+    cache_backend.set_cached_data("ynab_sync:b1:transactions", {
+        "server_knowledge": 42, "synced_at": 1.0,
+        "records": {"t0": {"id": "t0", "date": TODAY.isoformat(), "deleted": False}}
+    })
+    store = SupabaseSyncStore(cache_backend)
+
+    assert store.get_knowledge("b1", "transactions") == 42
+    store.apply("b1", "transactions", [{"id": "t1", "date": LAST_MONTH, "deleted": False}], 43)
+
+    assert ids(SupabaseSyncStore(cache_backend), "transactions") == ["t0", "t1"]
+    assert "records" not in cache_backend.rows["ynab_sync:b1:transactions"]["data"]
+
+
+def test_supabase_store_full_pull_when_a_chunk_expired(cache_backend):
+    engine = YNABSyncEngine(FakeYNAB(), SupabaseSyncStore(cache_backend))
+    engine.sync("b1")
+    del cache_backend.rows[f"ynab_sync:b1:transactions:{LAST_MONTH[:7]}"]
+
+    assert SupabaseSyncStore(cache_backend).get_knowledge("b1", "transactions") is None
+
+
+def test_failed_supabase_read_is_retried(cache_backend):
+    cache_backend.set_cached_data("ynab_sync:b1:categories",
+                                  {"server_knowledge": 7, "synced_at": 1.0, "chunks": []})
+    reads = []
+    original = cache_backend.get_cached_data
+
+    def flaky(key, raise_errors=False):
+        reads.append(key)
+        if len(reads) == 1:
+            raise ConnectionError("supabase unreachable")
+        return original(key, raise_errors)
+
+    cache_backend.get_cached_data = flaky
+    store = SupabaseSyncStore(cache_backend)
+
+    assert store.get_knowledge("b1", "categories") is None
+    assert store.get_knowledge("b1", "categories") == 7
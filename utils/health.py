@@ -1,33 +1,230 @@
 # utils/health.py
+"""Liveness and readiness probes for Azure App Service.
+
+``liveness`` only checks the process and configuration and never imports the
+SDKs, so it answers in well under 10ms. ``readiness`` makes one small
+authenticated request to each upstream (Supabase, YNAB, Anthropic), times it,
+and caches the result so frequent health pings don't reach the upstreams. The
+cache is also written to ``HEALTH_PROBE_CACHE_PATH`` so one-shot CLI checks
+share it with each other and with the running app.
+
+    python -m utils.health          # liveness
+    python -m utils.health ready    # readiness
+"""
 import os
 import sys
 import json
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+STARTED_AT = time.time()
+
+REQUIRED_VARS = [
+    "APP_PASSWORD",
+    "SUPABASE_URL",
+    "SUPABASE_ANON_KEY",
+    "ANTHROPIC_API_KEY"
+]
+
+REQUIRED_PACKAGES = ["anthropic", "supabase", "streamlit"]
+
+# Seconds a probe result is reused. YNAB requests count against its
+# 200/hour limit, so it is probed less often than the others.
+PROBE_TTL_SECONDS = float(os.getenv("HEALTH_PROBE_TTL_SECONDS", "30"))
+PROBE_TTLS = {"ynab": max(PROBE_TTL_SECONDS, 300.0)}
+PROBE_TIMEOUT = (1.0, 2.0)  # (connect, read) seconds
+PROBE_CACHE_PATH = os.getenv("HEALTH_PROBE_CACHE_PATH", ".health_probes.json")
+
+_probe_cache: Dict[str, Dict] = {}
+_probe_lock = threading.Lock()
+
+
+def liveness() -> Dict:
+    """Process is up and configured; no network calls or SDK imports"""
+    missing_vars = [var for var in REQUIRED_VARS if not os.getenv(var)]
+    # find_spec locates a package without executing (importing) it
+    missing_packages = [name for name in REQUIRED_PACKAGES if importlib.util.find_spec(name) is None]
+
+    result = {
+        "status": "healthy",
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "python_version": sys.version.split()[0]
+    }
+    if missing_vars:
+        result["status"] = "unhealthy"
+        result["missing_vars"] = missing_vars
+    if missing_packages:
+        result["status"] = "unhealthy"
+        result["missing_packages"] = missing_packages
+    return result
+
 
 def health_check():
     """Simple health check for Azure App Service"""
+    return liveness()
+
+
+def _http_probe(url: str, headers: Dict) -> Dict:
+    import requests  # deferred so liveness never pays for it
+
+    response = requests.get(url, headers=headers, timeout=PROBE_TIMEOUT)
+    return {"ok": response.status_code == 200, "status_code": response.status_code}
+
+
+def probe_supabase() -> Optional[Dict]:
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_ANON_KEY")
+    if not url or not key:
+        return None
+    return _http_probe(
+        f"{url.rstrip('/')}/rest/v1/api_cache?select=cache_key&limit=1",
+        {"apikey": key, "Authorization": f"Bearer {key}"}
+    )
+
+
+def probe_ynab() -> Optional[Dict]:
+    token = os.getenv("YNAB_ACCESS_TOKEN")
+    if not token:
+        return None
+    base_url = os.getenv("YNAB_BASE_URL", "https://api.youneedabudget.com/v1")
+    return _http_probe(f"{base_url}/user", {"Authorization": f"Bearer {token}"})
+
+
+def probe_anthropic() -> Optional[Dict]:
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        return None
+    base_url = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+    return _http_probe(
+        f"{base_url.rstrip('/')}/v1/models?limit=1",
+        {"x-api-key": api_key, "anthropic-version": "2023-06-01"}
+    )
+
+
+PROBES: Dict[str, Callable[[], Optional[Dict]]] = {
+    "supabase": probe_supabase,
+    "ynab": probe_ynab,
+    "anthropic": probe_anthropic
+}
+
+# A missing YNAB token only disables the budget features
+OPTIONAL_PROBES = {"ynab"}
+
+
+def _run_probe(name: str, probe: Callable[[], Optional[Dict]]) -> Dict:
+    started = time.perf_counter()
+    try:
+        result = probe()
+        if result is None:
+            result = {"ok": name in OPTIONAL_PROBES, "skipped": "not configured"}
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["checked_at"] = time.time()
+    return result
+
+
+def _load_probe_file():
+    """Merge results other processes saved that are newer than ours (lock held)"""
+    try:
+        with open(PROBE_CACHE_PATH) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return
+    for name, result in saved.items():
+        cached = _probe_cache.get(name)
+        if name in PROBES and (cached is None or result["checked_at"] > cached["checked_at"]):
+            _probe_cache[name] = result
+
+
+def _save_probe_file():
+    """Best effort: a read-only disk only costs other processes a fresh probe"""
+    tmp_path = f"{PROBE_CACHE_PATH}.{os.getpid()}.tmp"
     try:
-        # Check if main dependencies are available
-        import anthropic  # noqa: F401
-        import supabase  # noqa: F401
-        
-        # Check environment variables
-        required_vars = [
-            "APP_PASSWORD",
-            "SUPABASE_URL", 
-            "SUPABASE_ANON_KEY",
-            "ANTHROPIC_API_KEY"
-        ]
-        
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
-        
-        if missing_vars:
-            return {"status": "unhealthy", "missing_vars": missing_vars}
-        
-        return {"status": "healthy", "python_version": sys.version}
-    
-    except ImportError as e:
-        return {"status": "unhealthy", "error": str(e)}
+        with open(tmp_path, "w") as f:
+            json.dump(_probe_cache, f)
+        os.replace(tmp_path, PROBE_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def readiness(max_age_seconds: Optional[float] = None) -> Dict:
+    """Probe every upstream concurrently, reusing results younger than their TTL"""
+    now = time.time()
+    checks = {}
+    stale = []
+
+    with _probe_lock:
+        _load_probe_file()
+        for name in PROBES:
+            ttl = PROBE_TTLS.get(name, PROBE_TTL_SECONDS) if max_age_seconds is None else max_age_seconds
+            cached = _probe_cache.get(name)
+            if cached and now - cached["checked_at"] < ttl:
+                checks[name] = dict(cached, cached=True)
+            else:
+                stale.append(name)
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+            fresh = dict(zip(stale, pool.map(lambda name: _run_probe(name, PROBES[name]), stale)))
+        with _probe_lock:
+            _probe_cache.update(fresh)
+            _save_probe_file()
+        for name, result in fresh.items():
+            checks[name] = dict(result, cached=False)
+
+    ready = all(check["ok"] for check in checks.values())
+    return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+
+def reset_probe_cache():
+    with _probe_lock:
+        _probe_cache.clear()
+        try:
+            os.remove(PROBE_CACHE_PATH)
+        except FileNotFoundError:
+            pass
+
+
+class ReadinessMonitor:
+    """Re-runs ``readiness`` on a daemon thread so pages can show connection
+    status without waiting on the upstreams"""
+
+    def __init__(self, interval_seconds: float = 60.0):
+        self.interval_seconds = interval_seconds
+        self._latest: Optional[Dict] = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> "ReadinessMonitor":
+        with self._lock:
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._run, name="readiness-monitor", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            self._latest = readiness()
+            time.sleep(self.interval_seconds)
+
+    def latest(self) -> Optional[Dict]:
+        """Most recent readiness result, or None until the first check finishes"""
+        return self._latest
+
+    def check(self, name: str) -> Optional[Dict]:
+        latest = self._latest
+        return latest["checks"].get(name) if latest else None
+
 
 if __name__ == "__main__":
     # This can be called directly for health checks
-    print(json.dumps(health_check()))
+    if len(sys.argv) > 1 and sys.argv[1] == "ready":
+        result = readiness()
+        print(json.dumps(result))
+        sys.exit(0 if result["status"] == "ready" else 1)
+    result = liveness()
+    print(json.dumps(result))
+    sys.exit(0 if result["status"] == "healthy" else 1)
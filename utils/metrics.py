@@ -0,0 +1,233 @@
+# utils/metrics.py
+"""In-process metrics for upstream calls, Claude token spend and cache lookups.
+
+Services record into the shared ``METRICS`` registry via ``track``/``timed``,
+``record_claude_usage`` and ``record_cache``. The registry can be exported as
+Prometheus text or a JSON snapshot, and ``start_metrics_server`` serves both
+(``/metrics`` and ``/metrics.json``) from a background thread, along with the
+``/livez`` and ``/readyz`` probes from utils/health.py.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# USD per million tokens: (input, output, cache write, cache read)
+CLAUDE_PRICING = {
+    "claude-3-haiku-20240307": (0.25, 1.25, 0.30, 0.03),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 1.00, 0.08),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00, 3.75, 0.30),
+    "claude-sonnet-4-20250514": (3.00, 15.00, 3.75, 0.30),
+}
+
+HELP = {
+    "upstream_request_seconds": "Latency of calls to external services",
+    "upstream_errors_total": "Calls to external services that raised",
+    "claude_tokens_total": "Claude tokens by kind (input, output, cache_creation_input, cache_read_input)",
+    "claude_cost_usd_total": "Estimated Claude spend in USD",
+    "cache_lookups_total": "Cache lookups by result (hit, stale_hit, miss)",
+    "circuit_transitions_total": "Circuit breaker state changes by upstream and new state",
+    "circuit_rejections_total": "Calls failed fast because the upstream's circuit was open",
+    "fallback_served_total": "Last-known-good values served after an upstream failure",
+    "claude_response_cache_total": "Chat answers by response cache result (exact, near, miss)",
+    "write_behind_rows_dropped_total": "Rows a write-behind queue gave up on (queue full or exiting)",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def estimate_cost(model: str, usage: Dict) -> float:
+    """Estimated USD cost of one Claude request; 0.0 for unknown models"""
+    prices = CLAUDE_PRICING.get(model)
+    if not prices:
+        return 0.0
+    input_price, output_price, write_price, read_price = prices
+    return (
+        usage.get("input_tokens", 0) * input_price +
+        usage.get("output_tokens", 0) * output_price +
+        usage.get("cache_creation_input_tokens", 0) * write_price +
+        usage.get("cache_read_input_tokens", 0) * read_price
+    ) / 1_000_000
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [bucket counts..., count, sum]
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(LATENCY_BUCKETS) + 3)
+            series[index] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view: counters plus count/sum/avg/buckets per histogram"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(series) for key, series in self._histograms.items()}
+
+        result = {"counters": [], "histograms": []}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+        for (name, labels), series in sorted(histograms.items()):
+            count, total = series[-2], series[-1]
+            result["histograms"].append({
+                "name": name,
+                "labels": dict(labels),
+                "count": count,
+                "sum": total,
+                "avg": total / count if count else 0.0,
+                "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], series[:-2]))
+            })
+        return result
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(series) for key, series in self._histograms.items()}
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{fmt(labels)} {value}")
+
+        for (name, labels), series in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], series[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_count{fmt(labels)} {series[-2]}")
+            lines.append(f"{name}_sum{fmt(labels)} {series[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def track(upstream: str, operation: str, registry: MetricsRegistry = METRICS):
+    """Time a block as one call to an upstream; exceptions are counted and re-raised"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.inc("upstream_errors_total", upstream=upstream, operation=operation)
+        raise
+    finally:
+        registry.observe("upstream_request_seconds", time.perf_counter() - started,
+                         upstream=upstream, operation=operation)
+
+
+def timed(upstream: str, operation: Optional[str] = None, registry: MetricsRegistry = METRICS):
+    """Decorator form of ``track``; operation defaults to the function name"""
+    def decorator(fn):
+        name = operation or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(upstream, name, registry):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_claude_usage(model: str, usage: Dict, registry: MetricsRegistry = METRICS):
+    """Add one request's token counts (as recorded by ClaudeService) and its cost"""
+    for field, count in usage.items():
+        if count:
+            registry.inc("claude_tokens_total", count, model=model,
+                         kind=field.replace("_tokens", ""))
+    registry.inc("claude_cost_usd_total", estimate_cost(model, usage), model=model)
+
+
+def record_cache(cache: str, result: str, registry: MetricsRegistry = METRICS):
+    """Count a cache lookup; result is hit, stale_hit or miss"""
+    registry.inc("cache_lookups_total", cache=cache, result=result)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = METRICS
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.registry.to_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.registry.snapshot()).encode()
+            content_type = "application/json"
+        elif self.path in ("/livez", "/readyz"):
+            from utils.health import liveness, readiness
+            result = liveness() if self.path == "/livez" else readiness()
+            status = 200 if result["status"] in ("healthy", "ready") else 503
+            self._send(status, json.dumps(result).encode(), "application/json")
+            return
+        else:
+            self.send_error(404)
+            return
+        self._send(200, body, content_type)
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Serve metrics and health probes on METRICS_PORT; None when it is unset"""
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server